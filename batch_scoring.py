@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Vectorised scoring for bulk / historical re-scoring (requires numpy).
+
+A rule table (see rule_engine.py) is compiled into column operations: every
+context entry the table reads is packed into one NumPy column, then each
+distinct condition becomes a boolean array and each rule adds its `score`
+where all of its clauses hold. Scores are identical to RuleSet.score() +
+round(..., 1), just computed for a whole batch at once.
+
+Column encodings, chosen from how the rules use each entry:
+    set   (has / any)            uint64 bitmask: bit 0 = non-empty, then one
+                                 bit per value the rules mention
+    num   (>= < ... numbers)     float64 of `value or 0`
+    cat   (== != in, strings)    int code: 0 falsy, 1 other truthy, 2+ mentioned values
+    bool  (bare name / !name)    truthiness
+
+`@name` values must refer to constants (e.g. PRIORITY_MERCHANTS) passed to
+the scorer, not to per-item columns.
+"""
+import numpy as np
+
+from rule_engine import RuleError, RuleSet, COMPARE, parse_condition, parse_literal
+
+_SET_OPS = ("has", "any")
+_MAX_SET_BITS = 63  # bit 0 is the non-empty flag
+
+
+class BatchScorer:
+    """Compiled, vectorised version of one score table of a RuleSet."""
+
+    def __init__(self, rules: RuleSet, table: str = "score", constants: dict | None = None):
+        self.rules = rules
+        self.table = table
+        self.constants = dict(constants or {})
+
+        plan = rules.plans.get(table, ())
+        used = sorted({i for clauses, *_ in plan for alts in clauses for i in alts})
+        parsed = {i: parse_condition(rules.conditions[i]) for i in used}
+
+        kinds = {}  # column name -> "set" | "num" | "cat" | "bool"
+        set_values = {}
+        cat_values = {}
+        for negate, name, op, value in parsed.values():
+            if value and value.startswith("@") and value[1:] not in self.constants:
+                raise RuleError(f"{value!r} must be passed in constants to vectorise {table!r}")
+            if op is None:
+                kind = "bool"
+            elif op in _SET_OPS:
+                kind = "set"
+                options = self._options(op, value)
+                set_values.setdefault(name, [])
+                set_values[name] += [v for v in options if v not in set_values[name]]
+            elif op == "in" or not isinstance(self._operand(value), (int, float)):
+                if op not in ("in", "==", "!="):
+                    raise RuleError(f"Cannot vectorise string comparison on {name!r} with {op!r}")
+                kind = "cat"
+                options = [parse_literal(v) for v in value.split("|")] if op == "in" else [parse_literal(value)]
+                cat_values.setdefault(name, [])
+                cat_values[name] += [v for v in options if v not in cat_values[name]]
+            else:
+                kind = "num"
+            previous = kinds.get(name, "bool")
+            if previous != "bool" and kind != "bool" and previous != kind:
+                raise RuleError(f"Context entry {name!r} is used both as {previous} and {kind}")
+            if kind != "bool" or name not in kinds:
+                kinds[name] = kind
+        for name, values in set_values.items():
+            if len(values) > _MAX_SET_BITS:
+                raise RuleError(f"Too many distinct values for {name!r} ({len(values)} > {_MAX_SET_BITS})")
+
+        self.kinds = kinds
+        self.set_bits = {name: {v: 1 << (b + 1) for b, v in enumerate(vals)} for name, vals in set_values.items()}
+        self.cat_codes = {name: {v: c + 2 for c, v in enumerate(vals)} for name, vals in cat_values.items()}
+        self._used = used
+        self._parsed = parsed
+        self._plan = [(clauses, score) for clauses, _, score, _ in plan]
+
+    def _options(self, op: str, value: str) -> list:
+        if op == "has":
+            return [value]
+        if value.startswith("@"):
+            return list(self.constants.get(value[1:]) or ())
+        return value.split("|")
+
+    def _operand(self, value: str):
+        if value.startswith("@"):
+            return self.constants.get(value[1:]) or 0
+        return parse_literal(value)
+
+    @property
+    def columns(self) -> tuple[str, ...]:
+        """Context entries packed for this table."""
+        return tuple(self.kinds)
+
+    # ---------- packing ----------
+    def pack(self, contexts) -> dict[str, np.ndarray]:
+        """Pack rule contexts (dicts as built for RuleSet) into one array per column."""
+        contexts = list(contexts)
+        return self.pack_columns({name: [ctx.get(name) for ctx in contexts] for name in self.kinds})
+
+    def pack_columns(self, values: dict[str, list]) -> dict[str, np.ndarray]:
+        """Pack raw context values, given as one list per entry in `columns`, into arrays."""
+        encoders = []
+        for name, kind in self.kinds.items():
+            if kind == "set":
+                bits = tuple(self.set_bits[name].items())
+
+                def encode(val, bits=bits):
+                    val = val or ()
+                    mask = 1 if val else 0
+                    for v, bit in bits:
+                        if v in val:
+                            mask |= bit
+                    return mask
+            elif kind == "num":
+                def encode(val):
+                    return val or 0
+            elif kind == "cat":
+                def encode(val, codes=self.cat_codes[name]):
+                    code = codes.get(val)
+                    return code if code is not None else (1 if val else 0)
+            else:
+                encode = bool
+            encoders.append((name, encode))
+
+        dtypes = {"set": np.uint64, "num": np.float64, "cat": np.int16, "bool": np.bool_}
+        return {name: np.array([encode(v) for v in values[name]], dtype=dtypes[self.kinds[name]])
+                for name, encode in encoders}
+
+    # ---------- scoring ----------
+    def _truthy(self, name: str, col: np.ndarray) -> np.ndarray:
+        kind = self.kinds[name]
+        if kind == "set":
+            return (col & np.uint64(1)) != 0
+        if kind == "cat":
+            truthy = [1] + [code for v, code in self.cat_codes[name].items() if v]
+            return np.isin(col, truthy)
+        return col != 0
+
+    def _predicate(self, packed: dict, i: int) -> np.ndarray:
+        negate, name, op, value = self._parsed[i]
+        col = packed[name]
+        if op is None:
+            truthy = self._truthy(name, col)
+            return ~truthy if negate else truthy
+        kind = self.kinds[name]
+        if kind == "set":
+            mask = 0
+            for v in self._options(op, value):
+                mask |= self.set_bits[name][v]
+            return (col & np.uint64(mask)) != 0
+        if kind == "cat":
+            codes = self.cat_codes[name]
+            if op == "in":
+                return np.isin(col, [codes[parse_literal(v)] for v in value.split("|")])
+            equal = col == codes[parse_literal(value)]
+            return equal if op == "==" else ~equal
+        return COMPARE[op](col, self._operand(value))
+
+    def score(self, packed: dict) -> np.ndarray:
+        """Score of every packed row, equal to round(RuleSet.score(...), 1)."""
+        n = len(next(iter(packed.values()))) if packed else 0
+        preds = {i: self._predicate(packed, i) for i in self._used}
+        total = np.zeros(n, dtype=np.float64)
+        for clauses, delta in self._plan:
+            fired = np.ones(n, dtype=np.bool_)
+            for alts in clauses:
+                clause = preds[alts[0]]
+                for i in alts[1:]:
+                    clause = clause | preds[i]
+                fired &= clause
+            total += np.where(fired, delta, 0)
+        # Python's round() on the (few) distinct totals keeps results bit-identical
+        distinct, inverse = np.unique(total, return_inverse=True)
+        return np.array([round(float(v), 1) for v in distinct], dtype=np.float64)[inverse]
+
+    def score_contexts(self, contexts) -> np.ndarray:
+        return self.score(self.pack(contexts))
+
+
+def top_k(scores: np.ndarray, k: int = 5) -> np.ndarray:
+    """
+    Indexes of the k best scores, highest first, ties broken by position
+    (same order as a stable sorted(..., reverse=True)[:k]).
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        kth = np.partition(-scores, k - 1)[k - 1]
+        candidates = np.flatnonzero(-scores <= kth)
+    else:
+        candidates = np.arange(n)
+    order = candidates[np.lexsort((candidates, -scores[candidates]))]
+    return order[:k]
@@ -3,15 +3,34 @@ import os
 import re
 import ssl
 import sys
+import json
+import sqlite3
 import smtplib
 import argparse
+import heapq
+import zlib
 import datetime as dt
+import functools
+import operator
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import NamedTuple
 from email.message import EmailMessage
 import html as html_lib
 
 import requests
 from bs4 import BeautifulSoup
 
+from keyword_matcher import load_matcher
+from enrichment_memo import EnrichmentMemo
+from rule_engine import ListValue, load_rules
+from near_duplicates import cluster_titles
+from promo_baselines import PromoBaselines
+from trend_history import TrendHistory, annotate_velocity, risers_first
+from subscriptions import SubscriptionIndex, load_subscriptions
+from deal_history import DealHistory, DIMENSIONS, GRAINS, MULTIPLIER_BUCKETS
+from snapshots import write_snapshot
+from page_archive import PageArchive
+
 # ---------- CONFIG ----------
 KEYWORDS = [
     "gift card", "giftcard", "ultimate", "tcn",
@@ -42,33 +61,268 @@ STOCK_KEYWORDS = [
     "pick up", "pickup", "in-store", "in store", "store stock"
 ]
 
+CASHBACK_PORTALS = {
+    "shopback": "ShopBack",
+    "topcashback": "TopCashback",
+    "cashrewards": "Cashrewards",
+    "cashback": "Cashback",  # generic mention, only used if no named portal matched
+}
+
+GIFT_CARD_PATTERNS = ["apple gift", "apple giftcard", "ultimate", "tcn", "gift card", "giftcard"]
+
 LATEST_KNOWN_GENERATION = 4  # M4 as of Jan 2026
 
 TIMEOUT = 20
 UA = "Mozilla/5.0 DealAgent/1.0"
 
+# Run-to-run state (previous snapshots, caches). Persist this directory between
+# runs (e.g. actions/cache) to let unchanged deals skip enrichment.
+STATE_DIR = os.environ.get("DEAL_STATE_DIR", ".deal_state")
+
+# Hint / why / recipe / score / confidence rules (see rule_engine.py for the format).
+RULES_FILE = os.environ.get("DEAL_RULES_FILE") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "stack_rules.json")
+STACK_RULES = load_rules(RULES_FILE)
+
+# Bump the leading number whenever enrichment code changes so cached results are
+# discarded; edits to the rules file change the digest automatically.
+RULES_VERSION = f"3-{STACK_RULES.digest}"
+
+# ---------- GIFT CARD ACCEPTANCE ----------
+# Card type -> merchant -> online limit note ("" when none), from the rules
+# file's "gift_cards" graph. Turned into lookup sets once at import so rule
+# contexts never branch on card or merchant names.
+GIFT_CARD_ACCEPTANCE = STACK_RULES.spec.get("gift_cards", {})
+REDEEMABLE_AT = {card: ListValue(merchants) for card, merchants in GIFT_CARD_ACCEPTANCE.items()}
+ONLINE_LIMIT_MERCHANTS = frozenset(m for merchants in GIFT_CARD_ACCEPTANCE.values() for m, limit in merchants.items() if limit)
+# Cards whose every redemption merchant limits online gift card payments
+ONLINE_LIMITED_CARDS = frozenset(
+    card for card, merchants in GIFT_CARD_ACCEPTANCE.items()
+    if merchants and all(merchants.values())
+)
+# Merchants taking plain store gift cards ("generic" card type)
+STORE_CARD_MERCHANTS = frozenset(REDEEMABLE_AT.get("generic", ()))
+
+# ---------- KEYWORD MATCHING ----------
+# Every keyword table is compiled into one Aho–Corasick automaton (cached in
+# STATE_DIR), so each title is scanned once regardless of table sizes.
+MATCH_TABLES = {
+    "keyword": KEYWORDS,
+    "merchant": MERCHANTS,
+    "physical": list(PHYSICAL_RETAILERS),
+    "stock": STOCK_KEYWORDS,
+    "cashback": list(CASHBACK_PORTALS),
+    "gift_card": GIFT_CARD_PATTERNS,
+    "signal": ["gift", "win ", "competition"],
+}
+
+@functools.lru_cache(maxsize=1)
+def get_matcher():
+    return load_matcher(MATCH_TABLES, STATE_DIR)
+
+@functools.lru_cache(maxsize=4096)
+def title_hits(text):
+    """All keyword-table hits in text: {category: sorted pattern indexes}."""
+    return get_matcher().scan(text or "")
+
+# ---------- TITLE SCANNER ----------
+# One precompiled pattern for whitespace runs, Apple chips and NNx multipliers.
+# Chip and multiplier alternatives are zero-width lookaheads, so overlapping
+# candidates are found exactly where separate re.search() calls would find them.
+_TITLE_SCANNER = re.compile(
+    r"(?P<ws>\s+)"
+    r"|(?=(?P<chip>\bM(?P<gen>\d+)\s*(?P<tier>Pro|Max|Ultra)?\b))"
+    r"|(?=(?P<mult>(?P<x>\d{1,3})\s*x\b))",
+    re.IGNORECASE,
+)
+_WHITESPACE = re.compile(r"\s+")
+
+# Chip/multiplier extraction only looks at this many characters, so a pathological
+# scraped title can't make the scanner backtrack over an unbounded string.
+TITLE_SCAN_LIMIT = 512
+
+
+class TitleScan(NamedTuple):
+    text: str                    # whitespace-normalised title
+    chip: str | None
+    generation: int | None
+    tier: str
+    multipliers: tuple[int, ...]  # every NNx in order of appearance
+
+
+@functools.lru_cache(maxsize=4096)
+def scan_title(title) -> TitleScan:
+    """Single pass: normalised whitespace, first Apple chip, all NNx multipliers."""
+    title = title or ""
+    head = title
+    if len(title) > TITLE_SCAN_LIMIT:
+        # Cut at whitespace so the guard never splits (and so fakes) a token; a
+        # first 512 characters without any whitespace are cut at the limit
+        cut = TITLE_SCAN_LIMIT
+        while cut and not (title[cut - 1].isspace() or title[cut].isspace()):
+            cut -= 1
+        head = title[:cut or TITLE_SCAN_LIMIT]
+    pieces = []
+    pos = 0
+    chip_match = None
+    multipliers = []
+    mult_end = 0
+    for m in _TITLE_SCANNER.finditer(head):
+        if m.group("ws") is not None:
+            pieces.append(head[pos:m.start()])
+            pos = m.end()
+        elif m.group("chip") is not None:
+            if chip_match is None:
+                chip_match = m
+        elif m.start() >= mult_end:
+            multipliers.append(int(m.group("x")))
+            mult_end = m.end("mult")
+    pieces.append(head[pos:])
+    text = " ".join(pieces).strip()
+    if len(title) > len(head):
+        text = norm(title)
+
+    if chip_match is None:
+        chip, generation, tier = None, None, "unknown"
+    else:
+        generation = int(chip_match.group("gen"))
+        tier_raw = chip_match.group("tier")
+        tier = tier_raw.lower() if tier_raw else "base"
+        chip = f"M{generation}" + (f" {tier_raw.title()}" if tier_raw else "")
+    return TitleScan(text, chip, generation, tier, tuple(multipliers))
+
+# ---------- DEAL RECORDS ----------
+class ChipInfo(NamedTuple):
+    chip: str | None
+    generation: int | None
+    tier: str
+
+    def get(self, key, default=None):
+        """Dict-style read, as for the chip_info dicts this replaces."""
+        return getattr(self, key) if key in self._fields else default
+
+
+class Arbitrage(NamedTuple):
+    eligible: bool
+    targets: tuple[str, ...]
+    confidence: str
+
+    def get(self, key, default=None):
+        """Dict-style read, as for the arbitrage dicts this replaces."""
+        return getattr(self, key) if key in self._fields else default
+
+
+NO_ARBITRAGE = Arbitrage(False, (), "none")
+
+
+@functools.lru_cache(maxsize=64)
+def chip_record(chip, generation, tier) -> ChipInfo:
+    """Shared ChipInfo per distinct chip, so items don't each carry a copy."""
+    return ChipInfo(chip, generation, tier)
+
+
+def _names(values) -> tuple[str, ...]:
+    return tuple(sys.intern(v) for v in values)
+
+
+# Rebuild record types for values read back from JSON state / the memo (lists)
+_RESTORE = {
+    "merchants": _names,
+    "cashback": _names,
+    "physical_retailers": _names,
+    "chip_info": lambda v: chip_record(*v),
+    "arbitrage": lambda v: Arbitrage(bool(v[0]), _names(v[1]), v[2]),
+}
+
+
+_UNSET = object()  # value of a field that was never set (reads as a missing key)
+
+
+class Deal:
+    """
+    One deal and its enrichment, one slot per field instead of a per-item dict.
+    Supports the dict-style access the report code uses (it["title"],
+    it.get("score", 0), "hint" in it, it.update(...)); a field that was never
+    set behaves like a missing key.
+    """
+
+    __slots__ = (
+        "source", "title", "link", "features", "merchants", "cashback", "chip_info",
+        # stack report
+        "exclude_from_top", "exclude_reason", "arbitrage", "score", "hint", "cashback_note", "why", "recipe",
+        "siblings", "cross_matches", "promo_tier",
+        # daily report
+        "physical_retailers", "has_stock_signal", "is_apple", "confidence", "excluded_from_main",
+    )
+
+    def __init__(self, fields=(), **kwargs):
+        copied = isinstance(fields, Deal)
+        for key, value in zip(Deal.__slots__, _deal_values(fields) if copied else _ALL_UNSET):
+            setattr(self, key, value)
+        self.update(() if copied else fields, **kwargs)
+
+    def __getitem__(self, key):
+        if key in DEAL_FIELDS:
+            value = getattr(self, key)
+            if value is not _UNSET:
+                return value
+        return self.__missing__(key)
+
+    def __missing__(self, key):
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in DEAL_FIELDS:
+            raise KeyError(f"Deal has no field {key!r}")
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in DEAL_FIELDS and getattr(self, key) is not _UNSET
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> list[str]:
+        return [k for k, _ in self.items()]
+
+    def items(self) -> list[tuple]:
+        return [(k, v) for k, v in zip(Deal.__slots__, _deal_values(self)) if v is not _UNSET]
+
+    def update(self, fields=(), **kwargs):
+        """Set fields from a mapping, Deal or (key, value) pairs; JSON lists get their record types back."""
+        pairs = fields.items() if hasattr(fields, "items") else fields
+        for key, value in [*pairs, *kwargs.items()]:
+            if key == "source":
+                value = sys.intern(value)
+            elif type(value) is list and key in _RESTORE:
+                value = _RESTORE[key](value)
+            self[key] = value
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
+DEAL_FIELDS = frozenset(Deal.__slots__)
+_deal_values = operator.attrgetter(*Deal.__slots__)
+_ALL_UNSET = (_UNSET,) * len(Deal.__slots__)
+
 # ---------- HELPERS ----------
 def norm(s):
-    return re.sub(r"\s+", " ", (s or "")).strip()
+    return _WHITESPACE.sub(" ", (s or "")).strip()
 
 def contains_keywords(text):
-    t = (text or "").lower()
-    return any(k in t for k in KEYWORDS)
+    return "keyword" in title_hits(text)
 
 def detect_merchants(text):
-    t = (text or "").lower()
-    return [m for m in MERCHANTS if m.lower() in t]
+    return [MERCHANTS[i] for i in title_hits(text).get("merchant", ())]
 
 def detect_cashback(text):
-    t = (text or "").lower()
-    found = []
-    if "shopback" in t:
-        found.append("ShopBack")
-    if "topcashback" in t:
-        found.append("TopCashback")
-    if "cashrewards" in t:
-        found.append("Cashrewards")
-    if "cashback" in t and not found:
+    hits = title_hits(text).get("cashback", ())
+    portals = list(CASHBACK_PORTALS.values())
+    found = [portals[i] for i in hits if portals[i] != "Cashback"]
+    if hits and not found:
         found.append("Cashback")
     return found
 
@@ -80,77 +334,74 @@ def generate_cashback_note(portals):
     return f"⚠️ {portal_str} typically excludes gift card purchases. Verify portal T&Cs before assuming cashback applies."
 
 def extract_x(text):
-    m = re.search(r"(\d{1,3})\s*x\b", (text or "").lower())
-    return int(m.group(1)) if m else None
+    multipliers = scan_title(text).multipliers
+    return multipliers[0] if multipliers else None
 
 def stack_hint(title):
-    t = (title or "").lower()
-    hints = []
-    if extract_x(title) and "gift" in t:
-        hints.append("Points promo on gift cards → strong base return.")
-    if "ultimate" in t or "tcn" in t:
-        hints.append("Multi-retailer gift card → JB / OW / TGG stackable.")
-    if any(k in t for k in ["officeworks", "jb hi-fi", "jbhifi"]):
-        hints.append("Check cashback portal T&Cs for gift card payments.")
-    return " ".join(hints)
+    ctx, values = _evaluate_rules(title_features(title), None)
+    return " ".join(STACK_RULES.messages("hint", ctx, values))
 
 def detect_apple_chip(text):
     """Detect Apple Silicon chip from text."""
-    pattern = r'\bM(\d+)\s*(Pro|Max|Ultra)?\b'
-    match = re.search(pattern, text or "", re.IGNORECASE)
-    
-    if not match:
-        return {"chip": None, "generation": None, "tier": "unknown"}
-    
-    generation = int(match.group(1))
-    tier_raw = match.group(2)
-    tier = tier_raw.lower() if tier_raw else "base"
-    
-    chip = f"M{generation}"
-    if tier_raw:
-        chip += f" {tier_raw.title()}"
-    
-    return {"chip": chip, "generation": generation, "tier": tier}
+    scan = scan_title(text)
+    return {"chip": scan.chip, "generation": scan.generation, "tier": scan.tier}
 
 def detect_physical_retailers(text):
     """Detect physical retailers that support price match/beat."""
-    t = (text or "").lower()
-    found = []
-    for retailer in PHYSICAL_RETAILERS.keys():
-        if retailer.lower() in t:
-            found.append(retailer)
-    return found
+    retailers = MATCH_TABLES["physical"]
+    return [retailers[i] for i in title_hits(text).get("physical", ())]
 
 def detect_stock_signal(text):
     """Check if text contains stock/C&C availability signals."""
-    t = (text or "").lower()
-    return any(kw in t for kw in STOCK_KEYWORDS)
+    return "stock" in title_hits(text)
+
+# ---------- MERCHANT BITSETS ----------
+# Every merchant / retailer name gets one bit (in MERCHANTS order), so sets of
+# them are ints: union and membership are bit operations and decoding a mask
+# always yields the same order.
+MERCHANT_BITS = {
+    name: 1 << i
+    for i, name in enumerate(dict.fromkeys(
+        MERCHANTS + list(PHYSICAL_RETAILERS) + [r for rs in PHYSICAL_RETAILERS.values() for r in rs]
+    ))
+}
+_MERCHANT_NAMES = tuple(MERCHANT_BITS)
+
+@functools.lru_cache(maxsize=1024)
+def merchant_mask(names: tuple[str, ...]) -> int:
+    mask = 0
+    for name in names:
+        mask |= MERCHANT_BITS.get(name, 0)
+    return mask
 
-def calculate_arbitrage(item):
+@functools.lru_cache(maxsize=1024)
+def mask_names(mask: int) -> tuple[str, ...]:
+    """Names of the bits set in mask, in MERCHANT_BITS order."""
+    return tuple(name for name in _MERCHANT_NAMES if mask & MERCHANT_BITS[name])
+
+PRIORITY_MASK = merchant_mask(tuple(PRIORITY_MERCHANTS))
+COMPETITOR_MASKS = {retailer: merchant_mask(tuple(rivals)) for retailer, rivals in PHYSICAL_RETAILERS.items()}
+
+def calculate_arbitrage(item) -> Arbitrage:
     """Calculate arbitrage opportunity: eligible, targets, confidence."""
-    title = item.get("title", "")
-    physical = detect_physical_retailers(title)
-    has_stock = detect_stock_signal(title)
-    chip_info = item.get("chip_info", {})
+    f = item_features(item)
+    physical = f.physical
+    has_stock = f.has_stock
     
     # Not eligible if no physical retailer mentioned
     if not physical:
-        return {"eligible": False, "targets": [], "confidence": "none"}
+        return NO_ARBITRAGE
     
-    # Build list of potential arbitrage targets
-    targets = []
+    # Union of the competitors of every retailer mentioned
+    targets = 0
     for retailer in physical:
-        if retailer in PHYSICAL_RETAILERS:
-            targets.extend(PHYSICAL_RETAILERS[retailer])
-    
-    # Remove duplicates
-    targets = list(set(targets))
+        targets |= COMPETITOR_MASKS.get(retailer, 0)
     
     # Determine confidence level
     confidence = "none"
     if targets:
         # High confidence: physical retailer + stock signal + (Apple chip OR priority merchant)
-        if has_stock and (chip_info.get("chip") or any(m in PRIORITY_MERCHANTS for m in item.get("merchants", []))):
+        if has_stock and (f.chip or merchant_mask(f.merchants) & PRIORITY_MASK):
             confidence = "high"
         # Medium confidence: physical retailer + stock signal
         elif has_stock:
@@ -159,194 +410,287 @@ def calculate_arbitrage(item):
         else:
             confidence = "low"
     
-    return {
-        "eligible": len(targets) > 0,
-        "targets": targets,
-        "confidence": confidence
-    }
+    return Arbitrage(targets != 0, mask_names(targets), confidence)
 
 def detect_gift_card_type(text):
     """Detect gift card type: apple, ultimate, tcn, or generic."""
-    t = (text or "").lower()
-    if "apple gift" in t or "apple giftcard" in t:
+    found = {GIFT_CARD_PATTERNS[i] for i in title_hits(text).get("gift_card", ())}
+    if "apple gift" in found or "apple giftcard" in found:
         return "apple"
-    if "ultimate" in t:
+    if "ultimate" in found:
         return "ultimate"
-    if "tcn" in t:
+    if "tcn" in found:
         return "tcn"
-    if "gift card" in t or "giftcard" in t:
+    if "gift card" in found or "giftcard" in found:
         return "generic"
     return None
 
+# ---------- TITLE FEATURES ----------
+class TitleFeatures(NamedTuple):
+    """Everything the scoring/hint functions need from a title, extracted once."""
+    title: str
+    x: int | None
+    multipliers: tuple[int, ...]
+    chip: str | None
+    generation: int | None
+    tier: str
+    merchants: tuple[str, ...]
+    cashback: tuple[str, ...]
+    physical: tuple[str, ...]
+    has_stock: bool
+    gc_type: str | None
+    signals: frozenset[str]  # every matched (lowercase) pattern from MATCH_TABLES
+
+    @property
+    def chip_info(self) -> ChipInfo:
+        return chip_record(self.chip, self.generation, self.tier)
+
+@functools.lru_cache(maxsize=4096)
+def title_features(title) -> TitleFeatures:
+    """Extract all title features in one pass (cached per title)."""
+    title = title or ""
+    hits = title_hits(title)
+    scan = scan_title(title)
+    return TitleFeatures(
+        title=title,
+        x=scan.multipliers[0] if scan.multipliers else None,
+        multipliers=scan.multipliers,
+        chip=scan.chip,
+        generation=scan.generation,
+        tier=scan.tier,
+        merchants=tuple(detect_merchants(title)),
+        cashback=tuple(detect_cashback(title)),
+        physical=tuple(detect_physical_retailers(title)),
+        has_stock="stock" in hits,
+        gc_type=detect_gift_card_type(title),
+        signals=frozenset(MATCH_TABLES[cat][i].lower() for cat, idxs in hits.items() for i in idxs),
+    )
+
+def item_features(item) -> TitleFeatures:
+    """Features attached by enrichment, or computed from the item's title."""
+    return item.get("features") or title_features(item.get("title", ""))
+
 def generate_stack_recipe(item):
     """Generate 3-5 step recipe for stacking this deal."""
-    title = item.get("title", "")
-    t = title.lower()
-    gc_type = detect_gift_card_type(title)
-    x = extract_x(title)
-    merchants = item.get("merchants", [])
-    arbitrage = item.get("arbitrage", {})
-    chip_info = item.get("chip_info", {})
-    
-    steps = []
-    
-    # Step 1: Points promo
-    if x:
-        if x >= 20:
-            steps.append(f"Activate {x}x points in your loyalty account before purchase.")
-        else:
-            steps.append(f"Ensure {x}x points promo is active in your account.")
-    
-    # Step 2: Gift card purchase
-    if gc_type == "ultimate":
-        steps.append("Buy Ultimate gift cards at promoted merchant (front-load points return).")
-        steps.append("Convert Ultimate cards online to JB Hi-Fi/Officeworks denominations (check 1-card-online.com.au limits).")
-    elif gc_type == "tcn":
-        steps.append("Buy TCN gift cards to use at category merchants (check specific merchant list).")
-    elif gc_type == "apple":
-        steps.append("Buy Apple gift cards at promoted merchant (front-load points return).")
-        steps.append("Use Apple gift cards for Apple Store purchases (online or in-store, check online gift card limits).")
-    elif gc_type == "generic":
-        steps.append("Buy gift cards at promoted merchant (front-load points return).")
-        if merchants:
-            steps.append(f"Use gift cards at {merchants[0]} (check online gift card limits).")
-    
-    # Step 3: Arbitrage opportunity
-    if arbitrage.get("eligible") and arbitrage.get("confidence") in ["high", "medium"]:
-        targets = arbitrage.get("targets", [])
-        if targets and chip_info.get("chip"):
-            steps.append(f"Compare prices at {', '.join(targets[:2])} for price match/beat opportunities (verify current policies).")
-        elif targets:
-            steps.append(f"Check {', '.join(targets[:2])} for competitive pricing (price match may be available).")
-    
-    # Step 4: Cashback (optional)
-    if item.get("cashback"):
-        cashback_sites = ", ".join(item["cashback"][:2])
-        steps.append(f"Optional: Use {cashback_sites} if portal allows gift-card/account-balance payments (check T&Cs).")
-    
-    # Step 5: Generic caution
-    if gc_type in ["ultimate", "apple"] or (gc_type and any(m in merchants for m in ["JB Hi-Fi", "Officeworks", "Apple"])):
-        if "check online gift card limits" not in " ".join(steps):
-            steps.append("Check online gift card limits at redemption merchant.")
-    
-    # Return max 5 steps
-    return steps[:5]
+    ctx, values = evaluate_rules(item)
+    return STACK_RULES.messages("recipe", ctx, values)
 
 def why_stack_works(it):
     """
     High-signal explanation of why this deal stacks TODAY.
     ✅ No scraping, no fragile assumptions.
     """
-    t = (it.get("title") or "").lower()
-    reasons = []
+    ctx, values = evaluate_rules(it)
+    return " ".join(STACK_RULES.messages("why", ctx, values))
 
-    x = extract_x(it.get("title", ""))
-    if x:
-        if x >= 20:
-            reasons.append(f"{x}x points promo → ~{x//2}% base return.")
-        else:
-            reasons.append(f"{x}x points promo → meaningful base return.")
+def score_item(it):
+    ctx, values = evaluate_rules(it)
+    return round(STACK_RULES.score("score", values), 1)
+
+# ---------- RULE EVALUATION ----------
+# Values that rule conditions and message templates can refer to, each read
+# from an item's (TitleFeatures, Arbitrage). score_many() builds only the
+# entries the "score" table uses, column by column, straight from these.
+RULE_CONTEXT = {
+    "x": lambda f, a: f.x or 0,
+    "x_half": lambda f, a: (f.x or 0) // 2,
+    "chip": lambda f, a: f.chip,
+    "generation": lambda f, a: f.generation or 0,
+    "tier": lambda f, a: f.tier,
+    "gc_type": lambda f, a: f.gc_type,
+    "gc_redeem": lambda f, a: REDEEMABLE_AT.get(f.gc_type, ListValue()),
+    "gc_online_limit": lambda f, a: f.gc_type in ONLINE_LIMITED_CARDS,
+    "redeem": lambda f, a: REDEEMABLE_AT,
+    "store_card_merchants": lambda f, a: STORE_CARD_MERCHANTS,
+    "online_limit_merchants": lambda f, a: ONLINE_LIMIT_MERCHANTS,
+    "merchants": lambda f, a: f.merchants,
+    "merchant0": lambda f, a: f.merchants[0] if f.merchants else "",
+    "cashback": lambda f, a: f.cashback,
+    "cashback2": lambda f, a: ", ".join(f.cashback[:2]),
+    "physical": lambda f, a: f.physical,
+    "has_stock": lambda f, a: f.has_stock,
+    "signals": lambda f, a: f.signals,
+    "promo_tier": lambda f, a: promo_tier(f),
+    "promo_label": lambda f, a: promo_label(f),
+    "arb_eligible": lambda f, a: bool(a.eligible),
+    "arb_confidence": lambda f, a: a.confidence,
+    "targets": lambda f, a: list(a.targets),
+    "targets2": lambda f, a: ", ".join(a.targets[:2]),
+    "priority_merchants": lambda f, a: PRIORITY_MERCHANTS,
+    "latest_generation": lambda f, a: LATEST_KNOWN_GENERATION,
+}
+
+def rule_context(f, arbitrage: Arbitrage | None = None):
+    """Every RULE_CONTEXT entry for one title's features."""
+    arbitrage = arbitrage or NO_ARBITRAGE
+    return {name: value(f, arbitrage) for name, value in RULE_CONTEXT.items()}
+
+@functools.lru_cache(maxsize=4096)
+def _evaluate_rules(f, arbitrage):
+    ctx = rule_context(f, arbitrage)
+    return ctx, STACK_RULES.predicate_values(ctx)
+
+def item_arbitrage(item) -> Arbitrage | None:
+    """An item's Arbitrage (computed on first access for stack deals), None without one."""
+    arbitrage = item.get("arbitrage")
+    if arbitrage and not isinstance(arbitrage, Arbitrage):  # plain dict
+        arbitrage = Arbitrage(bool(arbitrage.get("eligible")), tuple(arbitrage.get("targets", ())),
+                              arbitrage.get("confidence", "none"))
+    return arbitrage or None
+
+def evaluate_rules(item):
+    """(context, predicate values) for an item; every rule predicate is checked once."""
+    return _evaluate_rules(item_features(item), item_arbitrage(item))
+
+# ---------- PROMO BASELINES ----------
+# Multiplier promos are compared with every earlier promo of the same gift card
+# type and loyalty program (streaming summaries in promo_baselines.py). The
+# baselines are read once per report run and only written back after it, so
+# every deal in a run is judged against the same history.
+PROMO_BASELINES_FILE = "promo_baselines.json"
+PROMO_MIN_HISTORY = 10  # past promos a group needs before its percentiles count
+PROMO_TIERS = ((0.9, "top"), (0.75, "strong"))  # (percentile, tier), best first
+PROMO_PROGRAMS = {"everyday rewards": "Everyday Rewards", "flybuys": "Flybuys", "qantas": "Qantas", "velocity": "Velocity"}
+PROGRAM_BY_MERCHANT = {"Woolworths": "Everyday Rewards", "Coles": "Flybuys"}
+CARD_LABELS = {"ultimate": "Ultimate", "tcn": "TCN", "apple": "Apple gift card", "generic": "gift card"}
+
+def promo_program(f) -> str:
+    """Loyalty program a title's points promo is in (named, or implied by the merchant)."""
+    for signal, program in PROMO_PROGRAMS.items():
+        if signal in f.signals:
+            return program
+    return next((PROGRAM_BY_MERCHANT[m] for m in f.merchants if m in PROGRAM_BY_MERCHANT), "points")
+
+def promo_group(f) -> str | None:
+    """Baseline group of a multiplier promo ("ultimate|Everyday Rewards"), None without one."""
+    if not f.x:
+        return None
+    return f"{f.gc_type or 'other'}|{promo_program(f)}"
+
+def promo_label(f) -> str:
+    if not f.x:
+        return ""
+    return " ".join(filter(None, (CARD_LABELS.get(f.gc_type), promo_program(f))))
+
+def promo_baselines_path() -> str:
+    return os.path.join(STATE_DIR, PROMO_BASELINES_FILE)
+
+@functools.lru_cache(maxsize=1)
+def run_baselines() -> PromoBaselines:
+    """Baselines as of the start of this run (see refresh_promo_baselines)."""
+    return PromoBaselines.load(promo_baselines_path())
+
+def refresh_promo_baselines():
+    """Re-read baselines saved by an earlier run; rule results computed before are dropped."""
+    run_baselines.cache_clear()
+    _evaluate_rules.cache_clear()
+
+def promo_tier(f) -> str:
+    """"top" / "strong" when the multiplier beats most past promos of its group, else ""."""
+    group = promo_group(f)
+    if group is None:
+        return ""
+    pct = run_baselines().percentile(group, f.x, PROMO_MIN_HISTORY)
+    if pct is None:
+        return ""
+    return next((tier for threshold, tier in PROMO_TIERS if pct >= threshold), "")
+
+def update_promo_baselines(items: list[dict], keys: list[str]):
+    """
+    Add the promos of `items` to the saved baselines, skipping deals already
+    listed last run; `keys` (delta keys of everything fetched) become the new
+    "last run".
+    """
+    path = promo_baselines_path()
+    baselines = PromoBaselines.load(path)
+    for it in items:
+        if delta_key(it) in baselines.last_run:
+            continue
+        f = item_features(it)
+        group = promo_group(f)
+        if group is not None:
+            baselines.add(group, f.x)
+    baselines.last_run = set(keys)
+    try:
+        baselines.save(path)
+    except OSError:
+        pass  # Baselines are advisory; the report doesn't depend on saving them
 
-    if "gift card" in t or "giftcard" in t:
-        reasons.append("Buying gift cards front-loads rewards before purchase.")
+# ---------- PAGE ARCHIVE ----------
+PAGE_ARCHIVE_DIR = "pages"
+PAGE_ARCHIVE_MAX_AGE_DAYS = 90
+ARCHIVE_PAGES = True  # off while stack_deals() fetches only to route watchlists
 
-    if "ultimate" in t:
-        reasons.append("Ultimate gift cards can be converted to JB Hi-Fi / Officeworks.")
-    if "tcn" in t:
-        reasons.append("TCN cards work across multiple merchants (category-based).")
-    if "apple gift" in t:
-        reasons.append("Apple gift cards can pay Apple directly (and often stack with price match).")
 
-    if any(m in it.get("merchants", []) for m in ["JB Hi-Fi", "Officeworks", "The Good Guys", "IKEA"]):
-        reasons.append("Target merchant accepts gift cards (online limits may apply).")
+@functools.lru_cache(maxsize=1)
+def run_started() -> str:
+    """Start time of this run, which groups the pages it archives."""
+    return dt.datetime.now().isoformat(timespec="seconds")
 
-    if it.get("cashback"):
-        reasons.append("Cashback portals often exclude gift card purchases—verify T&Cs before relying on cashback.")
-    
-    # Apple chip forward-compatibility for price matching
-    chip_info = it.get("chip_info", {})
-    if chip_info.get("chip") and chip_info.get("generation", 0) > LATEST_KNOWN_GENERATION:
-        reasons.append("Apple silicon generations are forward-compatible for price matching when model/SKU aligns.")
-    
-    # Apple chip with stock signal - specific price match hint
-    if chip_info.get("chip"):
-        # Check for stock/C&C signals in title
-        title_lower = (it.get("title", "")).lower()
-        has_stock = any(kw in title_lower for kw in STOCK_KEYWORDS)
-        if has_stock:
-            reasons.append("Consider Harvey Norman / JB Hi-Fi / Officeworks price match/beat where policy allows.")
-    
-    # Physical retailer arbitrage opportunity
-    arbitrage = it.get("arbitrage", {})
-    if arbitrage.get("eligible") and arbitrage.get("confidence") in ["high", "medium"]:
-        targets = arbitrage.get("targets", [])
-        if targets:
-            target_str = ", ".join(targets[:2])  # Show max 2 targets
-            if arbitrage["confidence"] == "high":
-                reasons.append(f"Physical stock signals suggest possible price match arbitrage at {target_str} (verify current policies).")
-            else:
-                reasons.append(f"Physical retailer deal may enable price comparison with {target_str} (check stock and policies).")
 
-    return " ".join(reasons)
+def page_archive() -> PageArchive:
+    return PageArchive(os.path.join(STATE_DIR, PAGE_ARCHIVE_DIR))
 
-def score_item(it):
-    score = 0
-    t = (it.get("title") or "").lower()
-
-    x = extract_x(it.get("title", ""))
-    if x:
-        score += 10 if x >= 30 else 8 if x >= 20 else 4
-
-    if "gift card" in t or "giftcard" in t:
-        score += 3
-    if "ultimate" in t or "tcn" in t:
-        score += 3
-    if any(m in it.get("merchants", []) for m in PRIORITY_MERCHANTS):
-        score += 2
-
-    # Cashback: reduced weight, never outweighs points/gift cards
-    if it.get("cashback"):
-        score += 1
-        if any(c in ["ShopBack", "TopCashback"] for c in it["cashback"]):
-            score += 0.5
-    
-    # Arbitrage opportunity scoring
-    arbitrage = it.get("arbitrage", {})
-    if arbitrage.get("eligible"):
-        confidence = arbitrage.get("confidence", "none")
-        if confidence == "high":
-            score += 4
-        elif confidence == "medium":
-            score += 2
-        elif confidence == "low":
-            score += 1
-
-    if "win " in t or "competition" in t:
-        score -= 3
-
-    return round(score, 1)
+
+def archive_page(url: str, body: str):
+    """Keep a fetched body so extractors can be re-run on it later."""
+    if not ARCHIVE_PAGES:
+        return
+    try:
+        page_archive().put(url, body, run_started(), dt.datetime.now().isoformat(timespec="seconds"))
+    except (OSError, sqlite3.Error):
+        pass  # The archive is for re-extraction; the report doesn't depend on it
+
+
+def prune_page_archive():
+    """Forget pages archived by runs more than PAGE_ARCHIVE_MAX_AGE_DAYS old."""
+    cutoff = dt.datetime.fromisoformat(run_started()) - dt.timedelta(days=PAGE_ARCHIVE_MAX_AGE_DAYS)
+    try:
+        page_archive().prune(cutoff.isoformat(timespec="seconds"))
+    except (OSError, sqlite3.Error):
+        pass
 
 # ---------- FETCHERS ----------
+# Each fetch_* gets its HTML through fetch_url() (which archives the body for
+# this run) and hands it to a pure parse_*(html, limit). EXTRACTORS maps every
+# fetched URL to its parser, so archived pages can be replayed offline.
+OZB_FRONT_URL = "https://www.ozbargain.com.au/"
+OZB_HOT_URL = "https://www.ozbargain.com.au/hot"
+FREEPOINTS_URL = "https://freepoints.com.au/"
+GCDB_URL = "https://gcdb.com.au/"
+COSTCO_SEARCH_URL = "https://www.ozbargain.com.au/?q=costco+apple"
+
 def fetch_url(url):
     r = requests.get(url, headers={"User-Agent": UA}, timeout=TIMEOUT)
     r.raise_for_status()
+    archive_page(url, r.text)
     return r.text
 
-# ---------- FETCHERS ----------
+def first_unique(items: list[dict], limit: int | None) -> list[dict]:
+    """Items with a link not seen before, up to `limit` (all if None)."""
+    seen = set()
+    out = []
+    for it in items:
+        if it["link"] in seen:
+            continue
+        seen.add(it["link"])
+        out.append(it)
+        if limit is not None and len(out) >= limit:
+            break
+    return out
+
 def fetch_ozbargain_trending(limit=10):
     """Fetch trending deals from OzBargain /hot page."""
     # Try /hot first, fallback to front page
-    urls = ["https://www.ozbargain.com.au/hot", "https://www.ozbargain.com.au/"]
-    html = None
-    for u in urls:
+    for u in [OZB_HOT_URL, OZB_FRONT_URL]:
         try:
             html = fetch_url(u)
-            break
         except Exception:
             continue
-    if not html:
-        return []
+        return parse_ozbargain_trending(html, limit) if html else []
+    return []
 
+def parse_ozbargain_trending(html, limit=10):
     soup = BeautifulSoup(html, "lxml")
     deals = []
     for a in soup.select("a[href^='/node/']"):
@@ -354,22 +698,50 @@ def fetch_ozbargain_trending(limit=10):
         if not title or len(title) < 10:
             continue
         link = "https://www.ozbargain.com.au" + a["href"]
-        deals.append({"title": title, "link": link})
+        deals.append({"title": title, "link": link, "votes": parse_votes(a)})
+    return first_unique(deals, limit)
 
-    seen = set()
-    out = []
-    for d in deals:
-        if d["link"] in seen:
-            continue
-        seen.add(d["link"])
-        out.append(d)
-        if len(out) >= limit:
-            break
-    return out
+def parse_votes(anchor):
+    """Up-votes shown in the deal's node block, or None if the markup doesn't have them."""
+    node = anchor.find_parent(class_="node")
+    up = node.select_one(".voteup") if node else None
+    digits = re.sub(r"\D", "", up.get_text()) if up else ""
+    return int(digits) if digits else None
+
+# ---------- TRENDING HISTORY ----------
+TRENDING_HISTORY_FILE = "ozbargain_trending.jsonl"
+
+def rank_trending(deals: list[dict]) -> list[dict]:
+    """
+    Annotate trending deals with their movement since the previous run's
+    snapshot, record this run's snapshot, and put risers first.
+    """
+    for position, d in enumerate(deals, 1):
+        d["position"] = position
+    history = TrendHistory(os.path.join(STATE_DIR, TRENDING_HISTORY_FILE))
+    now = dt.datetime.now().timestamp()
+    annotate_velocity(deals, history.last(), now)
+    if deals:
+        try:
+            history.append(now, deals)
+        except OSError:
+            pass  # History only adds the movement labels
+    return risers_first(deals)
+
+def trend_label(d: dict) -> str:
+    if d.get("trend") == "new":
+        return "🆕 new"
+    if d.get("trend") != "up":
+        return ""
+    if d.get("velocity") is not None:
+        return f"▲ +{d['velocity']:.0f} votes/h"
+    return f"▲ {d['climb']} place{'s' if d['climb'] != 1 else ''}"
 
 def fetch_freepoints_latest(limit=10):
     """Fetch latest deals from FreePoints."""
-    html = fetch_url("https://freepoints.com.au/")
+    return parse_freepoints(fetch_url(FREEPOINTS_URL), limit)
+
+def parse_freepoints(html, limit=10):
     soup = BeautifulSoup(html, "lxml")
     items = []
     for a in soup.select("a"):
@@ -379,21 +751,13 @@ def fetch_freepoints_latest(limit=10):
             continue
         if ("points" in txt.lower() or "gift card" in txt.lower()) and contains_keywords(txt):
             items.append({"source": "FreePoints", "title": txt, "link": href})
-
-    seen = set()
-    out = []
-    for it in items:
-        if it["link"] in seen:
-            continue
-        seen.add(it["link"])
-        out.append(it)
-        if len(out) >= limit:
-            break
-    return out
+    return first_unique(items, limit)
 
 def fetch_gcdb_latest(limit=10):
     """Fetch latest deals from GCDB."""
-    html = fetch_url("https://gcdb.com.au/")
+    return parse_gcdb(fetch_url(GCDB_URL), limit)
+
+def parse_gcdb(html, limit=10):
     soup = BeautifulSoup(html, "lxml")
     items = []
     for a in soup.select("a"):
@@ -403,21 +767,13 @@ def fetch_gcdb_latest(limit=10):
             continue
         if ("gift card" in txt.lower() or "points" in txt.lower() or "off" in txt.lower()) and contains_keywords(txt):
             items.append({"source": "GCDB", "title": txt, "link": href})
-
-    seen = set()
-    out = []
-    for it in items:
-        if it["link"] in seen:
-            continue
-        seen.add(it["link"])
-        out.append(it)
-        if len(out) >= limit:
-            break
-    return out
+    return first_unique(items, limit)
 
 def fetch_ozbargain_frontpage(limit=20):
     """Fetch deals from OzBargain front page."""
-    html = fetch_url("https://www.ozbargain.com.au/")
+    return parse_ozbargain_frontpage(fetch_url(OZB_FRONT_URL), limit)
+
+def parse_ozbargain_frontpage(html, limit=20):
     soup = BeautifulSoup(html, "lxml")
     items = []
     for a in soup.select("a[href^='/node/']"):
@@ -428,17 +784,7 @@ def fetch_ozbargain_frontpage(limit=20):
         full = "https://www.ozbargain.com.au" + href
         if contains_keywords(title):
             items.append({"source": "OzBargain", "title": title, "link": full})
-
-    seen = set()
-    out = []
-    for it in items:
-        if it["link"] in seen:
-            continue
-        seen.add(it["link"])
-        out.append(it)
-        if len(out) >= limit:
-            break
-    return out
+    return first_unique(items, limit)
 
 def fetch_costco_hotbuys():
     """Fetch Costco Hot Buys - checks for Apple products only."""
@@ -453,148 +799,630 @@ def fetch_costco_hotbuys():
     
     # Try to search OzBargain for recent Costco Apple deals as backup
     try:
-        html = fetch_url("https://www.ozbargain.com.au/?q=costco+apple")
-        soup = BeautifulSoup(html, "lxml")
-        for a in soup.select("a[href^='/node/']")[:5]:
-            title = norm(a.get_text(" ", strip=True))
-            if not title or "costco" not in title.lower():
-                continue
-            # Only include Apple products, exclude gift cards
-            title_lower = title.lower()
-            if "apple" in title_lower and "gift" not in title_lower and "giftcard" not in title_lower:
-                link = "https://www.ozbargain.com.au" + a["href"]
-                items.append({"source": "Costco (via OzBargain)", "title": title, "link": link})
+        items += parse_costco_search(fetch_url(COSTCO_SEARCH_URL))
     except Exception:
         pass
     
     return items
 
+def parse_costco_search(html, limit=5):
+    """Costco Apple deals from an OzBargain search page (the first `limit` results)."""
+    soup = BeautifulSoup(html, "lxml")
+    items = []
+    for a in soup.select("a[href^='/node/']")[:limit]:
+        title = norm(a.get_text(" ", strip=True))
+        if not title or "costco" not in title.lower():
+            continue
+        # Only include Apple products, exclude gift cards
+        title_lower = title.lower()
+        if "apple" in title_lower and "gift" not in title_lower and "giftcard" not in title_lower:
+            link = "https://www.ozbargain.com.au" + a["href"]
+            items.append({"source": "Costco (via OzBargain)", "title": title, "link": link})
+    return items
+
+# Archived URL -> (source name, parser) for offline re-extraction
+EXTRACTORS = {
+    FREEPOINTS_URL: ("FreePoints", parse_freepoints),
+    GCDB_URL: ("GCDB", parse_gcdb),
+    OZB_FRONT_URL: ("OzBargain", parse_ozbargain_frontpage),
+    COSTCO_SEARCH_URL: ("Costco (via OzBargain)", parse_costco_search),
+    OZB_HOT_URL: ("OzBargain trending", parse_ozbargain_trending),
+}
+
 # ---------- ADDITIONAL HELPER FOR DAILY REPORT ----------
 def calculate_confidence(item):
     """Calculate arbitrage confidence: HIGH/MEDIUM/LOW (for daily report)."""
-    title = item.get("title", "")
-    chip_info = item.get("chip_info", {})
-    physical = item.get("physical_retailers", [])
-    has_stock = item.get("has_stock_signal", False)
-    
-    # Apple chip detected
-    if chip_info.get("chip"):
-        # High confidence: chip + physical retailer + stock signal
-        if physical and has_stock:
-            return "HIGH"
-        # Low confidence: chip but no physical retailer or stock signal
-        if not physical or not has_stock:
-            return "LOW"
-    
-    # Medium confidence for other deals with merchants
-    if item.get("merchants"):
-        return "MEDIUM"
-    
-    return "LOW"
-
+    ctx, values = evaluate_rules(item)
+    return STACK_RULES.first("confidence", ctx, values)
 
 def deduplicate_items(items: list[dict]) -> list[dict]:
     """
     Remove duplicate deals based on normalized title OR link.
-    Keep the item with higher score (or first if no score).
+    Matches are transitive (A~B by title and B~C by link make one group).
+    Each group keeps its highest-scoring item (the first on ties, or the first
+    if no score), at the position where the group was first seen.
     """
-    seen_by_title = {}  # normalized_title -> item
-    seen_by_link = {}   # link -> item
+    parent = list(range(len(items)))  # union-find over item positions
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    first_by_title = {}  # normalized_title -> first position seen
+    first_by_link = {}   # link -> first position seen
+    for i, item in enumerate(items):
+        for seen, key in ((first_by_title, norm(item.get("title", "")).lower()), (first_by_link, item.get("link", ""))):
+            if not key:
+                continue
+            j = seen.setdefault(key, i)
+            if j != i:
+                a, b = find(i), find(j)
+                if a != b:
+                    # Root is the group's earliest item, so groups stay in first-seen order
+                    parent[max(a, b)] = min(a, b)
+
+    groups = {}
+    for i in range(len(items)):
+        groups.setdefault(find(i), []).append(i)
+
     result = []
-    
-    for item in items:
-        title_key = norm(item.get("title", "")).lower()
-        link_key = item.get("link", "")
-        
-        # Check if we've seen this title or link before
-        existing = None
-        if title_key and title_key in seen_by_title:
-            existing = seen_by_title[title_key]
-        elif link_key and link_key in seen_by_link:
-            existing = seen_by_link[link_key]
-        
-        if existing is None:
-            # New item - add it
-            result.append(item)
-            if title_key:
-                seen_by_title[title_key] = item
-            if link_key:
-                seen_by_link[link_key] = item
+    for members in groups.values():
+        if len(members) == 1:
+            result.append(items[members[0]])
         else:
-            # Duplicate found - compare scores
-            current_score = item.get("score", 0)
-            existing_score = existing.get("score", 0)
-            
-            if current_score > existing_score:
-                # Replace with higher scoring item
-                result.remove(existing)
-                result.append(item)
-                
-                # Update tracking dicts
-                old_title = norm(existing.get("title", "")).lower()
-                old_link = existing.get("link", "")
-                if old_title in seen_by_title:
-                    del seen_by_title[old_title]
-                if old_link in seen_by_link:
-                    del seen_by_link[old_link]
-                
-                if title_key:
-                    seen_by_title[title_key] = item
-                if link_key:
-                    seen_by_link[link_key] = item
-    
+            best = max(members, key=lambda i: (items[i].get("score", 0), -i))
+            result.append(items[best])
     return result
 
 
-# ---------- STACK REPORT ----------
-def build_stack_report() -> tuple[str, str]:
+# Titles at least this similar (Jaccard over word shingles) are the same promo
+NEAR_DUPLICATE_THRESHOLD = 0.6
+
+
+def merge_near_duplicates(items: list[dict]) -> list[dict]:
     """
-    Build Top 5 Stack Report.
-    Returns: (plain_text, html)
+    Collapse the same promo reworded on different sources (MinHash/LSH, see
+    near_duplicates.py). Only titles with the same multiplier, gift card
+    type, merchants and points program are compared, so the same promo at
+    another retailer is never merged away. Each cluster keeps its
+    highest-scoring item (the first on ties), at the cluster's first position,
+    with the other members' links recorded on it as `siblings`.
     """
-    today = dt.date.today().isoformat()
-    raw = fetch_freepoints_latest(15) + fetch_gcdb_latest(15) + fetch_ozbargain_frontpage(20) + fetch_costco_hotbuys()
+    keys = []
+    for it in items:
+        f = item_features(it)
+        keys.append((f.x, f.gc_type, merchant_mask(f.merchants), promo_program(f)))
+    clusters = cluster_titles([it.get("title", "") for it in items], keys, NEAR_DUPLICATE_THRESHOLD)
+
+    result = []
+    for members in clusters:
+        if len(members) == 1:
+            result.append(items[members[0]])
+            continue
+        best = max(members, key=lambda i: (items[i].get("score", 0), -i))
+        keep = items[best]
+        keep["siblings"] = tuple(items[i].get("link", "") for i in members if i != best)
+        result.append(keep)
+    return result
+
+
+# ---------- PRODUCT MATCHING ----------
+_PRODUCT_FAMILY = re.compile(
+    r"\b(macbook\s*pro|macbook\s*air|mac\s*mini|mac\s*studio|mac\s*pro|imac"
+    r"|ipad\s*pro|ipad\s*air|ipad\s*mini|ipad"
+    r"|iphone\s*\d+\s*(?:pro\s*max|pro|plus|mini)?|iphone"
+    r"|apple\s*watch\s*(?:ultra|series\s*\d+|se)?|airpods\s*(?:pro|max)?)",
+    re.IGNORECASE,
+)
+_STORAGE = re.compile(r"\b(\d+)\s*(gb|tb)\b", re.IGNORECASE)
+
+
+class ProductKey(NamedTuple):
+    family: str               # lowercase, spaces dropped: "macbookpro", "iphone16pro"
+    generation: int | None    # Apple silicon generation
+    tier: str                 # chip tier, as in ChipInfo
+    storage_gb: int | None    # largest capacity in the title (storage rather than RAM)
+
+
+@functools.lru_cache(maxsize=4096)
+def product_key(title) -> ProductKey | None:
+    """Normalised product identity of a title, or None when no product family is named."""
+    scan = scan_title(title)
+    m = _PRODUCT_FAMILY.search(scan.text)
+    if not m:
+        return None
+    family = "".join(m.group(1).lower().split())
+    sizes = [int(n) * (1024 if unit.lower() == "tb" else 1) for n, unit in _STORAGE.findall(scan.text)]
+    return ProductKey(family, scan.generation, scan.tier, max(sizes) if sizes else None)
+
+
+def match_across_retailers(items: list[dict]) -> dict[int, tuple[tuple[str, str], ...]]:
+    """
+    Hash join of this run's listings on product_key(): for each item position,
+    the (retailer, link) of the first listing of the same product at each
+    physical retailer the item itself doesn't name. One pass builds the index
+    and one reads it, so the cost grows linearly with the crawl.
+    """
+    index = {}  # product key -> [(position, retailers)]
+    for i, it in enumerate(items):
+        key = product_key(it.get("title", ""))
+        # Every family here is an Apple product, so "Apple" names the brand, not the store
+        retailers = [r for r in item_features(it).physical if r != "Apple"]
+        if key is not None and retailers:
+            index.setdefault(key, []).append((i, retailers))
+
+    matches = {}
+    for listings in index.values():
+        if len(listings) < 2:
+            continue
+        # First listing per retailer, so each item costs O(retailers), not O(listings)
+        by_retailer = {}
+        for j, retailers in listings:
+            for r in retailers:
+                by_retailer.setdefault(r, items[j].get("link", ""))
+        for i, own in listings:
+            found = tuple((r, link) for r, link in by_retailer.items() if r not in own)
+            if found:
+                matches[i] = found
+    return matches
+
+
+def cross_match_text(matches) -> str:
+    return ", ".join(f"{retailer} ({link})" for retailer, link in matches)
+
+
+# ---------- DELTA STATE ----------
+def load_run_state(name: str) -> dict:
+    """
+    Load the enriched items saved by the previous run of report `name`.
+    Returns {} if there is no usable state (missing, corrupt, or older rules).
+    """
+    path = os.path.join(STATE_DIR, f"{name}.json")
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if state.get("rules_version") != RULES_VERSION:
+        return {}
+    return state.get("items", {})
+
+
+def save_run_state(name: str, items: list[dict], fields: tuple[str, ...]):
+    """Save this run's enrichment for `name` so the next run can reuse it."""
+    state_items = {}
+    for it in items:
+        cached = {k: it[k] for k in fields if k in it}
+        cached["title"] = it.get("title", "")
+        state_items[delta_key(it)] = cached
+
+    path = os.path.join(STATE_DIR, f"{name}.json")
+    tmp = path + ".tmp"
+    try:
+        os.makedirs(STATE_DIR, exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"rules_version": RULES_VERSION, "items": state_items}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+    except OSError:
+        # The report is already built; the next run just enriches everything again
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def delta_key(item: dict) -> str:
+    """Identity of an item across runs: its source plus extracted link."""
+    return f"{item.get('source', '')}\t{item.get('link', '')}"
 
+
+def delta_enrich(items: list[dict], previous: dict, enrich, fields: tuple[str, ...],
+                 memo: EnrichmentMemo | None = None, workers: int = 1, inputs=None) -> tuple[list[dict], dict]:
+    """
+    Enrich only items that are new or changed since the previous run.
+    An item is unchanged when the same source still lists the same link with the
+    same title and the previous run saved all of `fields`; everything it saved
+    (including lazily computed text) is copied over instead of recomputed.
+    Changed items are then looked up by title in the cross-run `memo`; the rest
+    go through enrich_many() with `workers` processes.
+    `inputs(item)` optionally returns the run-level values enrichment depends on
+    besides the title (e.g. the promo tier); cached results are only reused if
+    they were saved with the same values.
+    Returns: (enriched_items, {"recomputed": n, "reused": n, "memo": n})
+    """
+    stats = {"recomputed": 0, "reused": 0, "memo": 0}
     enriched = []
-    for it in raw:
-        it["merchants"] = detect_merchants(it.get("title", ""))
-        it["cashback"] = detect_cashback(it.get("title", ""))
-        it["cashback_note"] = generate_cashback_note(it["cashback"])
-        it["hint"] = stack_hint(it.get("title", ""))
-        it["chip_info"] = detect_apple_chip(it.get("title", ""))
-        it["arbitrage"] = calculate_arbitrage(it)
-        it["why"] = why_stack_works(it)
-        it["recipe"] = generate_stack_recipe(it)
-        it["score"] = score_item(it)
-        
-        # Exclude Apple chip deals from Top 5 if they lack both physical retailer AND stock signal
-        title = it.get("title", "")
-        chip_info = it["chip_info"]
-        if chip_info.get("chip") is not None:
-            physical = detect_physical_retailers(title)
-            has_stock = detect_stock_signal(title)
-            if not (physical and has_stock):
-                it["exclude_from_top"] = True
-                it["exclude_reason"] = "Apple chip detected but no physical retailer/stock signal"
+    misses = []  # positions in `enriched` that still need enrich()
+
+    def usable(cached, expected):
+        return (cached is not None and all(k in cached for k in fields)
+                and all(cached[k] == v for k, v in expected))
+
+    for it in items:
+        expected = inputs(it).items() if inputs is not None else ()
+        cached = previous.get(delta_key(it))
+        if usable(cached, expected) and cached.get("title") == it.get("title", ""):
+            stats["reused"] += 1
+        else:
+            cached = memo.get(memo_key(it)) if memo is not None else None
+            if usable(cached, expected):
+                stats["memo"] += 1
             else:
-                it["exclude_from_top"] = False
-                it["exclude_reason"] = None
+                cached = None
+        if cached is not None:
+            it = type(it)(it)
+            it.update({k: v for k, v in cached.items() if k != "title"})
         else:
-            it["exclude_from_top"] = False
-            it["exclude_reason"] = None
-        
+            misses.append(len(enriched))
+            stats["recomputed"] += 1
         enriched.append(it)
+    fresh = enrich_many([enriched[i] for i in misses], enrich, fields, workers)
+    for i, it in zip(misses, fresh):
+        enriched[i] = it
+    return enriched, stats
 
-    # Deduplicate before selecting Top 5
-    enriched = deduplicate_items(enriched)
 
-    # Filter out excluded items before selecting Top 5
-    best_pool = [x for x in enriched if not x.get("exclude_from_top", False)]
-    if best_pool:
-        best = sorted(best_pool, key=lambda x: x.get("score", 0), reverse=True)[:5]
+def delta_summary(stats: dict) -> str:
+    return (f"Enrichment: {stats['recomputed']} recomputed, {stats['reused']} reused from previous run, "
+            f"{stats.get('memo', 0)} from memo")
+
+
+# ---------- PARALLEL ENRICHMENT ----------
+ENRICH_WORKERS = int(os.environ.get("DEAL_ENRICH_WORKERS", "1"))
+PARALLEL_MIN_TITLES = 512  # below this, starting a pool costs more than it saves
+
+
+def _enrich_titles(enrich, fields: tuple[str, ...], titles: list[str]) -> list[tuple]:
+    """Pool worker: enrich each title and return its `fields` as one tuple."""
+    rows = []
+    for title in titles:
+        it = enrich({"title": title})
+        rows.append(tuple(it[k] for k in fields))
+    return rows
+
+
+def enrich_many(items: list[dict], enrich, fields: tuple[str, ...], workers: int | None = None) -> list[dict]:
+    """
+    enrich() every item, spreading the distinct titles over `workers` processes
+    (default: all cores). Enrichment only depends on the title, so workers get
+    chunks of plain titles and send back one tuple of `fields` per title; the
+    values are set on copies of the input items, in input order.
+    Small batches and workers=1 run inline.
+    """
+    workers = workers or os.cpu_count() or 1
+    titles = list(dict.fromkeys(it.get("title", "") for it in items))
+    if workers <= 1 or len(titles) < PARALLEL_MIN_TITLES:
+        return [enrich(it) for it in items]
+
+    size = -(-len(titles) // (workers * 4))  # a few chunks per worker evens out slow ones
+    chunks = [titles[i:i + size] for i in range(0, len(titles), size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(functools.partial(_enrich_titles, enrich, fields), chunks)
+        rows = dict(zip(titles, (row for part in parts for row in part)))
+
+    out = []
+    for it in items:
+        it = type(it)(it)
+        it.update(zip(fields, rows[it.get("title", "")]))
+        out.append(it)
+    return out
+
+
+# ---------- ENRICHMENT MEMO ----------
+MEMO_MAX_ENTRIES = 50_000
+MEMO_MAX_AGE_DAYS = 30
+
+
+def memo_key(item: dict) -> str:
+    return norm(item.get("title", "")).lower()
+
+
+def open_memo(name: str) -> EnrichmentMemo | None:
+    """Cross-run memo for report `name` (keyed by rules version); None if unavailable."""
+    try:
+        os.makedirs(STATE_DIR, exist_ok=True)
+        return EnrichmentMemo(
+            os.path.join(STATE_DIR, "enrichment_memo.sqlite"),
+            namespace=f"{name}:{RULES_VERSION}",
+            max_entries=MEMO_MAX_ENTRIES,
+            max_age_days=MEMO_MAX_AGE_DAYS,
+        )
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def save_memo(memo: EnrichmentMemo | None, items: list[dict], fields: tuple[str, ...]):
+    """Store each item's computed `fields` under its title and close the memo."""
+    if memo is None:
+        return
+    try:
+        for it in items:
+            memo.put(memo_key(it), {k: it[k] for k in fields if k in it})
+        memo.close()
+    except sqlite3.Error:
+        pass  # Memo is an optimisation only
+
+
+# ---------- STACK REPORT ----------
+STACK_FIELDS = (
+    "merchants", "cashback", "chip_info", "exclude_from_top", "exclude_reason", "promo_tier",
+)
+
+# Computed on first access and cached on the item: arbitrage/score only for deals
+# that can still reach the Top 5 (see select_top), text only for rendered deals.
+LAZY_FIELDS = {
+    "arbitrage": calculate_arbitrage,
+    "score": score_item,
+    "hint": lambda it: stack_hint(it.get("title", "")),
+    "cashback_note": lambda it: generate_cashback_note(it.get("cashback")),
+    "why": why_stack_works,
+    "recipe": generate_stack_recipe,
+}
+
+
+class StackDeal(Deal):
+    """
+    Deal whose LAZY_FIELDS are filled in on first access.
+    Only rendered deals (Top 5 + excluded) pay for explanation/recipe text.
+    """
+
+    __slots__ = ()
+
+    def __missing__(self, key):
+        compute = LAZY_FIELDS.get(key)
+        if compute is None:
+            raise KeyError(key)
+        value = self[key] = compute(self)
+        return value
+
+
+def stack_inputs(it) -> dict:
+    """Run-level inputs of stack enrichment (see delta_enrich)."""
+    return {"promo_tier": promo_tier(item_features(it))}
+
+
+def enrich_stack_item(it) -> StackDeal:
+    """Compute the cheap stack-report fields for one raw item; LAZY_FIELDS stay lazy."""
+    it = StackDeal(it)
+    f = it["features"] = title_features(it.get("title", ""))
+    it["merchants"] = f.merchants
+    it["cashback"] = f.cashback
+    it["chip_info"] = f.chip_info
+    it["promo_tier"] = promo_tier(f)
+
+    # Exclude Apple chip deals from Top 5 if they lack both physical retailer AND stock signal
+    if f.chip is not None:
+        if not (f.physical and f.has_stock):
+            it["exclude_from_top"] = True
+            it["exclude_reason"] = "Apple chip detected but no physical retailer/stock signal"
+        else:
+            it["exclude_from_top"] = False
+            it["exclude_reason"] = None
     else:
-        # Fallback: use all enriched items if best_pool is empty
-        best = sorted(enriched, key=lambda x: x.get("score", 0), reverse=True)[:5]
+        it["exclude_from_top"] = False
+        it["exclude_reason"] = None
+
+    return it
+
+
+# Rule-context entries that depend on calculate_arbitrage()
+ARBITRAGE_KEYS = ("arb_eligible", "arb_confidence", "targets", "targets2")
+
+
+@functools.lru_cache(maxsize=4096)
+def score_upper_bound(f: TitleFeatures) -> float:
+    """Highest score a title can reach, whatever calculate_arbitrage() returns."""
+    ctx = rule_context(f)
+    return STACK_RULES.score_bound("score", STACK_RULES.predicate_values(ctx, unknown=ARBITRAGE_KEYS))
+
+
+def select_top(items: list[dict], k: int = 5) -> list[dict]:
+    """
+    Same result as sorted(items, key=score, reverse=True)[:k].
+    Items are visited in decreasing upper-bound order and scored on demand;
+    once no remaining bound can reach the current k-th best, the rest are
+    never scored (nor their arbitrage computed).
+    """
+    bounds = [score_upper_bound(item_features(it)) for it in items]
+    order = sorted(range(len(items)), key=lambda i: -bounds[i])
+    heap = []  # (score, -index) of the k best so far; heap[0] is the k-th best
+    for i in order:
+        if len(heap) == k and bounds[i] < heap[0][0]:
+            break
+        entry = (items[i].get("score", 0), -i)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+    return [items[-neg_i] for _, neg_i in sorted(heap, reverse=True)]
+
+
+class TopKRanker:
+    """
+    Streaming Top-K: a bounded min-heap of the k best non-excluded deals fed
+    so far, so memory stays O(k) however many deals are fed in. Each source's
+    batch is add()ed as soon as it is enriched, so a provisional Top k is
+    ready once the first sources land. A deal sharing a normalized title or
+    link with one already held only replaces it when it scores higher, and
+    deals whose score_upper_bound() cannot beat the current k-th best are
+    never scored.
+
+    Duplicate merging needs the whole run, so settle(pool) turns the heap into
+    the final Top k of the run's deduplicated, merged deals: held deals that
+    were merged away are dropped, ties are re-broken by position in `pool`,
+    and the rest of the pool is offered to the heap (pruned by the same
+    bound). The result equals select_top() over the pool's non-excluded deals.
+    """
+
+    def __init__(self, k: int = 5):
+        self.k = k
+        self._heap = []  # (score, -rank, title_key, link, item); heap[0] is the k-th best
+        self._seq = 0
+
+    def _offer(self, it, rank: int):
+        if it.get("exclude_from_top", False):
+            return
+        if len(self._heap) == self.k and score_upper_bound(item_features(it)) < self._heap[0][0]:
+            return
+        title_key = norm(it.get("title", "")).lower()
+        link = it.get("link", "")
+        entry = (it.get("score", 0), -rank, title_key, link, it)
+        held = next((e for e in self._heap if (title_key and e[2] == title_key) or (link and e[3] == link)), None)
+        if held is not None:
+            if entry[:2] > held[:2]:
+                self._heap.remove(held)
+                self._heap.append(entry)
+                heapq.heapify(self._heap)
+        elif len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def add(self, items):
+        """Feed one batch (e.g. a source's enriched deals); ties keep the deal fed first."""
+        for it in items:
+            self._offer(it, self._seq)
+            self._seq += 1
+
+    def settle(self, pool: list[dict]) -> list[dict]:
+        """Final Top k of `pool` (the run's deduplicated deals, each already fed or merged into one that was)."""
+        rank = {id(it): i for i, it in enumerate(pool)}
+        held = {id(e[-1]) for e in self._heap}
+        self._heap = [(e[0], -rank[id(e[-1])]) + e[2:] for e in self._heap if id(e[-1]) in rank]
+        heapq.heapify(self._heap)
+        for i, it in enumerate(pool):
+            if id(it) not in held:
+                self._offer(it, i)
+        self._seq = len(pool)
+        return self.top()
+
+    def top(self) -> list[dict]:
+        """Current best deals, highest score first."""
+        return [e[-1] for e in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+
+# ---------- BATCH SCORING ----------
+@functools.lru_cache(maxsize=1)
+def batch_scorer():
+    """The "score" rule table compiled to NumPy column operations (see batch_scoring.py)."""
+    from batch_scoring import BatchScorer  # numpy is only needed for bulk re-scoring
+    return BatchScorer(STACK_RULES, "score", {
+        "priority_merchants": PRIORITY_MERCHANTS,
+        "latest_generation": LATEST_KNOWN_GENERATION,
+    })
+
+
+def score_many(items):
+    """
+    score_item() for every item in one vectorised pass; returns a float64 array.
+    Only the context entries the "score" table reads are built, one column at a
+    time from each item's features and arbitrage, so no per-item rule context
+    or predicate evaluation happens. Without numpy this falls back to a list of
+    score_item() results.
+    """
+    try:
+        scorer = batch_scorer()
+    except ImportError:
+        return [score_item(it) for it in items]
+    rows = [(item_features(it), item_arbitrage(it) or NO_ARBITRAGE) for it in items]
+    return scorer.score(scorer.pack_columns({
+        name: [RULE_CONTEXT[name](f, arbitrage) for f, arbitrage in rows] for name in scorer.columns
+    }))
+
+
+# Stack report sources, in report order; fetched concurrently
+STACK_SOURCES = {
+    "FreePoints": lambda: fetch_freepoints_latest(15),
+    "GCDB": lambda: fetch_gcdb_latest(15),
+    "OzBargain": lambda: fetch_ozbargain_frontpage(20),
+    "Costco": lambda: fetch_costco_hotbuys(),
+}
+# High-yield sources: a provisional Top 5 is logged as soon as these have landed
+PROVISIONAL_SOURCES = ("FreePoints", "GCDB")
+
+
+def gather_stack_deals(previous: dict, memo: EnrichmentMemo | None = None):
+    """
+    Fetch and enrich the stack sources, feeding each into a TopKRanker, then
+    deduplicate. Reads run state / memo but writes nothing of its own.
+    Returns: (fetched, deduplicated, ranker, enrichment stats)
+    """
+    # Sources are fetched in parallel; only new/changed items are enriched, the
+    # rest reuse the previous run's results
+    refresh_promo_baselines()
+    delta_stats = {"recomputed": 0, "reused": 0, "memo": 0}
+
+    def enrich(items, workers):
+        batch, stats = delta_enrich(items, previous, enrich_stack_item, STACK_FIELDS, memo, workers, stack_inputs)
+        for key, count in stats.items():
+            delta_stats[key] += count
+        return batch
+
+    # Every enriched source feeds one bounded heap of the best deals so far
+    ranker = TopKRanker(5)
+    raw, batches = {}, {}
+    with ThreadPoolExecutor(max_workers=len(STACK_SOURCES)) as pool:
+        futures = {pool.submit(fetch): name for name, fetch in STACK_SOURCES.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            raw[name] = [StackDeal(it) for it in future.result()]
+            if name not in PROVISIONAL_SOURCES:
+                continue
+            # Enriched inline while other fetches run (no process pool alongside live fetch threads)
+            batches[name] = enrich(raw[name], 1)
+            ranker.add(batches[name])
+            if all(src in batches for src in PROVISIONAL_SOURCES):
+                provisional = "; ".join(f"[{x['score']}] {x['title']}" for x in ranker.top())
+                print(f"⏱️ Provisional Top 5 ({', '.join(PROVISIONAL_SOURCES)}): {provisional or 'none'}", file=sys.stderr)
+    # The remaining sources are enriched together, so at most one worker pool is started
+    pending = [name for name in STACK_SOURCES if name not in batches]
+    rest = enrich([it for name in pending for it in raw[name]], ENRICH_WORKERS)
+    for name in pending:
+        batches[name], rest = rest[:len(raw[name])], rest[len(raw[name]):]
+        ranker.add(batches[name])
+    fetched = [it for name in STACK_SOURCES for it in batches[name]]
+
+    # Same product listed at competing retailers in this run (run-level, so not cached per title)
+    for i, found in match_across_retailers(fetched).items():
+        fetched[i]["cross_matches"] = found
+
+    # Deduplicate (exact, then reworded copies of the same promo) before selecting Top 5
+    enriched = merge_near_duplicates(deduplicate_items(fetched))
+    return fetched, enriched, ranker, delta_stats
+
+
+def stack_deals() -> list[dict]:
+    """
+    The stack report's deduplicated deals without rendering or saving anything:
+    no run state, memo, promo baselines, history, snapshot or archived pages
+    (e.g. to route watchlists on a daily-only run).
+    """
+    global ARCHIVE_PAGES
+    archive, ARCHIVE_PAGES = ARCHIVE_PAGES, False
+    try:
+        return gather_stack_deals(load_run_state("stack"))[1]
+    finally:
+        ARCHIVE_PAGES = archive
+
+
+def build_stack_report(deals_out: list | None = None) -> tuple[str, str]:
+    """
+    Build Top 5 Stack Report.
+    If `deals_out` is given, the run's deduplicated deals are appended to it
+    (e.g. for subscription routing).
+    Returns: (plain_text, html)
+    """
+    today = dt.date.today().isoformat()
+    memo = open_memo("stack")
+    fetched, enriched, ranker, delta_stats = gather_stack_deals(load_run_state("stack"), memo)
+    if deals_out is not None:
+        deals_out.extend(enriched)
+
+    # Final Top 5 from the heap, once merging has settled which deals remain;
+    # if every deal is excluded, rank them all instead
+    best = ranker.settle(enriched) or select_top(enriched, 5)
 
     # ----- PLAIN TEXT -----
     lines = [f"🏆 Best Stacks Today — {today}", ""]
@@ -603,6 +1431,10 @@ def build_stack_report() -> tuple[str, str]:
         lines.append(f"{i}. [{x['score']}] {x['title']}")
         lines.append(f"   Merchants: {', '.join(x.get('merchants', []))}{cb}")
         lines.append(f"   {x['link']}")
+        if x.get("siblings"):
+            lines.append(f"   Also listed: {', '.join(x['siblings'])}")
+        if x.get("cross_matches"):
+            lines.append(f"   Same product this run at: {cross_match_text(x['cross_matches'])}")
         if x.get("hint"):
             lines.append(f"   Hint: {x['hint']}")
         if x.get("cashback_note"):
@@ -626,8 +1458,12 @@ def build_stack_report() -> tuple[str, str]:
             lines.append(f"{i}. {x['title']}")
             lines.append(f"   {x['link']}")
             lines.append(f"   Reason: {reason}")
+            if x.get("cross_matches"):
+                lines.append(f"   Same product this run at: {cross_match_text(x['cross_matches'])}")
             lines.append("")
 
+    lines.append(delta_summary(delta_stats))
+
     plain = "\n".join(lines)
 
     # ----- HTML -----
@@ -642,6 +1478,7 @@ def build_stack_report() -> tuple[str, str]:
         cashback_note = x.get("cashback_note", "")
         why = x.get("why", "")
         recipe = x.get("recipe", [])
+        siblings_html = ", ".join(f"<a href='{esc(link)}' style='color:#1155cc;'>{esc(link)}</a>" for link in x.get("siblings", ()))
         
         # Build recipe HTML
         recipe_html = ""
@@ -667,6 +1504,8 @@ def build_stack_report() -> tuple[str, str]:
             <div style="margin-top:4px;color:#555;font-size:12px;">
               Merchants: {esc(merchants)}
               {f"<br>Cashback: {esc(cashback)}" if cashback else ""}
+              {f"<br>Also listed: {siblings_html}" if siblings_html else ""}
+              {f"<br>Same product this run at: {esc(cross_match_text(x['cross_matches']))}" if x.get("cross_matches") else ""}
             </div>
             {f"<div style='margin-top:6px;color:#333;font-size:12px;'><b>Hint:</b> {esc(hint)}</div>" if hint else ""}
             {f"<div style='margin-top:6px;padding:6px 8px;background:#fff3cd;border-left:3px solid #ffc107;border-radius:3px;color:#856404;font-size:11px;'>{esc(cashback_note)}</div>" if cashback_note else ""}
@@ -683,7 +1522,8 @@ def build_stack_report() -> tuple[str, str]:
         excluded_rows = ""
         for i, x in enumerate(excluded_items, 1):
             reason = esc(x.get("exclude_reason", "Unknown reason"))
-            excluded_rows += f"<div style='margin:4px 0;font-size:12px;'>{i}. <a href='{esc(x.get('link',''))}' style='color:#1155cc;text-decoration:none;'>{esc(x.get('title',''))}</a> — <span style='color:#666;'>{reason}</span></div>"
+            cross = f"<br><span style='color:#1f6f43;'>Same product this run at: {esc(cross_match_text(x['cross_matches']))}</span>" if x.get("cross_matches") else ""
+            excluded_rows += f"<div style='margin:4px 0;font-size:12px;'>{i}. <a href='{esc(x.get('link',''))}' style='color:#1155cc;text-decoration:none;'>{esc(x.get('title',''))}</a> — <span style='color:#666;'>{reason}</span>{cross}</div>"
         
         excluded_html = f"""
         <div style="margin:10px 0;padding:12px;border:1px solid #ffc107;border-radius:6px;background:#fff8e1;">
@@ -700,12 +1540,84 @@ def build_stack_report() -> tuple[str, str]:
         {rows}
       </table>
       {excluded_html}
+      <div style="margin-top:8px;color:#999;font-size:11px;">{esc(delta_summary(delta_stats))}</div>
     </div>
     """
+
+    # Saved after rendering so lazily computed text is reused next run too
+    save_run_state("stack", fetched, STACK_FIELDS + tuple(LAZY_FIELDS))
+    save_memo(memo, fetched, STACK_FIELDS + tuple(LAZY_FIELDS))
+    update_promo_baselines(enriched, [delta_key(it) for it in fetched])
+    record_history(enriched)
+    save_snapshot("stack", enriched)
     
     return plain, html
 
 
+# ---------- DAILY REPORT ----------
+DAILY_FIELDS = (
+    "merchants", "cashback", "cashback_note", "hint", "chip_info", "physical_retailers",
+    "has_stock_signal", "is_apple", "confidence", "excluded_from_main",
+)
+
+
+def enrich_daily_item(it) -> Deal:
+    """Compute all daily-report fields for one raw item (returns a new Deal)."""
+    f = title_features(it["title"])
+    merch = f.merchants
+    cashback = f.cashback
+    hint = stack_hint(f.title)
+    
+    # Apple chip detection and analysis
+    chip_info = f.chip_info
+    physical = f.physical
+    has_stock = f.has_stock
+    is_apple = f.chip is not None
+    
+    # Build enriched item
+    enriched_item = Deal(
+        it,
+        features=f,
+        merchants=merch,
+        cashback=cashback,
+        cashback_note=generate_cashback_note(cashback),
+        hint=hint,
+        chip_info=chip_info,
+        physical_retailers=physical,
+        has_stock_signal=has_stock,
+        is_apple=is_apple,
+    )
+    
+    # Calculate confidence
+    confidence = calculate_confidence(enriched_item)
+    enriched_item["confidence"] = confidence
+    
+    # Enhanced hints for Apple chip deals
+    if is_apple:
+        chip = chip_info.chip
+        tier = chip_info.tier
+        hints_list = [hint] if hint else []
+        
+        if physical and has_stock:
+            hints_list.append(f"💎 HIGH CONFIDENCE: {chip} deal at physical retailer ({', '.join(physical)}) with stock/C&C. Consider price match/beat at competing stores.")
+        elif not physical or not has_stock:
+            hints_list.append(f"⚠️ LOW CONFIDENCE: {chip} deal lacks physical retailer or stock/C&C signals. Arbitrage risk high—verify availability before stacking.")
+        
+        # Tier-specific hints
+        if tier in ["pro", "max", "ultra"]:
+            hints_list.append(f"Higher-tier chip ({tier.upper()}) detected—premiums typically 20-40% over base. Price match becomes more valuable.")
+        
+        enriched_item["hint"] = " ".join(hints_list)
+    
+    # Filter out LOW confidence Apple deals from main list (they'll be shown separately)
+    if is_apple and confidence == "LOW":
+        enriched_item["excluded_from_main"] = True
+    else:
+        enriched_item["excluded_from_main"] = False
+
+    return enriched_item
+
+
 def build_daily_report() -> tuple[str, str]:
     """
     Build comprehensive Daily Deal Report.
@@ -713,71 +1625,26 @@ def build_daily_report() -> tuple[str, str]:
     """
     today = dt.datetime.now().strftime("%Y-%m-%d")
     
-    trending = fetch_ozbargain_trending(10)
+    trending = rank_trending(fetch_ozbargain_trending(10))
 
     all_items = []
     all_items += fetch_freepoints_latest(10)
     all_items += fetch_gcdb_latest(10)
     all_items += fetch_ozbargain_frontpage(20)
     all_items += fetch_costco_hotbuys()
+    all_items = [Deal(it) for it in all_items]
 
-    enriched = []
-    for it in all_items:
-        title = it["title"]
-        merch = detect_merchants(title)
-        cashback = detect_cashback(title)
-        hint = stack_hint(title)
-        
-        # Apple chip detection and analysis
-        chip_info = detect_apple_chip(title)
-        physical = detect_physical_retailers(title)
-        has_stock = detect_stock_signal(title)
-        is_apple = chip_info.get("chip") is not None
-        
-        # Build enriched item
-        enriched_item = {
-            **it,
-            "merchants": merch,
-            "cashback": cashback,
-            "cashback_note": generate_cashback_note(cashback),
-            "hint": hint,
-            "chip_info": chip_info,
-            "physical_retailers": physical,
-            "has_stock_signal": has_stock,
-            "is_apple": is_apple,
-        }
-        
-        # Calculate confidence
-        confidence = calculate_confidence(enriched_item)
-        enriched_item["confidence"] = confidence
-        
-        # Enhanced hints for Apple chip deals
-        if is_apple:
-            chip = chip_info.get("chip")
-            tier = chip_info.get("tier")
-            hints_list = [hint] if hint else []
-            
-            if physical and has_stock:
-                hints_list.append(f"💎 HIGH CONFIDENCE: {chip} deal at physical retailer ({', '.join(physical)}) with stock/C&C. Consider price match/beat at competing stores.")
-            elif not physical or not has_stock:
-                hints_list.append(f"⚠️ LOW CONFIDENCE: {chip} deal lacks physical retailer or stock/C&C signals. Arbitrage risk high—verify availability before stacking.")
-            
-            # Tier-specific hints
-            if tier in ["pro", "max", "ultra"]:
-                hints_list.append(f"Higher-tier chip ({tier.upper()}) detected—premiums typically 20-40% over base. Price match becomes more valuable.")
-            
-            enriched_item["hint"] = " ".join(hints_list)
-        
-        # Filter out LOW confidence Apple deals from main list (they'll be shown separately)
-        if is_apple and confidence == "LOW":
-            enriched_item["excluded_from_main"] = True
-        else:
-            enriched_item["excluded_from_main"] = False
-        
-        enriched.append(enriched_item)
+    # Only new/changed items are enriched; the rest reuse the previous run's results
+    memo = open_memo("daily")
+    enriched, delta_stats = delta_enrich(all_items, load_run_state("daily"), enrich_daily_item, DAILY_FIELDS, memo,
+                                         ENRICH_WORKERS)
+    save_run_state("daily", enriched, DAILY_FIELDS)
+    save_memo(memo, enriched, DAILY_FIELDS)
 
     # Deduplicate across all sources
     enriched = deduplicate_items(enriched)
+    record_history(enriched)
+    save_snapshot("daily", enriched)
 
     source_rank = {"FreePoints": 0, "GCDB": 1, "OzBargain": 2}
     enriched.sort(key=lambda x: (source_rank.get(x["source"], 9), x["title"].lower()))
@@ -801,7 +1668,7 @@ def build_daily_report() -> tuple[str, str]:
             chip_info = x.get("chip_info", {})
             chip_txt = ""
             if chip_info.get("chip"):
-                chip = chip_info["chip"]
+                chip = chip_info.get("chip")
                 conf = x.get("confidence", "UNKNOWN")
                 chip_txt = f" | Apple Chip: {chip} | Confidence: {conf}"
             
@@ -822,11 +1689,12 @@ def build_daily_report() -> tuple[str, str]:
         sections.append("")
 
     sections.append("🔥 OzBargain Trending (Top 10)")
-    sections.append("Hot deals right now (from /hot).")
+    sections.append("Hot deals right now (from /hot), deals rising since the last run first.")
     sections.append("")
     if trending:
         for i, d in enumerate(trending, 1):
-            sections.append(f"{i}. {d['title']}\n    {d['link']}")
+            label = trend_label(d)
+            sections.append(f"{i}. {label + ' | ' if label else ''}{d['title']}\n    {d['link']}")
     else:
         sections.append("No trending deals found today.")
     sections.append("")
@@ -838,6 +1706,7 @@ def build_daily_report() -> tuple[str, str]:
         "3) If buying online via cashback portal, confirm portal terms allow gift-card/account-balance payments.\n"
         "4) If portal excludes gift-card payments, you still keep the base points return.\n"
     )
+    sections.append(delta_summary(delta_stats))
 
     plain = "\n".join(sections)
 
@@ -902,7 +1771,7 @@ def build_daily_report() -> tuple[str, str]:
             if chip_info.get("chip"):
                 conf = x.get("confidence", "UNKNOWN")
                 badge_color = {"HIGH": "#28a745", "MEDIUM": "#ffc107", "LOW": "#dc3545"}.get(conf, "#6c757d")
-                meta_parts.append(f"<span style='background:{badge_color};color:#fff;padding:2px 6px;border-radius:3px;font-size:11px;font-weight:700;'>{conf}</span> Apple Chip: {esc(chip_info['chip'])}")
+                meta_parts.append(f"<span style='background:{badge_color};color:#fff;padding:2px 6px;border-radius:3px;font-size:11px;font-weight:700;'>{conf}</span> Apple Chip: {esc(chip_info.get('chip'))}")
             
             meta = " | ".join(meta_parts)
             
@@ -929,8 +1798,9 @@ def build_daily_report() -> tuple[str, str]:
 
     rows = ""
     for i, d in enumerate(trending[:10], 1):
-        rows += row(i, d["title"], d["link"])
-    html_sections.append(card("🔥 OzBargain Trending", "Hot deals right now (/hot)", deal_table(rows)))
+        label = trend_label(d)
+        rows += row(i, d["title"], d["link"], meta=label)
+    html_sections.append(card("🔥 OzBargain Trending", "Hot deals right now (/hot), risers since the last run first", deal_table(rows)))
 
     playbook = """
     <ol style="margin:10px 0 0 18px;color:#333;font-size:13px;line-height:18px;">
@@ -945,15 +1815,17 @@ def build_daily_report() -> tuple[str, str]:
     html_fragment = f"""
     <div style="margin:20px 0;padding:16px;border:1px solid #ddd;border-radius:8px;background:#fff;">
       {''.join(html_sections)}
+      <div style="margin-top:8px;color:#999;font-size:11px;">{esc(delta_summary(delta_stats))}</div>
     </div>
     """
     
     return plain, html_fragment
 
 
-def build_combined_report() -> tuple[str, str]:
+def build_combined_report(deals_out: list | None = None) -> tuple[str, str]:
     """
     Build combined report with both stack and daily reports.
+    `deals_out` is passed on to build_stack_report().
     Returns: (plain_text, html)
     """
     today = dt.datetime.now().strftime("%Y-%m-%d")
@@ -963,7 +1835,7 @@ def build_combined_report() -> tuple[str, str]:
     stack_html = None
     stack_error = None
     try:
-        stack_plain, stack_html = build_stack_report()
+        stack_plain, stack_html = build_stack_report(deals_out)
     except Exception as e:
         stack_error = str(e)
         stack_plain = f"⚠️ Stack report failed: {stack_error}"
@@ -1052,13 +1924,242 @@ def build_combined_report() -> tuple[str, str]:
     return plain, html
 
 
-def send_email(subject: str, body: str, html_body: str | None = None):
-    """Send email via SMTP."""
+# ---------- DEAL HISTORY ----------
+HISTORY_FILE = "deal_history.sqlite"
+SNAPSHOT_DIR = "snapshots"
+SNAPSHOT_MAX_RUNS = 365  # per report; older snapshots are deleted
+STAT_LABELS = {"source": "source", "merchant": "merchant", "gc_type": "gift card", "bucket": "multiplier",
+               "confidence": "arbitrage"}
+
+
+def open_history() -> DealHistory:
+    os.makedirs(STATE_DIR, exist_ok=True)
+    return DealHistory(os.path.join(STATE_DIR, HISTORY_FILE))
+
+
+def recorded_arbitrage(it) -> Arbitrage | None:
+    """
+    Arbitrage to record for a deal: the item's own if computed, else (stack
+    deals only) calculate_arbitrage(), which needs no score and isn't cached
+    on the item. None for daily-report deals, which have no arbitrage.
+    """
+    if "arbitrage" in it:
+        return item_arbitrage(it) or NO_ARBITRAGE
+    if isinstance(it, StackDeal):
+        return calculate_arbitrage(it)
+    return None
+
+
+def history_row(it) -> dict:
+    """
+    History/snapshot fields of a deal. A score is only read when already set,
+    so recording a run never scores deals select_top skipped; a missing score
+    or confidence is stored as None (the history keeps older values).
+    """
+    f = item_features(it)
+    arbitrage = recorded_arbitrage(it)
+    return {
+        "source": it.get("source", ""), "title": it.get("title", ""), "link": it.get("link", ""),
+        "merchants": f.merchants, "chip": f.chip, "gc_type": f.gc_type, "multiplier": f.x,
+        "score": it["score"] if "score" in it else None,
+        "confidence": arbitrage.confidence if arbitrage else None,
+    }
+
+
+def record_history(deals: list[dict]):
+    """Add this run's deduplicated deals (with their scores, if any) to the history as one batch."""
+    try:
+        history = open_history()
+        try:
+            history.record(dt.date.today().isoformat(), [history_row(it) for it in deals], RULES_VERSION)
+        finally:
+            history.close()
+    except (OSError, sqlite3.Error):
+        pass  # History is a convenience; the report doesn't depend on it
+
+
+def snapshot_path(name: str) -> str:
+    """This run's snapshot file for report `name` ("stack-2026-01-31T07-00-00.dcol")."""
+    return os.path.join(STATE_DIR, SNAPSHOT_DIR, f"{name}-{run_started().replace(':', '-')}.dcol")
+
+
+def save_snapshot(name: str, deals: list[dict]):
+    """
+    Write this run's deduplicated deals as a columnar snapshot for report
+    `name`, keeping the latest SNAPSHOT_MAX_RUNS.
+    """
+    rows = []
+    for it in deals:
+        row = history_row(it)
+        arbitrage = recorded_arbitrage(it) or NO_ARBITRAGE
+        row["flags"] = {
+            "excluded": it.get("excluded_from_main"), "top_excluded": it.get("exclude_from_top"),
+            "arbitrage": arbitrage.eligible, "apple": it.get("is_apple"),
+            "in_stock": it.get("has_stock_signal"),
+        }
+        rows.append(row)
+    try:
+        write_snapshot(snapshot_path(name), rows)
+        for path in snapshot_paths(name)[:-SNAPSHOT_MAX_RUNS]:
+            os.remove(path)
+    except OSError:
+        pass  # Snapshots are for later analysis; the report doesn't depend on them
+
+
+def snapshot_paths(name: str) -> list[str]:
+    """Saved snapshots of report `name`, one per run, oldest first."""
+    folder = os.path.join(STATE_DIR, SNAPSHOT_DIR)
+    try:
+        files = os.listdir(folder)
+    except OSError:
+        return []
+    return [os.path.join(folder, f) for f in sorted(files) if f.startswith(f"{name}-") and f.endswith(".dcol")]
+
+
+def format_search_results(rows, query: str) -> str:
+    lines = [f"🔎 {len(rows)} result(s) for {query!r}" if query else f"🔎 {len(rows)} result(s)", ""]
+    for r in rows:
+        score = f"[{r['score']:g}] " if r["score"] is not None else ""
+        lines.append(f"{r['last_seen']}  {score}{r['source']}  {r['title']}")
+        details = [r["link"] or "(no link)"]
+        if r["merchants"]:
+            details.append(r["merchants"])
+        if r["first_seen"] != r["last_seen"]:
+            details.append(f"first seen {r['first_seen']}, seen on {r['times_seen']} days")
+        lines.append(f"            {' | '.join(details)}")
+    return "\n".join(lines)
+
+
+def format_stats(rows, by: tuple[str, ...], per: str) -> str:
+    columns = ([] if per == "all" else [per]) + [STAT_LABELS[d] for d in by] + ["deals"]
+    table = [[r["period"]] * (per != "all") + [r[d] or "-" for d in by] + [str(r["deals"])] for r in rows]
+    widths = [max(len(row[i]) for row in [columns, *table]) for i in range(len(columns))]
+    lines = [f"📊 Deal counts{' per ' + per if per != 'all' else ''}"
+             + (f" by {', '.join(STAT_LABELS[d] for d in by)}" if by else ""), ""]
+    for row in [columns, *table]:
+        lines.append("  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip())
+    if not table:
+        lines.append("(no deals recorded)")
+    return "\n".join(lines)
+
+
+# ---------- RE-EXTRACTION ----------
+# Archived pages are replayed through the current EXTRACTORS without network
+# access; each distinct (URL, body) is parsed once, in a process pool.
+def _extract_archived(root: str, url: str, digest: str) -> list[dict] | None:
+    """Current extractor for `url` run on one archived body (None if the body is missing)."""
+    try:
+        html = PageArchive(root).get(digest)
+    except (KeyError, OSError, zlib.error):
+        return None
+    return EXTRACTORS[url][1](html, None)
+
+
+def reextract_archive(since: str | None = None, sources=None,
+                      workers: int | None = None) -> tuple[list[tuple[str, str, list | None]], int]:
+    """
+    Replay archived pages through the current extractors, without fetching
+    anything. Each distinct (URL, body) is parsed once, spread over `workers`
+    processes (default: all cores), and extractors return every match (no
+    per-source limit).
+    Returns: ([(run, source name, items or None), ...] oldest run first, bodies parsed)
+    """
+    archive = page_archive()
+    entries = [(run, url, digest) for run, url, digest in archive.entries(since)
+               if url in EXTRACTORS and (not sources or EXTRACTORS[url][0] in sources)]
+    jobs = list(dict.fromkeys((url, digest) for _, url, digest in entries))
+    workers = workers or os.cpu_count() or 1
+    extract = functools.partial(_extract_archived, archive.root)
+    if workers <= 1 or len(jobs) < 2:
+        results = [extract(url, digest) for url, digest in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(extract, *zip(*jobs)))
+    parsed = dict(zip(jobs, results))
+    return [(run, EXTRACTORS[url][0], parsed[url, digest]) for run, url, digest in entries], len(jobs)
+
+
+def format_reextract(results, bodies: int, verbose: bool = False) -> str:
+    by_run = {}
+    for run, name, items in results:
+        by_run.setdefault(run, []).append((name, items))
+    lines = [f"📦 Re-extracted {len(results)} archived page(s) from {len(by_run)} run(s) "
+             f"({bodies} distinct bodies parsed)", ""]
+    for run, pages in by_run.items():
+        lines.append(run)
+        for name, items in pages:
+            if items is None:
+                lines.append(f"   {name}: archived body missing")
+                continue
+            lines.append(f"   {name}: {len(items)} deal(s)")
+            if verbose:
+                lines.extend(f"      - {it['title']} | {it['link']}" for it in items)
+    return "\n".join(lines)
+
+
+# ---------- SUBSCRIPTIONS ----------
+def route_subscriptions(index: SubscriptionIndex, deals: list[dict]) -> dict[str, list[tuple[dict, list]]]:
+    """
+    {subscriber name: [(deal, matching watches), ...]} with each subscriber's
+    scored deals best first, then the rest in routing order. Scores are only
+    computed for deals a watch with a min_score has matched on every other clause.
+    """
+    routed = {name: [] for name in index.subscribers}
+    for it in deals:
+        f = item_features(it)
+        by_subscriber = {}
+        for watch in index.match(f.title, f.merchants, f.gc_type, lambda: it["score"]):
+            by_subscriber.setdefault(watch.subscriber, []).append(watch)
+        for name, watches in by_subscriber.items():
+            routed[name].append((it, watches))
+    for matches in routed.values():
+        matches.sort(key=lambda m: (0, -m[0]["score"]) if "score" in m[0] else (1, 0))
+    return routed
+
+
+def build_subscriber_report(name: str, matches: list[tuple[dict, list]]) -> tuple[str, str]:
+    """Personal watchlist email for one subscriber. Returns: (plain_text, html)"""
+    today = dt.date.today().isoformat()
+    esc = html_lib.escape
+    lines = [f"🔔 Watchlist matches for {name} — {today}", ""]
+    rows = ""
+    for i, (x, watches) in enumerate(matches, 1):
+        matched = "; ".join(w.describe() for w in watches)
+        score = f"[{x['score']}] " if "score" in x else ""
+        lines.append(f"{i}. {score}{x['title']}")
+        lines.append(f"   {x.get('link', '')}")
+        lines.append(f"   Matched: {matched}")
+        lines.append("")
+        rows += f"""
+        <tr>
+          <td style="padding:8px 10px;vertical-align:top;color:#666;">{i}.</td>
+          <td style="padding:8px 10px;">
+            <div style="font-size:14px;line-height:20px;">
+              {f"<b>[{esc(str(x['score']))}]</b>" if "score" in x else ""}
+              <a href="{esc(x.get('link', ''))}">{esc(x.get('title', ''))}</a>
+            </div>
+            <div style="margin-top:4px;color:#555;font-size:12px;">Matched: {esc(matched)}</div>
+          </td>
+        </tr>
+        """
+    html = f"""
+    <div style="margin:20px 0;padding:16px;border:2px solid #4a90e2;border-radius:8px;background:#f0f8ff;">
+      <h2 style="margin:0 0 10px 0;color:#2c5aa0;">🔔 Watchlist matches for {esc(name)} — {esc(today)}</h2>
+      <table width="100%" cellpadding="0" cellspacing="0" style="border-collapse:collapse;background:#fff;border-radius:6px;">
+        {rows}
+      </table>
+    </div>
+    """
+    return "\n".join(lines), html
+
+
+def send_email(subject: str, body: str, html_body: str | None = None, to: str | None = None):
+    """Send email via SMTP (to MAIL_TO unless `to` is given)."""
     smtp_host = os.environ.get("SMTP_HOST")
     smtp_port = int(os.environ.get("SMTP_PORT", "465"))
     smtp_user = os.environ.get("SMTP_USER")
     smtp_pass = os.environ.get("SMTP_PASS")
-    mail_to = os.environ.get("MAIL_TO")
+    mail_to = to or os.environ.get("MAIL_TO")
 
     # Clean password
     smtp_pass = (smtp_pass or "").replace("\xa0", "")
@@ -1110,32 +2211,112 @@ def main():
         action="store_true",
         help="Skip email sending (useful with --print)"
     )
+    parser.add_argument(
+        "--subscriptions",
+        metavar="FILE",
+        help="Also send each subscriber in this JSON file the stack deals matching their watchlist"
+    )
+    commands = parser.add_subparsers(dest="command")
+    search = commands.add_parser("search", help="Search the history of deals seen by past runs")
+    search.add_argument("query", nargs="*", help="Words that must all appear (stemmed, any order)")
+    search.add_argument("--source", help="Only deals from this source (e.g. GCDB)")
+    search.add_argument("--merchant", help="Only deals naming this merchant")
+    search.add_argument("--chip", help="Only deals with this Apple chip (e.g. \"M4 Pro\")")
+    search.add_argument("--min-score", type=float, help="Only deals scoring at least this")
+    search.add_argument("--recent", action="store_true", help="Most recently seen first instead of best match")
+    search.add_argument("--limit", type=int, default=20, help="Maximum results (default: 20)")
+    stats = commands.add_parser("stats", help="Count past deals from the per-day rollups")
+    stats.add_argument("--by", nargs="+", choices=DIMENSIONS, default=[], help="Dimensions to group by")
+    stats.add_argument("--per", choices=GRAINS, default="all", help="Also group by day or month (default: all time)")
+    stats.add_argument("--since", metavar="DATE", help="First day or month counted with --per (e.g. 2026-01)")
+    stats.add_argument("--source", help="Only deals from this source")
+    stats.add_argument("--merchant", help="Only deals naming this merchant")
+    stats.add_argument("--gc-type", choices=list(GIFT_CARD_ACCEPTANCE), help="Only this gift card type")
+    stats.add_argument("--bucket", choices=[name for _, name in MULTIPLIER_BUCKETS] + ["none"],
+                       help="Only this points multiplier bucket")
+    stats.add_argument("--confidence", choices=["high", "medium", "low", "none", "unknown"],
+                       help="Only this arbitrage confidence (unknown: never computed)")
+    stats.add_argument("--limit", type=int, help="Maximum rows")
+    reextract = commands.add_parser("reextract", help="Re-run the current extractors on archived pages (no network)")
+    reextract.add_argument("--since", metavar="DATE", help="Only runs from this date or time on (e.g. 2026-01-01)")
+    reextract.add_argument("--source", action="append", choices=[name for name, _ in EXTRACTORS.values()],
+                           help="Only this source's pages (repeatable)")
+    reextract.add_argument("--workers", type=int, help="Parser processes (default: all cores)")
+    reextract.add_argument("--verbose", action="store_true", help="List every extracted deal")
     
     args = parser.parse_args()
     
+    if args.command == "search":
+        query = " ".join(args.query)
+        history = open_history()
+        try:
+            rows = history.search(query, source=args.source, merchant=args.merchant, chip=args.chip,
+                                  min_score=args.min_score, limit=args.limit, recent=args.recent)
+        finally:
+            history.close()
+        print(format_search_results(rows, query))
+        return
+    if args.command == "stats":
+        by = tuple(dict.fromkeys(args.by))
+        history = open_history()
+        try:
+            rows = history.stats(by, per=args.per, since=args.since, limit=args.limit, source=args.source,
+                                 merchant=args.merchant, gc_type=args.gc_type, bucket=args.bucket,
+                                 confidence=args.confidence)
+        finally:
+            history.close()
+        print(format_stats(rows, by, args.per))
+        return
+    if args.command == "reextract":
+        results, bodies = reextract_archive(args.since, args.source, args.workers)
+        print(format_reextract(results, bodies, args.verbose))
+        return
+    subscriptions = load_subscriptions(args.subscriptions) if args.subscriptions else None
+    deals = [] if subscriptions else None
+    
     # Build the requested report
     if args.mode == "stack":
-        plain, html = build_stack_report()
+        plain, html = build_stack_report(deals)
         subject = "Top 5 Stack Report"
     elif args.mode == "daily":
         plain, html = build_daily_report()
         subject = "Daily Deal Feed"
+        if subscriptions:
+            deals = stack_deals()  # watchlists are matched against stack deals, without a stack run's side effects
     else:  # combined
-        plain, html = build_combined_report()
+        plain, html = build_combined_report(deals)
         subject = "Combined Daily Deal Report"
+    prune_page_archive()
+    
+    personal = []
+    if subscriptions:
+        for name, matches in route_subscriptions(subscriptions, deals).items():
+            if matches:
+                personal.append((subscriptions.subscribers[name], len(matches), *build_subscriber_report(name, matches)))
     
     # Output handling
     if args.print:
         print(plain)
+        for _, _, sub_plain, _ in personal:
+            print("\n" + "=" * 80 + "\n")
+            print(sub_plain)
         return
     
     if args.no_email:
         print(f"✅ Generated {args.mode} report (email sending skipped)")
+        if subscriptions:
+            print(f"✅ {len(personal)} subscriber(s) with watchlist matches (email sending skipped)")
         return
     
     # Send email
     send_email(subject, plain, html)
     print(f"✅ Sent {args.mode} report email.")
+    for sub, count, sub_plain, sub_html in personal:
+        if not sub.get("email"):
+            print(f"⚠️ No email for subscriber {sub['name']}, watchlist not sent")
+            continue
+        send_email(f"Deal watchlist: {count} match(es)", sub_plain, sub_html, to=sub["email"])
+        print(f"✅ Sent watchlist email to {sub['name']}.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Searchable history of the deals seen by every report run.
+
+Tables:
+    deals      one row per deal (its link, or its title when it has none) with
+               the latest title / score and first / last seen dates, plus
+               64-bit hashes of the link and of the normalized title
+    sightings  (deal, day, source) for every run a deal showed up in
+    scores     (deal, day) -> score and the rules version that produced it
+    rollups    deal counts per day / month / all time by source, merchant,
+               gift card type, multiplier bucket and arbitrage confidence
+
+The database runs in WAL mode and each run is written as a few batched
+statements in one transaction. The schema version is kept in PRAGMA
+user_version; files from older versions are upgraded in place on open. "First seen" and "times seen" are answered
+from the sightings primary key alone (WITHOUT ROWID), and deals are found by
+link or reworded-repost title through the hash indexes.
+
+An FTS5 index over title and merchants (external content, kept in sync by
+triggers) answers text queries such as "20x ultimate" or "m4 pro" with bm25
+ranking, combined with plain column filters on source, chip and score.
+
+Rollups are updated in the same transaction as the sightings: a deal counts
+once for each day, month and all time it is seen in, under merchant "*" and
+under each merchant it names. Questions like "20x promos per month by card
+type" or "which merchant most often has high-confidence arbitrage" then read
+a bounded number of rollup rows instead of scanning the history;
+rebuild_rollups() recounts them all from the sightings.
+"""
+import re
+import hashlib
+import sqlite3
+from collections import Counter
+
+SCHEMA_VERSION = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deals (
+    id         INTEGER PRIMARY KEY,
+    key        TEXT NOT NULL UNIQUE,
+    link       TEXT NOT NULL,
+    source     TEXT NOT NULL,
+    title      TEXT NOT NULL,
+    merchants  TEXT NOT NULL,
+    chip       TEXT,
+    gc_type    TEXT,
+    multiplier INTEGER,
+    score      REAL,
+    first_seen TEXT NOT NULL,
+    last_seen  TEXT NOT NULL,
+    link_hash  INTEGER NOT NULL DEFAULT 0,
+    title_hash INTEGER NOT NULL DEFAULT 0,
+    confidence TEXT                 -- arbitrage confidence, NULL if never computed
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS deals_fts USING fts5(
+    title, merchants, content='deals', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS deals_ai AFTER INSERT ON deals BEGIN
+    INSERT INTO deals_fts (rowid, title, merchants) VALUES (new.id, new.title, new.merchants);
+END;
+CREATE TRIGGER IF NOT EXISTS deals_ad AFTER DELETE ON deals BEGIN
+    INSERT INTO deals_fts (deals_fts, rowid, title, merchants) VALUES ('delete', old.id, old.title, old.merchants);
+END;
+CREATE TRIGGER IF NOT EXISTS deals_au AFTER UPDATE OF title, merchants ON deals BEGIN
+    INSERT INTO deals_fts (deals_fts, rowid, title, merchants) VALUES ('delete', old.id, old.title, old.merchants);
+    INSERT INTO deals_fts (rowid, title, merchants) VALUES (new.id, new.title, new.merchants);
+END;
+CREATE TABLE IF NOT EXISTS sightings (
+    deal_id INTEGER NOT NULL,
+    seen_on TEXT NOT NULL,
+    source  TEXT NOT NULL,
+    PRIMARY KEY (deal_id, seen_on, source)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scores (
+    deal_id       INTEGER NOT NULL,
+    seen_on       TEXT NOT NULL,
+    score         REAL NOT NULL,
+    rules_version TEXT NOT NULL,
+    PRIMARY KEY (deal_id, seen_on)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollups (
+    grain      TEXT NOT NULL,     -- 'day' | 'month' | 'all'
+    period     TEXT NOT NULL,     -- YYYY-MM-DD | YYYY-MM | '*'
+    source     TEXT NOT NULL,
+    merchant   TEXT NOT NULL,     -- '*' counts every deal once
+    gc_type    TEXT NOT NULL,
+    bucket     TEXT NOT NULL,
+    confidence TEXT NOT NULL,
+    deals      INTEGER NOT NULL,
+    PRIMARY KEY (grain, period, source, merchant, gc_type, bucket, confidence)
+) WITHOUT ROWID;
+"""
+
+# Created after an older database has gained the columns they cover
+INDEXES = """
+CREATE INDEX IF NOT EXISTS deals_link_hash ON deals (link_hash);
+CREATE INDEX IF NOT EXISTS deals_title_hash ON deals (title_hash);
+CREATE INDEX IF NOT EXISTS deals_source ON deals (source, last_seen);
+CREATE INDEX IF NOT EXISTS sightings_day ON sightings (seen_on, source, deal_id);
+"""
+
+_TOKEN = re.compile(r"\w+")
+_BATCH = 500  # keys per "IN (...)" lookup
+
+DIMENSIONS = ("source", "merchant", "gc_type", "bucket", "confidence")
+GRAINS = ("day", "month", "all")
+MULTIPLIER_BUCKETS = ((20, "20x+"), (15, "15-19x"), (10, "10-14x"), (5, "5-9x"), (1, "1-4x"))
+
+
+def normalize_title(title: str) -> str:
+    return " ".join((title or "").lower().split())
+
+
+def hash64(text: str) -> int:
+    """Stable signed 64-bit hash (fits an SQLite INTEGER)."""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little", signed=True)
+
+
+def deal_key(link: str, title: str) -> str:
+    return link or f"title:{normalize_title(title)}"
+
+
+def multiplier_bucket(x: int | None) -> str:
+    return next((name for low, name in MULTIPLIER_BUCKETS if x is not None and x >= low), "none")
+
+
+def rollup_dims(source: str, merchants, gc_type: str | None, multiplier: int | None,
+                confidence: str | None) -> list[tuple[str, ...]]:
+    """Rollup rows a deal counts in: merchant "*" plus one per merchant it names."""
+    rest = (gc_type or "", multiplier_bucket(multiplier), confidence or "unknown")
+    return [(source or "", m, *rest) for m in ("*", *dict.fromkeys(merchants or ()))]
+
+
+def periods(day: str) -> tuple[tuple[str, str], ...]:
+    return ("day", day), ("month", day[:7]), ("all", "*")
+
+
+def fts_phrase(text: str) -> str | None:
+    """Free text as an FTS5 phrase of its word tokens (no query syntax), None if empty."""
+    tokens = _TOKEN.findall(text or "")
+    return '"' + " ".join(tokens) + '"' if tokens else None
+
+
+def fts_query(text: str) -> str | None:
+    """Every word of `text` must occur (any order); None if there are no words."""
+    tokens = _TOKEN.findall(text or "")
+    return " AND ".join(f'"{t}"' for t in tokens) if tokens else None
+
+
+class DealHistory:
+    """SQLite deal history at `path` (created or upgraded on first use)."""
+
+    def __init__(self, path: str):
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode = WAL")
+        self.db.execute("PRAGMA synchronous = NORMAL")
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        existing = self.db.execute("SELECT 1 FROM sqlite_master WHERE name = 'deals'").fetchone()
+        self.db.executescript(SCHEMA)
+        if existing and version < 2:
+            self._upgrade_v1()
+        if existing and version < 3:
+            self._upgrade_v2()
+        self.db.executescript(INDEXES)
+        self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _upgrade_v1(self):
+        """
+        Add hash columns and seed sightings from the first / last seen dates
+        of a v1 history, and rebuild its text index from the table.
+        """
+        columns = {r["name"] for r in self.db.execute("PRAGMA table_info(deals)")}
+        with self.db:
+            for column in ("link_hash", "title_hash"):
+                if column not in columns:
+                    self.db.execute(f"ALTER TABLE deals ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+            rows = self.db.execute("SELECT id, link, title, source, first_seen, last_seen FROM deals").fetchall()
+            self.db.executemany(
+                "UPDATE deals SET link_hash = ?, title_hash = ? WHERE id = ?",
+                [(hash64(r["link"]), hash64(normalize_title(r["title"])), r["id"]) for r in rows],
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO sightings (deal_id, seen_on, source) VALUES (?, ?, ?)",
+                [(r["id"], day, r["source"]) for r in rows for day in {r["first_seen"], r["last_seen"]}],
+            )
+            self.db.execute("INSERT INTO deals_fts (deals_fts) VALUES ('rebuild')")
+
+    def _upgrade_v2(self):
+        """Add the confidence column and build rollups from the sightings of a v2 history."""
+        columns = {r["name"] for r in self.db.execute("PRAGMA table_info(deals)")}
+        with self.db:
+            if "confidence" not in columns:
+                self.db.execute("ALTER TABLE deals ADD COLUMN confidence TEXT")
+            self.rebuild_rollups()
+
+    def rebuild_rollups(self):
+        """Recount every rollup from the sightings (each deal with its latest fields)."""
+        days = {}
+        for deal_id, seen_on in self.db.execute("SELECT DISTINCT deal_id, seen_on FROM sightings"):
+            days.setdefault(deal_id, set()).add(seen_on)
+        counts = Counter()
+        for r in self.db.execute("SELECT id, source, merchants, gc_type, multiplier, confidence FROM deals"):
+            seen = days.get(r["id"])
+            if not seen:
+                continue
+            dims = rollup_dims(r["source"], r["merchants"].split(", ") if r["merchants"] else (),
+                               r["gc_type"], r["multiplier"], r["confidence"])
+            for period in {p for day in seen for p in periods(day)}:
+                counts.update((*period, *dim) for dim in dims)
+        self.db.execute("DELETE FROM rollups")
+        self.db.executemany("INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            [(*key, n) for key, n in counts.items()])
+
+    def _ids_in(self, sql: str, ids: list[int], params=()) -> set[int]:
+        """Deal ids returned by `sql` ending in "deal_id IN", run over `ids` in batches."""
+        found = set()
+        for i in range(0, len(ids), _BATCH):
+            chunk = ids[i:i + _BATCH]
+            found.update(r[0] for r in self.db.execute(f"{sql} ({','.join('?' * len(chunk))})", (*params, *chunk)))
+        return found
+
+    def record(self, day: str, deals: list[dict], rules_version: str = ""):
+        """
+        Add one run's deals (dicts with source, title, link, merchants, chip,
+        gc_type, multiplier, score, confidence) as seen on `day` (YYYY-MM-DD):
+        upsert the deal rows, then one sighting and (if scored) one score per
+        deal, and count deals not yet seen that day / month / ever in the
+        rollups.
+        """
+        rows, merchants = {}, {}
+        for d in deals:
+            if not d.get("title"):
+                continue
+            link = d.get("link") or ""
+            key = deal_key(link, d["title"])
+            rows[key] = (
+                link, d.get("source") or "", d["title"], ", ".join(d.get("merchants") or ()), d.get("chip"),
+                d.get("gc_type"), d.get("multiplier"), d.get("score"), day, day,
+                hash64(link), hash64(normalize_title(d["title"])), d.get("confidence"),
+            )
+            merchants[key] = d.get("merchants")
+        if not rows:
+            return
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO deals (key, link, source, title, merchants, chip, gc_type, multiplier, score, "
+                "first_seen, last_seen, link_hash, title_hash, confidence) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET source = excluded.source, title = excluded.title, "
+                "merchants = excluded.merchants, chip = excluded.chip, gc_type = excluded.gc_type, "
+                "multiplier = excluded.multiplier, score = coalesce(excluded.score, score), "
+                "first_seen = min(first_seen, excluded.first_seen), last_seen = max(last_seen, excluded.last_seen), "
+                "title_hash = excluded.title_hash, confidence = coalesce(excluded.confidence, confidence)",
+                [(key, *row) for key, row in rows.items()],
+            )
+            keys = list(rows)
+            ids, dims = {}, {}
+            for i in range(0, len(keys), _BATCH):
+                chunk = keys[i:i + _BATCH]
+                for key, deal_id, confidence in self.db.execute(
+                    f"SELECT key, id, confidence FROM deals WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ):
+                    ids[key] = deal_id
+                    row = rows[key]  # stored confidence: a run without arbitrage keeps the earlier value
+                    dims[key] = rollup_dims(row[1], merchants[key], row[5], row[6], confidence)
+
+            # Which deals are new today / this month / ever, before adding today's sightings
+            seen_today = self._ids_in("SELECT deal_id FROM sightings WHERE seen_on = ? AND deal_id IN",
+                                      list(ids.values()), (day,))
+            new = [i for i in ids.values() if i not in seen_today]
+            seen_month = self._ids_in("SELECT deal_id FROM sightings WHERE seen_on BETWEEN ? AND ? AND deal_id IN",
+                                      new, (f"{day[:7]}-00", f"{day[:7]}-99"))
+            seen_ever = self._ids_in("SELECT deal_id FROM sightings WHERE deal_id IN", new)
+            by_day, by_month, all_time = periods(day)
+            counts = Counter()
+            for key in keys:
+                deal_id = ids[key]
+                if deal_id in seen_today:
+                    continue
+                counted = [by_day]
+                if deal_id not in seen_month:
+                    counted.append(by_month)
+                if deal_id not in seen_ever:
+                    counted.append(all_time)
+                counts.update((*period, *dim) for period in counted for dim in dims[key])
+
+            self.db.executemany(
+                "INSERT OR IGNORE INTO sightings (deal_id, seen_on, source) VALUES (?, ?, ?)",
+                [(ids[key], day, row[1]) for key, row in rows.items()],
+            )
+            self.db.executemany(
+                "INSERT OR REPLACE INTO scores (deal_id, seen_on, score, rules_version) VALUES (?, ?, ?, ?)",
+                [(ids[key], day, row[7], rules_version) for key, row in rows.items() if row[7] is not None],
+            )
+            self.db.executemany(
+                "INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT DO UPDATE SET deals = deals + excluded.deals",
+                [(*key, n) for key, n in counts.items()],
+            )
+
+    def _deal_ids(self, link: str | None = None, title: str | None = None) -> list[int]:
+        if link:
+            return [r[0] for r in self.db.execute(
+                "SELECT id FROM deals WHERE link_hash = ? AND link = ?", (hash64(link), link))]
+        if title:
+            return [r[0] for r in self.db.execute(
+                "SELECT id FROM deals WHERE title_hash = ?", (hash64(normalize_title(title)),))]
+        return []
+
+    def seen_stats(self, link: str | None = None, title: str | None = None) -> tuple[str | None, int]:
+        """
+        (first day seen, number of days seen) for the deal with this link, or
+        for every deal with this title (after normalization) when no link is
+        given. (None, 0) for deals never seen.
+        """
+        ids = self._deal_ids(link, title)
+        if not ids:
+            return None, 0
+        first, days = self.db.execute(
+            f"SELECT min(seen_on), count(DISTINCT seen_on) FROM sightings "
+            f"WHERE deal_id IN ({','.join('?' * len(ids))})", ids
+        ).fetchone()
+        return first, days
+
+    def score_history(self, link: str) -> list[tuple[str, float]]:
+        """(day, score) for every scored sighting of the deal with this link, oldest first."""
+        ids = self._deal_ids(link)
+        if not ids:
+            return []
+        return [tuple(r) for r in self.db.execute(
+            "SELECT seen_on, score FROM scores WHERE deal_id = ? ORDER BY seen_on", (ids[0],))]
+
+    def stats(self, by=(), per: str = "all", since: str | None = None, limit: int | None = None,
+              **filters) -> list[sqlite3.Row]:
+        """
+        Deal counts from the rollups, grouped by the `by` dimensions (see
+        DIMENSIONS) and, unless `per` is "all", by day or month from `since`
+        (a day or month, inclusive). `filters` are dimension=value pairs
+        (case-insensitive). Rows have a `period` column, one column per `by`
+        dimension and `deals`, by period then most deals first.
+
+        Deals naming several merchants count once per merchant when grouping
+        or filtering by merchant, and once otherwise.
+        """
+        if per not in GRAINS:
+            raise ValueError(f"per must be one of {GRAINS}, not {per!r}")
+        unknown = [d for d in (*by, *filters) if d not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimensions {unknown}; expected {DIMENSIONS}")
+        where, params = ["grain = ?"], [per]
+        where.append("merchant != '*'" if "merchant" in by or filters.get("merchant") else "merchant = '*'")
+        for dim, value in filters.items():
+            if value is not None:
+                where.append(f"{dim} = ? COLLATE NOCASE")
+                params.append(value)
+        if since and per != "all":
+            where.append("period >= ?")
+            params.append(since[:10 if per == "day" else 7])
+        groups = ", ".join(("period", *by))
+        sql = (f"SELECT {groups}, sum(deals) AS deals FROM rollups WHERE {' AND '.join(where)} "
+               f"GROUP BY {groups} ORDER BY period, deals DESC, {groups}")
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self.db.execute(sql, params).fetchall()
+
+    def search(self, text: str = "", source: str | None = None, merchant: str | None = None,
+               chip: str | None = None, min_score: float | None = None, limit: int = 20,
+               recent: bool = False) -> list[sqlite3.Row]:
+        """
+        Deals matching every word of `text` (stemmed, any order) and the
+        filters, best bm25 match first (or most recently seen first with
+        `recent`). Without text or merchant, filters alone select deals.
+        Rows carry a `times_seen` column (days the deal was seen).
+        """
+        match = [q for q in (fts_query(text),) if q]
+        if merchant and fts_phrase(merchant):
+            match.append(f"merchants : {fts_phrase(merchant)}")
+        where, params = [], []
+        if match:
+            where.append("deals_fts MATCH ?")
+            params.append(" AND ".join(match))
+        if source:
+            where.append("d.source = ? COLLATE NOCASE")
+            params.append(source)
+        if chip:
+            where.append("d.chip = ? COLLATE NOCASE")
+            params.append(chip)
+        if min_score is not None:
+            where.append("d.score >= ?")
+            params.append(min_score)
+
+        columns = "d.*, (SELECT count(DISTINCT seen_on) FROM sightings s WHERE s.deal_id = d.id) AS times_seen"
+        order = "d.last_seen DESC" if recent or not match else "bm25(deals_fts), d.last_seen DESC"
+        sql = (f"SELECT {columns} FROM deals_fts JOIN deals d ON d.id = deals_fts.rowid" if match
+               else f"SELECT {columns} FROM deals d")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order}, d.id DESC LIMIT ?"
+        return self.db.execute(sql, (*params, limit)).fetchall()
+
+    def close(self):
+        self.db.close()
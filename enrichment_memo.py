@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Persistent cross-run enrichment memo.
+
+Maps a normalized title to the enrichment fields computed for it (merchants,
+cashback, chip_info, arbitrage, why, recipe, score, ...), so titles that keep
+showing up run after run skip enrichment entirely. Entries live in SQLite with
+a small in-memory LRU in front, and are evicted by age and by total size.
+"""
+import json
+import time
+import sqlite3
+from collections import OrderedDict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS memo (
+    key       TEXT PRIMARY KEY,
+    value     TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS memo_last_used ON memo (last_used);
+"""
+
+
+class EnrichmentMemo:
+    """
+    Disk-backed {title key: fields} store. `namespace` should include the rules
+    version so results from older rules are never returned.
+    """
+
+    def __init__(self, path: str, namespace: str = "", max_entries: int = 50_000,
+                 max_age_days: float = 30, lru_size: int = 1024):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.lru_size = lru_size
+        self._lru: OrderedDict[str, dict] = OrderedDict()
+        self._pending: dict[str, str] = {}   # key -> json value to write
+        self._touched: set[str] = set()      # keys read from disk this session
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}\t{key}"
+
+    def _remember(self, key: str, value: dict):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        if len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str) -> dict | None:
+        key = self._key(key)
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            return self._lru[key]
+        row = self.db.execute("SELECT value FROM memo WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value = json.loads(row[0])
+        self._touched.add(key)
+        self._remember(key, value)
+        return value
+
+    def put(self, key: str, value: dict):
+        key = self._key(key)
+        self._remember(key, value)
+        self._pending[key] = json.dumps(value, ensure_ascii=False)
+
+    def flush(self):
+        """Write pending entries, refresh last-used times, then evict."""
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO memo (key, value, last_used) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, last_used = excluded.last_used",
+                [(k, v, now) for k, v in self._pending.items()],
+            )
+            self.db.executemany(
+                "UPDATE memo SET last_used = ? WHERE key = ?",
+                [(now, k) for k in self._touched - self._pending.keys()],
+            )
+            self.db.execute("DELETE FROM memo WHERE last_used < ?", (now - self.max_age,))
+            self.db.execute(
+                "DELETE FROM memo WHERE key IN ("
+                "  SELECT key FROM memo ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        self._pending.clear()
+        self._touched.clear()
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM memo").fetchone()[0]
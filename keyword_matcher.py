@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Aho–Corasick multi-pattern matcher for the keyword tables.
+
+All tables (keywords, merchants, retailers, stock signals, ...) are compiled into
+one automaton, so a title is scanned once no matter how many patterns there are.
+Hits come back tagged by category with the pattern's index in its table.
+"""
+import os
+import json
+import hashlib
+
+CACHE_FORMAT = 2  # bump when the compiled layout changes
+
+
+class KeywordMatcher:
+    """Compiled automaton over {category: [pattern, ...]} tables (case-insensitive)."""
+
+    __slots__ = ("tables", "_delta", "_out")
+
+    def __init__(self, tables: dict[str, list[str]], _compiled=None):
+        self.tables = {cat: list(patterns) for cat, patterns in tables.items()}
+        self._delta, self._out = _compiled or _compile(self.tables)
+
+    def scan(self, text: str) -> dict[str, tuple[int, ...]]:
+        """
+        Single pass over `text`.
+        Returns: {category: sorted pattern indexes that occur in text}
+        """
+        delta = self._delta
+        out = self._out
+        state = 0
+        hits = set()
+        for ch in (text or "").lower():
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                hits.update(out[state])
+
+        found: dict[str, list[int]] = {}
+        for cat, idx in hits:
+            found.setdefault(cat, []).append(idx)
+        return {cat: tuple(sorted(idxs)) for cat, idxs in found.items()}
+
+
+def _compile(tables: dict[str, list[str]]):
+    """Build the trie, failure links and a full transition table (DFA)."""
+    goto: list[dict[str, int]] = [{}]
+    out: list[set] = [set()]
+    for cat, patterns in tables.items():
+        for idx, pattern in enumerate(patterns):
+            pattern = pattern.lower()
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append(set())
+                state = nxt
+            out[state].add((cat, idx))
+
+    # Breadth-first: resolve failure links and fold them into the transitions,
+    # so scanning never has to follow a failure chain.
+    fail = [0] * len(goto)
+    delta: list[dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+    queue = list(goto[0].values())
+    head = 0
+    while head < len(queue):
+        state = queue[head]
+        head += 1
+        out[state] |= out[fail[state]]
+        trans = dict(delta[fail[state]])
+        for ch, nxt in goto[state].items():
+            fail[nxt] = delta[fail[state]].get(ch, 0)
+            trans[ch] = nxt
+            queue.append(nxt)
+        delta[state] = trans
+
+    return delta, [tuple(sorted(o)) for o in out]
+
+
+def tables_digest(tables: dict[str, list[str]]) -> str:
+    payload = json.dumps([CACHE_FORMAT, tables], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _read_cache(path: str, digest: str):
+    """(delta, out) from a JSON cache file, or None unless it holds a valid automaton for `digest`."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["format"] != CACHE_FORMAT or cached["digest"] != digest:
+            return None
+        delta, out = cached["delta"], cached["out"]
+        states = len(delta)
+        if not states or len(out) != states:
+            return None
+        for trans in delta:
+            if not all(isinstance(nxt, int) and 0 <= nxt < states for nxt in trans.values()):
+                return None
+        return delta, [tuple((cat, idx) for cat, idx in o) for o in out]
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+def load_matcher(tables: dict[str, list[str]], cache_dir: str | None = None) -> KeywordMatcher:
+    """
+    Return a matcher for `tables`, reusing a compiled automaton cached in
+    `cache_dir` when the tables are unchanged. The cache is plain JSON (the
+    transition tables plus the cache format and the tables' digest); a file
+    that fails any check is ignored and rebuilt.
+    """
+    if not cache_dir:
+        return KeywordMatcher(tables)
+
+    digest = tables_digest(tables)
+    path = os.path.join(cache_dir, f"matcher-{digest}.json")
+    compiled = _read_cache(path, digest)
+    if compiled is not None:
+        return KeywordMatcher(tables, _compiled=compiled)
+
+    matcher = KeywordMatcher(tables)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"format": CACHE_FORMAT, "digest": digest, "delta": matcher._delta, "out": matcher._out},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError:
+        pass  # Cache is an optimisation only
+    return matcher
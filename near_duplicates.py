@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate clustering of deal titles with MinHash + LSH banding.
+
+The same promo is often posted on several sites with different wording
+("20x points on Ultimate gift cards at Woolworths" vs "Woolworths: Ultimate
+Gift Cards - 20x Everyday Rewards Points"). Each title becomes a set of word
+shingles; a MinHash signature estimates Jaccard similarity, and the signature
+is cut into bands so only titles sharing a whole band land in the same bucket.
+Candidate pairs are confirmed with the exact Jaccard similarity and merged
+with union-find, so each title costs O(bands) bucket lookups however many
+titles have been seen.
+"""
+import re
+import hashlib
+import functools
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("a an and at by for from in is of on or the to via with".split())
+
+_PRIME = (1 << 61) - 1
+
+
+def shingles(title: str) -> frozenset[str]:
+    """
+    Lowercase word tokens of a title without stopwords, plural "s" dropped
+    ("Gift Cards" ~ "gift card"); word order is ignored.
+    """
+    tokens = (t for t in _TOKEN.findall((title or "").lower()) if t not in STOPWORDS)
+    return frozenset(t[:-1] if len(t) > 3 and t.endswith("s") else t for t in tokens)
+
+
+@functools.lru_cache(maxsize=65536)
+def _token_hash(token: str) -> int:
+    # Stable across processes (unlike hash()), so clusters are reproducible
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class MinHashLSH:
+    """
+    Incremental near-duplicate index. add() returns the ids of earlier entries
+    whose shingle sets have Jaccard similarity >= threshold with the new one.
+    With bands × rows = num_perm, pairs near (1 / bands) ** (1 / rows)
+    similarity become candidates about half the time; more similar pairs
+    almost always do.
+
+    A bucket stops growing at `max_bucket` entries: later entries are still
+    compared with its members but not added, so a crowd of near-identical
+    titles costs at most bands × max_bucket comparisons per title instead of
+    one per earlier title. Entries of a crowded bucket are near-identical, so
+    its first members stand in for the rest.
+    """
+
+    def __init__(self, threshold: float = 0.6, bands: int = 20, rows: int = 3, seed: int = 1,
+                 max_bucket: int = 32):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.max_bucket = max_bucket
+        state = hashlib.blake2b(str(seed).encode("ascii"), digest_size=8).digest()
+        self._perms = []
+        for _ in range(bands * rows):
+            state = hashlib.blake2b(state, digest_size=16).digest()
+            a = int.from_bytes(state[:8], "little") % (_PRIME - 1) + 1
+            b = int.from_bytes(state[8:], "little") % _PRIME
+            self._perms.append((a, b))
+        self._buckets: dict[tuple, list[int]] = {}
+        self._sets: list[frozenset] = []
+
+    def signature(self, tokens: frozenset[str]) -> tuple[int, ...]:
+        hashes = [_token_hash(t) for t in tokens]
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms)
+
+    def add(self, tokens: frozenset[str], key=None) -> list[int]:
+        """
+        Index a shingle set and return the ids of matching earlier entries.
+        Only entries added with an equal `key` are ever matched.
+        """
+        entry = len(self._sets)
+        self._sets.append(tokens)
+        if not tokens:
+            return []
+        sig = self.signature(tokens)
+        candidates = set()
+        for band in range(self.bands):
+            bucket = (key, band, sig[band * self.rows:(band + 1) * self.rows])
+            members = self._buckets.setdefault(bucket, [])
+            candidates.update(members)
+            if len(members) < self.max_bucket:
+                members.append(entry)
+        return sorted(c for c in candidates if jaccard(tokens, self._sets[c]) >= self.threshold)
+
+
+def cluster_titles(titles: list[str], keys=None, threshold: float = 0.6) -> list[list[int]]:
+    """
+    Group near-duplicate titles. Returns clusters of positions, each sorted,
+    in order of their first member. `keys` (one per title) restricts matches
+    to titles with equal keys.
+    """
+    index = MinHashLSH(threshold)
+    parent = list(range(len(titles)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, title in enumerate(titles):
+        for j in index.add(shingles(title), keys[i] if keys is not None else None):
+            a, b = find(i), find(j)
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+
+    clusters = {}
+    for i in range(len(titles)):
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
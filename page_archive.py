@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Content-addressed archive of fetched page bodies.
+
+Each distinct body is stored once, zlib-compressed, under its SHA-256:
+
+    objects/ab/cdef....z     compressed UTF-8 body
+    index.sqlite             pages(run, url, fetched_at, sha256, size)
+
+A page that hasn't changed since an earlier fetch only adds an index row,
+and prune() drops old runs along with bodies no run refers to any more.
+The index is keyed by run (the start time of the report run that fetched
+the page) and URL, with a second index by URL and fetch time, so both "every
+page of this run" and "every version of this URL" are index lookups.
+"""
+import os
+import zlib
+import sqlite3
+import hashlib
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    run        TEXT NOT NULL,
+    url        TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    sha256     TEXT NOT NULL,
+    size       INTEGER NOT NULL,
+    PRIMARY KEY (run, url)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS pages_url ON pages (url, fetched_at);
+"""
+
+
+class PageArchive:
+    """Archive rooted at `root` (created on first write). Safe to share between threads."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.index_path = os.path.join(root, "index.sqlite")
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(self.root, exist_ok=True)
+        db = sqlite3.connect(self.index_path, timeout=30)
+        db.execute("PRAGMA journal_mode = WAL")
+        db.executescript(SCHEMA)
+        return db
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest[2:] + ".z")
+
+    def put(self, url: str, body: str, run: str, fetched_at: str) -> str:
+        """Archive `body` as fetched from `url` by `run`; returns its SHA-256."""
+        data = body.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(zlib.compress(data, 6))
+            os.replace(tmp, path)
+        db = self._connect()
+        try:
+            with db:
+                db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                           (run, url, fetched_at, digest, len(data)))
+        finally:
+            db.close()
+        return digest
+
+    def prune(self, before: str) -> tuple[int, int]:
+        """
+        Drop the fetches of runs before `before`, and every body no remaining
+        fetch refers to. Returns (fetches removed, bodies removed).
+        """
+        if not os.path.exists(self.index_path):
+            return 0, 0
+        db = self._connect()
+        try:
+            with db:
+                removed = db.execute("DELETE FROM pages WHERE run < ?", (before,)).rowcount
+                kept = {r[0] for r in db.execute("SELECT DISTINCT sha256 FROM pages")}
+        finally:
+            db.close()
+        bodies = 0
+        objects = os.path.join(self.root, "objects")
+        for shard in os.listdir(objects) if os.path.isdir(objects) else ():
+            folder = os.path.join(objects, shard)
+            for name in os.listdir(folder):
+                if name.endswith(".z") and shard + name[:-2] not in kept:
+                    os.remove(os.path.join(folder, name))
+                    bodies += 1
+            if not os.listdir(folder):
+                os.rmdir(folder)
+        return removed, bodies
+
+    def get(self, digest: str) -> str:
+        """Body with this SHA-256 (KeyError if it isn't archived)."""
+        try:
+            with open(self.object_path(digest), "rb") as f:
+                return zlib.decompress(f.read()).decode("utf-8")
+        except FileNotFoundError:
+            raise KeyError(digest) from None
+
+    def _query(self, sql: str, params=()) -> list[tuple]:
+        if not os.path.exists(self.index_path):
+            return []
+        db = self._connect()
+        try:
+            return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def entries(self, since: str | None = None) -> list[tuple[str, str, str]]:
+        """(run, url, sha256) for every archived fetch from runs at or after `since`, oldest first."""
+        return self._query("SELECT run, url, sha256 FROM pages WHERE run >= ? ORDER BY run, url", (since or "",))
+
+    def versions(self, url: str) -> list[tuple[str, str]]:
+        """(fetched_at, sha256) for every fetch of `url`, oldest first."""
+        return self._query("SELECT fetched_at, sha256 FROM pages WHERE url = ? ORDER BY fetched_at", (url,))
+
+    def stats(self) -> tuple[int, int, int]:
+        """(fetches, distinct bodies, total uncompressed bytes of the fetches)."""
+        rows = self._query("SELECT count(*), count(DISTINCT sha256), coalesce(sum(size), 0) FROM pages")
+        return tuple(rows[0]) if rows else (0, 0, 0)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Streaming baselines of promo strength per gift card type and program.
+
+Each group ("ultimate|Everyday Rewards", ...) keeps a fixed-size summary of
+every promo value it has seen: count, running mean and variance (Welford) and
+P² quantile estimators (Jain & Chlamtac), which track a quantile with five
+markers instead of storing observations. Adding a run's promos is O(1) per
+promo and reading the percentile of a new value is O(1), however long the
+history grows. Summaries are saved as one small JSON file.
+"""
+import os
+import json
+
+FORMAT = 1
+QUANTILES = (0.25, 0.5, 0.75, 0.9)
+
+
+class P2Quantile:
+    """P² estimate of one quantile; exact until the fifth observation."""
+
+    __slots__ = ("p", "heights", "positions")
+
+    def __init__(self, p: float, heights=(), positions=()):
+        self.p = p
+        self.heights = list(heights)      # marker heights (raw sorted values while < 5)
+        self.positions = list(positions)  # marker positions, 1-based (empty while < 5)
+
+    @property
+    def count(self) -> int:
+        return self.positions[-1] if self.positions else len(self.heights)
+
+    def add(self, x: float):
+        q = self.heights
+        if not self.positions:
+            q.append(x)
+            q.sort()
+            if len(q) == 5:
+                self.positions = [1, 2, 3, 4, 5]
+            return
+
+        n = self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+
+        p = self.p
+        count = n[4]
+        desired = (1, 1 + (count - 1) * p / 2, 1 + (count - 1) * p, 1 + (count - 1) * (1 + p) / 2, count)
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                h = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < h < q[i + 1]:
+                    h = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = h
+                n[i] += d
+
+    def value(self) -> float | None:
+        q = self.heights
+        if not q:
+            return None
+        if self.positions:
+            return q[2]
+        return q[min(len(q) - 1, int(self.p * len(q)))]
+
+
+class PromoStats:
+    """Summary of one group: Welford moments, P² quantiles, exact min/max."""
+
+    __slots__ = ("count", "mean", "m2", "quantiles")
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, quantiles=None):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.quantiles = quantiles or [P2Quantile(p) for p in QUANTILES]
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        for q in self.quantiles:
+            q.add(x)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def percentile(self, x: float) -> float:
+        """
+        Share of past values below x, ties counted half (0..1). Exact for the
+        first five values, then interpolated between min, the tracked
+        quantiles and max.
+        """
+        first = self.quantiles[0]
+        if not first.positions:
+            values = first.heights
+            if not values:
+                return 0.5
+            below = sum(v < x for v in values)
+            equal = sum(v == x for v in values)
+            return (below + equal / 2) / len(values)
+
+        points = [(first.heights[0], 0.0)]
+        for q in self.quantiles:
+            points.append((max(q.value(), points[-1][0]), q.p))
+        points.append((max(first.heights[4], points[-1][0]), 1.0))
+
+        equal = [p for h, p in points if h == x]
+        if equal:
+            return (equal[0] + equal[-1]) / 2
+        if x < points[0][0]:
+            return 0.0
+        for (h0, p0), (h1, p1) in zip(points, points[1:]):
+            if h0 < x < h1:
+                return p0 + (p1 - p0) * (x - h0) / (h1 - h0)
+        return 1.0
+
+    def to_json(self) -> list:
+        return [self.count, self.mean, self.m2, [[q.heights, q.positions] for q in self.quantiles]]
+
+    @classmethod
+    def from_json(cls, data) -> "PromoStats":
+        count, mean, m2, markers = data
+        quantiles = [P2Quantile(p, h, n) for p, (h, n) in zip(QUANTILES, markers)]
+        return cls(count, mean, m2, quantiles)
+
+
+class PromoBaselines:
+    """
+    {group: PromoStats}, loaded from and saved to one JSON file, plus the ids
+    of the deals added last run so a promo listed for several days is only
+    counted once.
+    """
+
+    def __init__(self, groups: dict[str, PromoStats] | None = None, last_run=()):
+        self.groups = groups or {}
+        self.last_run = set(last_run)
+
+    @classmethod
+    def load(cls, path: str) -> "PromoBaselines":
+        """Baselines saved at `path`; empty if missing, corrupt or another format."""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("format") != FORMAT:
+                return cls()
+            return cls({g: PromoStats.from_json(s) for g, s in data["groups"].items()}, data.get("last_run", ()))
+        except (OSError, ValueError, KeyError, TypeError):
+            return cls()
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "format": FORMAT,
+                "groups": {g: s.to_json() for g, s in self.groups.items()},
+                "last_run": sorted(self.last_run),
+            }, f)
+        os.replace(tmp, path)
+
+    def add(self, group: str, value: float):
+        stats = self.groups.get(group)
+        if stats is None:
+            stats = self.groups[group] = PromoStats()
+        stats.add(value)
+
+    def percentile(self, group: str, value: float, min_count: int = 1) -> float | None:
+        """Percentile of `value` in `group`, or None with fewer than `min_count` past values."""
+        stats = self.groups.get(group)
+        if stats is None or stats.count < min_count:
+            return None
+        return stats.percentile(value)
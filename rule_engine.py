@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Declarative rule engine for hints, explanations, recipes and scores.
+
+A rule file maps tables (e.g. "hint", "why", "recipe", "score", "confidence") to
+ordered rules. Each rule has a `when` list of conditions over extracted features
+and either a message `text` (str.format template) or a `score` delta:
+
+    {"when": ["x >= 20", "signals any gift card|giftcard"], "score": 3}
+    {"when": ["gc_type == ultimate"], "text": "Buy {x}x ..."}
+
+Condition syntax (all clauses in `when` must hold):
+    name                  truthy feature            !name   falsy feature
+    name OP value         OP in == != >= <= > <     (value: number or string)
+    name in a|b|c         feature equals one of the values
+    name has v            set/list feature contains v
+    name any a|b|c        set/list feature contains at least one value
+    A or B                either predicate holds
+
+A value written as @other refers to another context entry (e.g. a configured
+merchant set or threshold) instead of a literal.
+
+List-valued context entries wrapped in ListValue render joined by their format
+spec in templates: "{redeem:/}" gives "JB Hi-Fi/Officeworks".
+
+The rules are compiled once: every distinct predicate across all tables is
+evaluated a single time per context, then each table fires its matching rules.
+"""
+import re
+import json
+import hashlib
+
+_PREDICATE = re.compile(r"^(!?)(\w+)(?: (==|!=|>=|<=|>|<|in|has|any) (.+))?$")
+
+COMPARE = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    ">=": lambda a, b: a >= b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    "<": lambda a, b: a < b,
+}
+
+
+class RuleError(ValueError):
+    """Raised for malformed rule files."""
+
+
+class ListValue(tuple):
+    """A tuple that formats as its items joined by the format spec (default ", ")."""
+
+    __slots__ = ()
+
+    def __format__(self, spec):
+        return (spec or ", ").join(map(str, self))
+
+
+def parse_literal(value: str):
+    """A rule value as int, float or (otherwise) str."""
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def parse_condition(expr: str) -> tuple[bool, str, str | None, str | None]:
+    """Split a condition into (negated, name, operator, raw value)."""
+    m = _PREDICATE.match(expr)
+    if not m:
+        raise RuleError(f"Bad condition: {expr!r}")
+    negate, name, op, value = m.groups()
+    if negate and op is not None:
+        raise RuleError(f"'!' only applies to bare feature names: {expr!r}")
+    return bool(negate), name, op, value
+
+
+def _predicate_names(expr: str) -> frozenset[str]:
+    """Context entries a condition reads (used to mark predicates as unknown)."""
+    _, name, _, value = parse_condition(expr)
+    if value and value.startswith("@"):
+        return frozenset((name, value[1:]))
+    return frozenset((name,))
+
+
+def _compile_predicate(expr: str):
+    negate, name, op, value = parse_condition(expr)
+    if op is None:
+        if negate:
+            return lambda ctx: not ctx.get(name)
+        return lambda ctx: bool(ctx.get(name))
+
+    if op == "in":
+        options = frozenset(parse_literal(v) for v in value.split("|"))
+        return lambda ctx: ctx.get(name) in options
+    if op == "has":
+        return lambda ctx: value in (ctx.get(name) or ())
+    if op == "any":
+        if value.startswith("@"):
+            ref = value[1:]
+            return lambda ctx: any(v in (ctx.get(name) or ()) for v in (ctx.get(ref) or ()))
+        options = tuple(value.split("|"))
+        return lambda ctx: any(v in (ctx.get(name) or ()) for v in options)
+
+    compare = COMPARE[op]
+    if value.startswith("@"):
+        ref = value[1:]
+        return lambda ctx: compare(ctx.get(name) or 0, ctx.get(ref) or 0)
+    literal = parse_literal(value)
+    if isinstance(literal, str):
+        return lambda ctx: compare(ctx.get(name), literal)
+    return lambda ctx: compare(ctx.get(name) or 0, literal)
+
+
+class RuleSet:
+    """A compiled rule file: shared predicate list plus per-table firing plans."""
+
+    __slots__ = ("spec", "digest", "limits", "first_match", "conditions", "predicates", "predicate_names", "plans")
+
+    def __init__(self, spec: dict):
+        self.spec = spec
+        self.digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        self.limits = dict(spec.get("limits", {}))
+        self.first_match = dict(spec.get("first_match", {}))
+
+        index = {}  # predicate expression -> position in self.predicates
+        self.conditions = []  # predicate expressions, parallel to self.predicates
+        self.predicates = []
+        self.predicate_names = []
+        self.plans = {}
+        for table, rules in spec.get("tables", {}).items():
+            plan = []
+            for rule in rules:
+                clauses = []
+                for clause in rule.get("when", []):
+                    alternatives = []
+                    for expr in clause.split(" or "):
+                        if expr not in index:
+                            index[expr] = len(self.predicates)
+                            self.conditions.append(expr)
+                            self.predicates.append(_compile_predicate(expr))
+                            self.predicate_names.append(_predicate_names(expr))
+                        alternatives.append(index[expr])
+                    clauses.append(tuple(alternatives))
+                if "text" not in rule and "score" not in rule:
+                    raise RuleError(f"Rule in {table!r} needs 'text' or 'score': {rule}")
+                plan.append((tuple(clauses), rule.get("text"), rule.get("score", 0), rule.get("unless_text")))
+            self.plans[table] = plan
+
+    def predicate_values(self, ctx: dict, unknown=()) -> tuple[bool | None, ...]:
+        """
+        Evaluate every distinct predicate once for this context.
+        Predicates reading any of the `unknown` entries are left as None.
+        """
+        if not unknown:
+            return tuple(pred(ctx) for pred in self.predicates)
+        unknown = frozenset(unknown)
+        return tuple(
+            None if names & unknown else pred(ctx)
+            for pred, names in zip(self.predicates, self.predicate_names)
+        )
+
+    def _fired(self, table: str, values: tuple[bool, ...]):
+        for clauses, text, score, unless_text in self.plans.get(table, ()):
+            if all(any(values[i] for i in alts) for alts in clauses):
+                yield text, score, unless_text
+
+    def messages(self, table: str, ctx: dict, values: tuple[bool, ...]) -> list[str]:
+        """Rendered `text` of every matching rule, in rule order."""
+        out = []
+        for text, _, unless_text in self._fired(table, values):
+            if text is None:
+                continue
+            if unless_text and unless_text in " ".join(out):
+                continue
+            out.append(text.format_map(ctx))
+            if table in self.first_match:
+                break
+        limit = self.limits.get(table)
+        return out[:limit] if limit else out
+
+    def first(self, table: str, ctx: dict, values: tuple[bool, ...]):
+        """Text of the first matching rule, or the table's configured default."""
+        found = self.messages(table, ctx, values)
+        return found[0] if found else self.first_match.get(table)
+
+    def score(self, table: str, values: tuple[bool, ...]) -> float:
+        """Sum of `score` deltas of every matching rule."""
+        return sum(score for _, score, _ in self._fired(table, values))
+
+    def score_bound(self, table: str, values: tuple[bool | None, ...]) -> float:
+        """
+        Upper bound of score() when some predicate values are unknown (None):
+        positive rules count unless a clause is known false, negative rules
+        count only when every clause is known true.
+        """
+        total = 0
+        for clauses, _, score, _ in self.plans.get(table, ()):
+            possible = True
+            certain = True
+            for alts in clauses:
+                if any(values[i] for i in alts):
+                    continue
+                if any(values[i] is None for i in alts):
+                    certain = False
+                else:
+                    possible = False
+                    break
+            if possible and (certain or score > 0):
+                total += score
+        return total
+
+
+def load_rules(path: str) -> RuleSet:
+    with open(path, encoding="utf-8") as f:
+        return RuleSet(json.load(f))
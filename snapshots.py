@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Columnar snapshot files of one run's enriched deals.
+
+Layout (little-endian):
+
+    b"DEALCOL1"   magic
+    u32           header length
+    header        JSON: {"rows": n, "columns": {name: {"kind", "dictionary", "sections"}}}
+    sections      each column's arrays, 8-byte aligned, at the offsets in the header
+
+Column kinds:
+
+    text     u32 offsets (rows + 1) into a UTF-8 blob       title, link
+    dict     u16 codes into a string dictionary (0 = None)   source, chip, gc_type, confidence
+    list     u32 offsets (rows + 1) into u16 dictionary codes   merchants
+    number   fixed-width array (NaN / -1 for None)           score (f32), multiplier (i16)
+    flags    u8 bitmask per row, one bit per FLAGS name
+
+Snapshots are memory-mapped on load and each column is a typed view over its
+own sections, so reading the scores of a year of snapshots only pages in the
+score arrays; titles are decoded only for the rows that are read, and dict
+columns can be filtered by comparing codes without decoding any strings.
+"""
+import os
+import sys
+import json
+import math
+import mmap
+import struct
+from array import array
+
+MAGIC = b"DEALCOL1"
+FLAGS = ("excluded", "top_excluded", "arbitrage", "apple", "in_stock")
+COLUMNS = {
+    "source": "dict", "title": "text", "link": "text", "merchants": "list", "chip": "dict",
+    "gc_type": "dict", "confidence": "dict", "score": "number", "multiplier": "number", "flags": "flags",
+}
+NUMBER_TYPES = {"score": "f", "multiplier": "h"}
+_ALIGN = 8
+
+
+class SnapshotError(ValueError):
+    """Raised for files that are not readable snapshots."""
+
+
+def _little(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _dictionary(values) -> tuple[list, dict]:
+    dictionary = [None]
+    codes = {None: 0}
+    for v in values:
+        if v not in codes:
+            codes[v] = len(dictionary)
+            dictionary.append(v)
+    return dictionary, codes
+
+
+def _encode(name: str, kind: str, values: list) -> tuple[list | None, list[bytes]]:
+    """(dictionary, sections) for one column."""
+    if kind == "text":
+        blobs = [(v or "").encode("utf-8") for v in values]
+        offsets = array("I", [0])
+        for b in blobs:
+            offsets.append(offsets[-1] + len(b))
+        return None, [_little(offsets), b"".join(blobs)]
+    if kind == "dict":
+        dictionary, codes = _dictionary(values)
+        return dictionary, [_little(array("H", [codes[v] for v in values]))]
+    if kind == "list":
+        dictionary, codes = _dictionary(v for row in values for v in row or ())
+        offsets, flat = array("I", [0]), array("H")
+        for row in values:
+            flat.extend(codes[v] for v in row or ())
+            offsets.append(len(flat))
+        return dictionary, [_little(offsets), _little(flat)]
+    if kind == "number":
+        typecode = NUMBER_TYPES[name]
+        missing = math.nan if typecode == "f" else -1
+        return None, [_little(array(typecode, [missing if v is None else v for v in values]))]
+    if kind == "flags":
+        return None, [bytes(sum(1 << i for i, flag in enumerate(FLAGS) if v and v.get(flag)) for v in values)]
+    raise SnapshotError(f"Unknown column kind {kind!r}")
+
+
+def write_snapshot(path: str, rows: list[dict]):
+    """
+    Write `rows` (dicts with the COLUMNS keys; "flags" is a dict of FLAGS
+    names to bools) as a snapshot at `path`, replacing any existing file.
+    """
+    columns, sections = {}, []
+    start = 0
+    for name, kind in COLUMNS.items():
+        dictionary, parts = _encode(name, kind, [r.get(name) for r in rows])
+        spans = []
+        for part in parts:
+            spans.append([start, len(part)])
+            padded = part + b"\0" * (-len(part) % _ALIGN)
+            sections.append(padded)
+            start += len(padded)
+        columns[name] = {"kind": kind, "dictionary": dictionary, "sections": spans}
+
+    header = json.dumps({"rows": len(rows), "columns": columns}, ensure_ascii=False, separators=(",", ":"))
+    header = header.encode("utf-8")
+    base = len(MAGIC) + 4 + len(header)
+    base += -base % _ALIGN
+    prefix = MAGIC + struct.pack("<I", base - len(MAGIC) - 4) + header.ljust(base - len(MAGIC) - 4, b" ")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(prefix)
+        for section in sections:
+            f.write(section)
+    os.replace(tmp, path)
+
+
+class TextColumn:
+    """Strings decoded on access from an offsets table and a UTF-8 blob."""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+
+class DictColumn:
+    """u16 codes into a dictionary; `code(value)` allows filtering without decoding."""
+
+    def __init__(self, dictionary, codes):
+        self.dictionary = tuple(dictionary)
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i: int):
+        return self.dictionary[self.codes[i]]
+
+    def code(self, value) -> int | None:
+        """Code of `value`, or None if no row has it."""
+        try:
+            return self.dictionary.index(value)
+        except ValueError:
+            return None
+
+    def rows_with(self, value) -> list[int]:
+        code = self.code(value)
+        return [] if code is None else [i for i, c in enumerate(self.codes) if c == code]
+
+
+class ListColumn:
+    """Per-row tuples of dictionary strings."""
+
+    def __init__(self, dictionary, offsets, codes):
+        self.dictionary = tuple(dictionary)
+        self.offsets = offsets
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> tuple:
+        return tuple(self.dictionary[c] for c in self.codes[self.offsets[i]:self.offsets[i + 1]])
+
+    def rows_with(self, value) -> list[int]:
+        if value not in self.dictionary[1:]:
+            return []
+        code = self.dictionary.index(value, 1)
+        return [i for i in range(len(self)) if code in self.codes[self.offsets[i]:self.offsets[i + 1]]]
+
+
+class Snapshot:
+    """A memory-mapped snapshot file; columns are read lazily and cached."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                raise SnapshotError(f"{path}: not a deal snapshot") from None
+        self._view = memoryview(self._map)
+        self._cache = {}
+        self._views = []  # released on close so the map can be unmapped
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise SnapshotError(f"{path}: not a deal snapshot")
+        try:
+            (size,) = struct.unpack_from("<I", self._map, len(MAGIC))
+            header = json.loads(bytes(self._view[len(MAGIC) + 4:len(MAGIC) + 4 + size]))
+            self.rows = header["rows"]
+            self._columns = header["columns"]
+            self._base = len(MAGIC) + 4 + size
+        except (ValueError, KeyError, struct.error) as e:
+            self.close()
+            raise SnapshotError(f"{path}: unreadable snapshot header ({e})") from None
+
+    def __len__(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _section(self, spec: dict, index: int, typecode: str | None = None):
+        start, length = spec["sections"][index]
+        view = self._view[self._base + start:self._base + start + length]
+        self._views.append(view)
+        if typecode is None:
+            return view
+        if sys.byteorder != "little":
+            values = array(typecode, view)
+            values.byteswap()
+            return values
+        view = view.cast(typecode)
+        self._views.append(view)
+        return view
+
+    def column(self, name: str):
+        """
+        Column `name` as a sequence: str for text, values for dict columns,
+        tuples for merchants, numbers (NaN / -1 for None) or flag bytes.
+        """
+        if name in self._cache:
+            return self._cache[name]
+        spec = self._columns.get(name)
+        if spec is None:
+            raise KeyError(f"No column {name!r} in {self.path}")
+        kind = spec["kind"]
+        if kind == "text":
+            column = TextColumn(self._section(spec, 0, "I"), self._section(spec, 1))
+        elif kind == "dict":
+            column = DictColumn(spec["dictionary"], self._section(spec, 0, "H"))
+        elif kind == "list":
+            column = ListColumn(spec["dictionary"], self._section(spec, 0, "I"), self._section(spec, 1, "H"))
+        elif kind == "number":
+            column = self._section(spec, 0, NUMBER_TYPES[name])
+        else:
+            column = self._section(spec, 0)
+        self._cache[name] = column
+        return column
+
+    def flag(self, name: str) -> list[bool]:
+        bit = 1 << FLAGS.index(name)
+        return [bool(b & bit) for b in self.column("flags")]
+
+    def row(self, i: int, columns=COLUMNS) -> dict:
+        """One row as a dict of `columns` (numbers with None restored)."""
+        out = {}
+        for name in columns:
+            value = self.column(name)[i]
+            if name == "flags":
+                value = {flag: bool(value & (1 << b)) for b, flag in enumerate(FLAGS)}
+            elif name in NUMBER_TYPES and (value == -1 if NUMBER_TYPES[name] == "h" else math.isnan(value)):
+                value = None
+            out[name] = value
+        return out
+
+    def close(self):
+        """Unmap the file; columns read from it must not be used afterwards."""
+        self._cache.clear()
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        self._map.close()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Personal watchlists matched through an inverted index.
+
+A subscriptions file lists people and their watches; a watch matches a deal
+when every clause holds:
+
+    {"subscribers": [
+      {"name": "Sam", "email": "sam@example.com", "min_score": 5,
+       "watches": [
+         {"keywords": ["M4 Pro"], "merchants": ["JB Hi-Fi"]},
+         {"keywords": ["20x"], "gift_cards": ["tcn"], "min_score": 8}
+       ]}
+    ]}
+
+    keywords    every phrase appears in the title (case-insensitive)
+    merchants   the deal names at least one of these merchants (case-insensitive)
+    gift_cards  the deal's gift card type is one of these
+    min_score   the deal scores at least this (watch value, else subscriber's)
+
+Every clause of every watch is indexed by the terms that satisfy it (title
+words, merchant names, card types). A deal looks up only its own terms and
+sets one bit per satisfied clause, so routing costs time proportional to the
+postings it touches, not subscribers × deals. Phrases are verified and scores
+read only for watches whose clauses all hit.
+"""
+import re
+import json
+from typing import NamedTuple
+
+_WORD = re.compile(r"[a-z0-9]+")
+_ANY = ("*",)  # term every deal has (watches with no term clauses)
+
+
+class SubscriptionError(ValueError):
+    """Raised for malformed subscription files."""
+
+
+class Watch(NamedTuple):
+    subscriber: str
+    phrases: tuple[str, ...]   # lowercase, single-spaced
+    merchants: tuple[str, ...]
+    gift_cards: tuple[str, ...]
+    min_score: float
+
+    def describe(self) -> str:
+        parts = [" + ".join(f'"{p}"' for p in self.phrases)]
+        if self.merchants:
+            parts.append("at " + "/".join(self.merchants))
+        if self.gift_cards:
+            parts.append("on " + "/".join(self.gift_cards))
+        if self.min_score:
+            parts.append(f"score ≥ {self.min_score:g}")
+        return " ".join(p for p in parts if p)
+
+
+def words(text: str) -> list[str]:
+    return _WORD.findall((text or "").lower())
+
+
+class SubscriptionIndex:
+    """Inverted index over every subscriber's watches."""
+
+    def __init__(self, subscribers: list[dict]):
+        self.subscribers = {}        # name -> subscriber dict
+        self.watches: list[Watch] = []
+        self.required: list[int] = []  # per watch: bitmask with one bit per clause
+        self.postings: dict[tuple[str, str], list[tuple[int, int]]] = {}  # (kind, term) -> [(watch, clause bit)]
+        for sub in subscribers:
+            name = sub.get("name")
+            if not name or name in self.subscribers:
+                raise SubscriptionError(f"Subscriber needs a unique name: {sub}")
+            self.subscribers[name] = sub
+            for spec in sub.get("watches", ()):
+                self._add(name, spec, sub.get("min_score", 0))
+
+    def _add(self, subscriber: str, spec: dict, default_min: float):
+        unknown = set(spec) - {"keywords", "merchants", "gift_cards", "min_score"}
+        if unknown:
+            raise SubscriptionError(f"Unknown watch fields {sorted(unknown)} for {subscriber!r}")
+        phrases = tuple(" ".join(words(k)) for k in spec.get("keywords", ()))
+        if not all(phrases):
+            raise SubscriptionError(f"Empty keyword in watch for {subscriber!r}")
+        watch = Watch(subscriber, phrases, tuple(spec.get("merchants", ())),
+                      tuple(g.lower() for g in spec.get("gift_cards", ())), spec.get("min_score", default_min))
+        clauses = [[("word", w)] for w in dict.fromkeys(w for p in phrases for w in p.split())]
+        if watch.merchants:
+            clauses.append([("merchant", m) for m in dict.fromkeys(m.lower() for m in watch.merchants)])
+        if watch.gift_cards:
+            clauses.append([("card", g) for g in watch.gift_cards])
+        if not clauses:
+            clauses.append([("any", "*")])
+
+        w = len(self.watches)
+        self.watches.append(watch)
+        self.required.append((1 << len(clauses)) - 1)
+        for bit, terms in enumerate(clauses):
+            for term in terms:
+                self.postings.setdefault(term, []).append((w, 1 << bit))
+
+    def match(self, title: str, merchants=(), gift_card: str | None = None, score=None) -> list[Watch]:
+        """
+        Watches matching one deal, in subscription order. `score` is a number
+        or a callable returning one; it is only called if some candidate has
+        a min_score.
+        """
+        terms = [("word", t) for t in dict.fromkeys(words(title))]
+        terms += [("merchant", m.lower()) for m in merchants]
+        if gift_card:
+            terms.append(("card", gift_card.lower()))
+        terms.append(("any", "*"))
+
+        hits = {}
+        for term in terms:
+            for w, bit in self.postings.get(term, ()):
+                hits[w] = hits.get(w, 0) | bit
+
+        text = " " + " ".join(words(title)) + " "
+        out = []
+        for w in sorted(hits):
+            if hits[w] != self.required[w]:
+                continue
+            watch = self.watches[w]
+            if not all(f" {p} " in text for p in watch.phrases):
+                continue
+            if watch.min_score:
+                if callable(score):
+                    score = score()
+                if (score or 0) < watch.min_score:
+                    continue
+            out.append(watch)
+        return out
+
+
+def load_subscriptions(path: str) -> SubscriptionIndex:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get("subscribers"), list):
+        raise SubscriptionError(f"{path}: expected {{\"subscribers\": [...]}}")
+    return SubscriptionIndex(data["subscribers"])
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Test the FTS5 deal history: upserts across runs, ranked search and filters."""
+
+import os
+import random
+import tempfile
+import time
+
+from deal_history import DealHistory, fts_query
+
+print("🧪 Deal History Search Test\n")
+print("=" * 80)
+
+
+def deal(title, link, source="GCDB", merchants=(), chip=None, gc_type=None, x=None, score=0):
+    return {"title": title, "link": link, "source": source, "merchants": merchants, "chip": chip,
+            "gc_type": gc_type, "multiplier": x, "score": score}
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    history = DealHistory(os.path.join(tmp, "history.sqlite"))
+    history.record("2026-01-05", [
+        deal("Ultimate Gift Card 20x Points at Woolworths", "https://gcdb/1", merchants=("Woolworths",),
+             gc_type="ultimate", x=20, score=14),
+        deal("MacBook Pro M4 Pro at Officeworks - click & collect", "https://oz/2", source="OzBargain",
+             merchants=("Officeworks",), chip="M4 Pro", score=9),
+        deal("Costco manual check", ""),
+    ])
+    history.record("2026-02-10", [
+        deal("Ultimate Gift Cards 20x Everyday Rewards points at Woolworths", "https://gcdb/1",
+             merchants=("Woolworths",), gc_type="ultimate", x=20, score=15),  # same link, reworded
+        deal("Ultimate Gift Card 10x Points at Woolworths", "https://gcdb/3", merchants=("Woolworths",),
+             gc_type="ultimate", x=10, score=10),
+        deal("iPad Air M2 at JB Hi-Fi in stock", "https://oz/4", source="OzBargain", merchants=("JB Hi-Fi",),
+             chip="M2", score=6),
+    ])
+
+    hits = history.search("20x ultimate card")  # stemmed: "card" finds "Cards"
+    for r in hits:
+        print(f"   {r['last_seen']} [{r['score']}] {r['title']} (first seen {r['first_seen']})")
+    assert [r["link"] for r in hits] == ["https://gcdb/1"]
+    assert (hits[0]["first_seen"], hits[0]["last_seen"], hits[0]["score"]) == ("2026-01-05", "2026-02-10", 15)
+    assert "Everyday Rewards" in hits[0]["title"]
+    assert [r["link"] for r in history.search("everyday rewards")] == ["https://gcdb/1"]
+    history.db.execute("INSERT INTO deals_fts (deals_fts) VALUES ('integrity-check')")  # index matches table
+
+    assert [r["link"] for r in history.search("ultimate", recent=True, min_score=11)] == ["https://gcdb/1"]
+    assert [r["link"] for r in history.search("m4 pro", merchant="officeworks")] == ["https://oz/2"]
+    assert [r["link"] for r in history.search(chip="m2")] == ["https://oz/4"]
+    assert [r["link"] for r in history.search(merchant="JB Hi-Fi")] == ["https://oz/4"]
+    assert len(history.search(source="ozbargain")) == 2
+    assert history.search("nothing matches this") == []
+    assert len(history.search("")) == 5
+    assert fts_query('JB Hi-Fi "20x"') == '"JB" AND "Hi" AND "Fi" AND "20x"'  # no query-syntax injection
+
+    # Two years of daily runs: 60 deals a day, half of them repeats
+    rng = random.Random(6)
+    words = "ultimate tcn apple gift card points bonus flybuys everyday rewards macbook ipad m4 m3 pro air".split()
+    stores = ["Woolworths", "Coles", "Officeworks", "JB Hi-Fi", "Big W"]
+    start = time.perf_counter()
+    for day in range(730):
+        run = [deal(" ".join(rng.sample(words, 5)) + f" {rng.choice([10, 15, 20, 30])}x at {store}",
+                    f"https://example.com/{rng.randint(0, day * 30 + 60)}", merchants=(store,),
+                    score=rng.randint(0, 20))
+               for store in rng.choices(stores, k=60)]
+        history.record(f"2027-{day // 28 % 12 + 1:02d}-{day % 28 + 1:02d}", run)
+    elapsed = time.perf_counter() - start
+    history.db.execute("INSERT INTO deals_fts (deals_fts) VALUES ('integrity-check')")
+    total = history.db.execute("SELECT count(*) FROM deals").fetchone()[0]
+    print(f"\n   730 runs recorded in {elapsed:.2f}s ({elapsed / 730 * 1000:.1f} ms/run), {total:,} distinct deals")
+
+    for query, kwargs in [("20x ultimate", {}), ("macbook pro", {"merchant": "Officeworks"}),
+                          ("flybuys", {"min_score": 15, "recent": True})]:
+        statements = []
+        history.db.set_trace_callback(statements.append)
+        start = time.perf_counter()
+        rows = history.search(query, **kwargs)
+        elapsed = time.perf_counter() - start
+        history.db.set_trace_callback(None)
+        print(f"   search {query!r} {kwargs}: {len(rows)} rows in {elapsed * 1000:.1f} ms")
+        # The full-text index picks the deals; each is then looked up by key, never scanned
+        sql = next(s for s in statements if s.startswith("SELECT"))
+        plan = [r["detail"] for r in history.db.execute("EXPLAIN QUERY PLAN " + sql)]
+        assert any(p.startswith("SCAN deals_fts VIRTUAL TABLE INDEX") for p in plan), plan
+        assert "SEARCH d USING INTEGER PRIMARY KEY (rowid=?)" in plan, plan
+        assert "SEARCH s USING PRIMARY KEY (deal_id=?)" in plan, plan
+        assert not any(p.split()[:2] in (["SCAN", "d"], ["SCAN", "s"]) for p in plan), plan
+    history.close()
+
+print("\n" + "=" * 80)
+print("✅ Deal history search test complete!")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Compare per-item memory of slotted Deal records with the old per-item dicts."""
+
+import random
+import tracemalloc
+
+from daily_combined_report import (
+    Arbitrage, ChipInfo, Deal, StackDeal, LAZY_FIELDS, enrich_daily_item, enrich_stack_item,
+)
+
+N = 100_000
+
+titles = [
+    "Ultimate Gift Card 20x Points at Woolworths",
+    "Apple Gift Cards at Coles - 10x Everyday Rewards Points",
+    "MacBook Pro M4 at Officeworks - Click & Collect - 20x Points",
+    "JB Hi-Fi Gift Card 15x Points at Big W - ShopBack 5%",
+    "TCN Gift Card Deal at Woolworths - 10x Points",
+    "Harvey Norman M2 Max Mac Studio in-store c&c",
+    "Electronics at Amazon - TopCashback 4%",
+]
+rng = random.Random(5)
+words = " ".join(titles).split()
+pool = [" ".join(rng.choice(words) for _ in range(rng.randint(3, 10))) for _ in range(2000)]
+raw = [{"source": "OzBargain", "title": pool[i % len(pool)], "link": f"https://www.ozbargain.com.au/node/{i}"}
+       for i in range(N)]
+
+
+def as_dict(deal):
+    """The same item as the report used to build it: a dict with list / dict sub-records."""
+    out = {}
+    for k, v in deal.items():
+        if isinstance(v, ChipInfo):
+            v = {"chip": v.chip, "generation": v.generation, "tier": v.tier}
+        elif isinstance(v, Arbitrage):
+            v = {"eligible": v.eligible, "targets": list(v.targets), "confidence": v.confidence}
+        elif isinstance(v, tuple) and k != "features":
+            v = list(v)
+        out[k] = v
+    return out
+
+
+def measure(build):
+    tracemalloc.start()
+    items = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return items, size
+
+
+print("🧪 Deal Record Memory Test\n")
+print("=" * 80)
+
+for name, enrich, cls in [("daily", enrich_daily_item, Deal), ("stack", enrich_stack_item, StackDeal)]:
+    enriched = {}  # title -> fully enriched deal (titles repeat, so enrich each once)
+    for it in raw[:len(pool)]:
+        d = enriched[it["title"]] = enrich(cls(it))
+        if cls is StackDeal:
+            for k in LAZY_FIELDS:
+                d[k]
+    deals = [cls(enriched[it["title"]], link=it["link"]) for it in raw]
+    # Values (titles, hints, features) are shared by both layouts; only the
+    # per-item containers differ
+    _, slotted = measure(lambda: [cls(d) for d in deals])
+    _, dicts = measure(lambda: [as_dict(d) for d in deals])
+    print(f"\n{name}: {N:,} items")
+    print(f"   dict items:  {dicts / 2**20:7.1f} MiB  ({dicts / N:.0f} B/item)")
+    print(f"   Deal items:  {slotted / 2**20:7.1f} MiB  ({slotted / N:.0f} B/item)")
+    print(f"   saved:       {1 - slotted / dicts:.0%}")
+    assert slotted < dicts * 0.6, (name, slotted, dicts)
+
+# Dict-style access keeps working
+d = enrich_stack_item({"source": "Test", "title": titles[2], "link": "https://example.com"})
+assert d["title"] == titles[2] and d.get("missing", 1) == 1 and "why" not in d
+assert d.get("score") > 0 and "score" in d
+assert d["chip_info"].get("chip") == "M4" and d["arbitrage"].get("confidence") == "high"
+assert StackDeal(d).items() == d.items()
+
+print("\n" + "=" * 80)
+print("✅ Deal record memory test complete!")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Test the deal history rollups: incremental counts match a full recount and stay small."""
+
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+from deal_history import DealHistory, multiplier_bucket
+import daily_combined_report as report
+
+print("🧪 Deal Rollups Test\n")
+print("=" * 80)
+
+
+def deal(title, link, source="GCDB", merchants=(), gc_type=None, x=None, confidence="none"):
+    return {"title": title, "link": link, "source": source, "merchants": merchants, "gc_type": gc_type,
+            "multiplier": x, "confidence": confidence, "score": None}
+
+
+def counts(history, *args, **kwargs):
+    return {tuple(r)[:-1]: r["deals"] for r in history.stats(*args, **kwargs)}
+
+
+assert [multiplier_bucket(x) for x in (None, 0, 1, 5, 14, 20, 30)] == ["none", "none", "1-4x", "5-9x", "10-14x",
+                                                                       "20x+", "20x+"]
+
+with tempfile.TemporaryDirectory() as tmp:
+    history = DealHistory(os.path.join(tmp, "history.sqlite"))
+    ultimate = deal("Ultimate 20x at Woolworths", "https://gcdb/1", merchants=("Woolworths",), gc_type="ultimate",
+                    x=20, confidence="high")
+    tcn = deal("TCN 10x at Coles and Big W", "https://fp/2", source="FreePoints", merchants=("Coles", "Big W"),
+               gc_type="tcn", x=10)
+    history.record("2026-01-05", [ultimate, tcn])
+    history.record("2026-01-06", [ultimate])
+    history.record("2026-01-06", [ultimate])  # a second run the same day doesn't count again
+    history.record("2026-02-01", [ultimate, deal("iPad Air M2 at JB Hi-Fi", "https://oz/3", source="OzBargain",
+                                                 merchants=("JB Hi-Fi",), confidence="high")])
+
+    assert counts(history) == {("*",): 3}
+    assert counts(history, per="month", by=("gc_type",), bucket="20x+") == {("2026-01", "ultimate"): 1,
+                                                                             ("2026-02", "ultimate"): 1}
+    assert counts(history, per="day", since="2026-01-06") == {("2026-01-06",): 1, ("2026-02-01",): 2}
+    assert counts(history, by=("merchant",), confidence="HIGH") == {("*", "Woolworths"): 1, ("*", "JB Hi-Fi"): 1}
+    assert counts(history, by=("source",)) == {("*", "GCDB"): 1, ("*", "FreePoints"): 1, ("*", "OzBargain"): 1}
+    assert counts(history, by=("merchant",), source="FreePoints") == {("*", "Coles"): 1, ("*", "Big W"): 1}
+    assert counts(history, merchant="coles") == {("*",): 1}
+    for bad in ({"per": "week"}, {"by": ("title",)}, {"chip": "M4"}):
+        try:
+            history.stats(**bad)
+            assert False, bad
+        except ValueError:
+            pass
+    print(f"✅ Rollups: {counts(history, by=('merchant',))}")
+
+    # A backfilled earlier day moves nothing it shouldn't
+    history.record("2025-12-20", [ultimate])
+    assert counts(history, per="month", by=("gc_type",)) == {("2025-12", "ultimate"): 1, ("2026-01", "ultimate"): 1,
+                                                             ("2026-01", "tcn"): 1, ("2026-02", "ultimate"): 1,
+                                                             ("2026-02", ""): 1}
+    assert counts(history) == {("*",): 3}
+
+    # A year of runs: incremental counts equal a full recount, and all-time rollups don't grow with history
+    rng = random.Random(48)
+    stores = ["Woolworths", "Coles", "Officeworks", "JB Hi-Fi", "Big W", "Myer"]
+    catalog = [deal(f"Deal {i}", f"https://oz/node/{i}", source=rng.choice(["GCDB", "FreePoints", "OzBargain"]),
+                    merchants=tuple(rng.sample(stores, rng.randint(0, 2))),
+                    gc_type=rng.choice([None, "ultimate", "tcn", "apple"]), x=rng.choice([None, 5, 10, 20]),
+                    confidence=rng.choice(["none", "low", "medium", "high"])) for i in range(3000)]
+    all_time_rows, seen = [], set()
+    start = time.perf_counter()
+    for day in range(360):
+        run = rng.sample(catalog, 60)
+        seen.update(d["link"] for d in run)
+        history.record(f"2025-{day // 30 + 1:02d}-{day % 30 + 1:02d}", run)
+        if day % 90 == 89:
+            all_time_rows.append(history.db.execute("SELECT count(*) FROM rollups WHERE grain = 'all'").fetchone()[0])
+    per_run_ms = (time.perf_counter() - start) * 1000 / 360
+    incremental = history.db.execute("SELECT * FROM rollups ORDER BY 1, 2, 3, 4, 5, 6, 7").fetchall()
+    history.rebuild_rollups()
+    assert history.db.execute("SELECT * FROM rollups ORDER BY 1, 2, 3, 4, 5, 6, 7").fetchall() == incremental
+    bound = 3 * 7 * 4 * 5 * 4  # sources × merchants (with "*") × card types × buckets × confidences
+    assert all_time_rows[-1] <= bound and all_time_rows[-1] - all_time_rows[-2] <= all_time_rows[0] // 10, all_time_rows
+
+    start = time.perf_counter()
+    top = history.stats(by=("merchant",), confidence="high")
+    query_ms = (time.perf_counter() - start) * 1000
+    expected = 1 + sum(1 for d in catalog if d["link"] in seen and "Woolworths" in d["merchants"]
+                       and d["confidence"] == "high")  # plus the Ultimate deal above
+    assert {r["merchant"]: r["deals"] for r in top}["Woolworths"] == expected
+    print(f"✅ Year of runs: {per_run_ms:.1f} ms per run; all-time rollup rows {all_time_rows} (bound {bound}); "
+          f"top merchant query {query_ms:.2f} ms")
+    assert query_ms < 50, query_ms
+    history.close()
+
+    # A version 2 history gets rollups built on open
+    path = os.path.join(tmp, "v2.sqlite")
+    old = DealHistory(path)
+    old.record("2026-03-01", [tcn])
+    old.record("2026-03-02", [tcn])
+    old.db.execute("DELETE FROM rollups")
+    old.db.execute("PRAGMA user_version = 2")
+    old.db.commit()
+    old.close()
+    upgraded = DealHistory(path)
+    assert counts(upgraded, per="day", by=("merchant",)) == {("2026-03-01", "Big W"): 1, ("2026-03-01", "Coles"): 1,
+                                                             ("2026-03-02", "Big W"): 1, ("2026-03-02", "Coles"): 1}
+    assert counts(upgraded) == {("*",): 1}
+    upgraded.close()
+    print("✅ Version 2 history upgraded")
+
+    # A combined run records the stack deals, then the same deals from the daily report (no arbitrage)
+    real_state_dir, report.STATE_DIR = report.STATE_DIR, tmp
+    try:
+        title = "MacBook Pro M4 at JB Hi-Fi in stock - 20x Points on Gift Cards"
+        stack = report.enrich_stack_item(report.Deal({"source": "OzBargain", "title": title, "link": "https://oz/77"}))
+        confidence = stack["arbitrage"].confidence
+        assert confidence != "none"
+        report.record_history([stack])
+        report.record_history([report.Deal({"source": "OzBargain", "title": title, "link": "https://oz/77"})])
+        daily_only = report.Deal({"source": "GCDB", "title": "Daily-only deal 10x", "link": "https://gcdb/78"})
+        report.record_history([daily_only])
+        combined = report.open_history()
+        stored = dict(combined.db.execute("SELECT link, confidence FROM deals").fetchall())
+        assert stored == {"https://oz/77": confidence, "https://gcdb/78": None}, stored
+        assert counts(combined, by=("confidence",)) == {("*", confidence): 1, ("*", "unknown"): 1}
+        combined.rebuild_rollups()
+        assert counts(combined, by=("confidence",)) == {("*", confidence): 1, ("*", "unknown"): 1}
+        combined.close()
+        print(f"✅ Stack confidence {confidence!r} survives the daily run")
+
+        # Stack deals pruned from the Top 5 are recorded with their real confidence but without a score
+        stores = ["JB Hi-Fi in stock", "Officeworks", "Coles", "Woolworths", "Harvey Norman c&c", ""]
+        pool = [report.enrich_stack_item(report.Deal({
+            "source": "OzBargain", "title": f"Deal {i} at {stores[i % len(stores)]} - {(i % 4) * 5}x points",
+            "link": f"https://oz/pool/{i}"})) for i in range(60)]
+        report.select_top([x for x in pool if not x["exclude_from_top"]], 5)
+        pruned = [x for x in pool if "score" not in x]
+        assert pruned and all("arbitrage" not in x for x in pruned)
+        report.record_history(pool)
+        report.save_snapshot("stack", pool)
+        assert all("score" not in x and "arbitrage" not in x for x in pruned)  # recording scores nothing
+        combined = report.open_history()
+        rows = {r["link"]: (r["score"], r["confidence"]) for r in combined.db.execute(
+            "SELECT link, score, confidence FROM deals WHERE link LIKE 'https://oz/pool/%'")}
+        for x in pool:
+            expected_score = x["score"] if "score" in x else None
+            assert rows[x["link"]] == (expected_score, report.calculate_arbitrage(x).confidence), x["title"]
+        assert {c for _, c in rows.values()} >= {"none", "high"} and "unknown" not in {c for _, c in rows.values()}
+        pool_counts = Counter(c for _, c in rows.values())
+        expected = pool_counts + Counter({confidence: 1, "unknown": 1})  # plus the two deals recorded above
+        assert counts(combined, by=("confidence",)) == {("*", c): n for c, n in expected.items()}
+        combined.close()
+        print(f"✅ {len(pruned)} pruned stack deals recorded unscored, by confidence: {dict(pool_counts)}")
+    finally:
+        report.STATE_DIR = real_state_dir
+
+print("\n" + "=" * 80)
+print("✅ Deal rollups test complete!")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Test union-find deduplication: transitive title/link groups, best score kept."""
+
+import random
+import time
+
+import daily_combined_report as report
+from daily_combined_report import deduplicate_items, norm
+
+
+def brute_force(items):
+    """Connected components by repeated merging (slow but obviously right)."""
+    groups = []
+    for i, it in enumerate(items):
+        keys = {("t", norm(it.get("title", "")).lower()), ("l", it.get("link", ""))} - {("t", ""), ("l", "")}
+        merged = {"keys": keys, "members": [i]}
+        for g in [g for g in groups if g["keys"] & keys]:
+            groups.remove(g)
+            merged["keys"] |= g["keys"]
+            merged["members"] = sorted(merged["members"] + g["members"])
+        groups.append(merged)
+    groups.sort(key=lambda g: g["members"][0])
+    return [items[max(g["members"], key=lambda i: (items[i].get("score", 0), -i))] for g in groups]
+
+
+print("🧪 Deduplication Test\n")
+print("=" * 80)
+
+# A~B by title, B~C by link: one group, best score wins, kept at A's position
+items = [
+    {"title": "Ultimate Gift Card 20x Points", "link": "https://a", "score": 10},
+    {"title": "Something else", "link": "https://x", "score": 1},
+    {"title": "ultimate  gift card 20x points", "link": "https://b", "score": 8},
+    {"title": "Different title entirely", "link": "https://b", "score": 14},
+]
+result = deduplicate_items(items)
+for it in result:
+    print(f"   [{it['score']}] {it['title']}  {it['link']}")
+assert result == [items[3], items[1]], result
+
+# Ties keep the first item; no score behaves like 0
+items = [{"title": "Same", "link": "1"}, {"title": "same", "link": "2"}, {"title": "Other", "link": "2"}]
+assert deduplicate_items(items) == [items[0]]
+
+# Randomised comparison with the brute-force grouping
+rng = random.Random(11)
+for _ in range(300):
+    items = [{"title": rng.choice(["A", "a ", "B", "C", "", "D  d"]), "link": rng.choice(["1", "2", "3", "", "4"]),
+              "score": rng.choice([0, 1, 4, 4.5, 10])} for _ in range(rng.randint(0, 25))]
+    assert deduplicate_items(items) == brute_force(items), items
+
+# Scales linearly: 100k items with many duplicate titles and links, each title normalised once
+# (no pairwise comparison) and one kept item per connected title/link group
+items = [{"title": f"Deal {rng.randint(0, 40_000)}", "link": f"https://example.com/{rng.randint(0, 60_000)}",
+          "score": rng.randint(0, 20)} for _ in range(100_000)]
+calls = 0
+
+
+def counted_norm(text):
+    global calls
+    calls += 1
+    return norm(text)
+
+
+report.norm = counted_norm
+try:
+    start = time.perf_counter()
+    result = deduplicate_items(items)
+    elapsed = time.perf_counter() - start
+finally:
+    report.norm = norm
+print(f"\n100,000 items → {len(result):,} groups in {elapsed:.2f}s")
+assert calls == len(items)
+links_by_title = {}
+for it in items:
+    links_by_title.setdefault(it["title"], set()).add(it["link"])
+titles_by_link = {}
+for title, links in links_by_title.items():
+    for link in links:
+        titles_by_link.setdefault(link, []).append(title)
+seen, components = set(), 0
+for title in links_by_title:
+    if title in seen:
+        continue
+    components += 1
+    seen.add(title)
+    stack = [title]
+    while stack:
+        for link in links_by_title[stack.pop()]:
+            for other in titles_by_link[link]:
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+assert len(result) == components, (len(result), components)
+
+print("\n" + "=" * 80)
+print("✅ Deduplication test complete!")
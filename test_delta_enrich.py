@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Test delta enrichment: run state round trips, reuse, and every reason to recompute."""
+
+import os
+import tempfile
+
+from enrichment_memo import EnrichmentMemo
+import daily_combined_report as report
+from daily_combined_report import (STACK_FIELDS, StackDeal, delta_enrich, delta_key, enrich_stack_item,
+                                   load_run_state, save_run_state, stack_inputs)
+
+print("🧪 Delta Enrichment Test\n")
+print("=" * 80)
+
+calls = []
+
+
+def enrich(it):
+    calls.append(it.get("title", ""))
+    return enrich_stack_item(it)
+
+
+def run(raw, previous, memo=None):
+    calls.clear()
+    return delta_enrich([StackDeal(it) for it in raw], previous, enrich, STACK_FIELDS, memo, 1, stack_inputs)
+
+
+raw = [
+    {"source": "GCDB", "title": "Ultimate Gift Card 20x Points at Woolworths", "link": "https://gcdb/1"},
+    {"source": "GCDB", "title": "TCN Gift Card 10x Points at Coles", "link": "https://gcdb/2"},
+]
+
+with tempfile.TemporaryDirectory() as tmp:
+    real_state_dir, report.STATE_DIR = report.STATE_DIR, tmp
+    try:
+        # Missing or corrupt state means nothing to reuse
+        assert load_run_state("stack") == {}
+        with open(os.path.join(tmp, "stack.json"), "w") as f:
+            f.write('{"rules_version": ')
+        assert load_run_state("stack") == {}
+        first, stats = run(raw, load_run_state("stack"))
+        assert stats == {"recomputed": 2, "reused": 0, "memo": 0} and len(calls) == 2
+        print("✅ Missing / corrupt state: everything enriched")
+
+        # Unchanged items reuse the saved fields without calling enrich
+        save_run_state("stack", first, STACK_FIELDS)
+        previous = load_run_state("stack")
+        assert set(previous) == {delta_key(it) for it in raw}
+        again, stats = run(raw, previous)
+        assert stats == {"recomputed": 0, "reused": 2, "memo": 0} and calls == []
+        for old, new in zip(first, again):
+            assert {k: new[k] for k in STACK_FIELDS} == {k: old[k] for k in STACK_FIELDS}
+            assert new["merchants"] == old["merchants"] and new["title"] == old["title"]
+        print("✅ Unchanged items reused")
+
+        # Same link with a new title is enriched again
+        edited = [dict(raw[0], title="Ultimate Gift Card 30x Points at Woolworths"), raw[1]]
+        changed, stats = run(edited, previous)
+        assert stats == {"recomputed": 1, "reused": 1, "memo": 0}
+        assert calls == ["Ultimate Gift Card 30x Points at Woolworths"]
+        assert changed[0]["features"].x == 30
+        print("✅ Retitled item recomputed")
+
+        # A run input that changed since the state was saved (the promo tier) invalidates the item
+        shifted = {key: dict(cached) for key, cached in previous.items()}
+        shifted[delta_key(raw[1])]["promo_tier"] = "top"
+        assert stack_inputs(StackDeal(raw[1])) != {"promo_tier": "top"}
+        _, stats = run(raw, shifted)
+        assert stats == {"recomputed": 1, "reused": 1, "memo": 0} and calls == [raw[1]["title"]]
+
+        # ...also when the item would come from the memo
+        memo = EnrichmentMemo(os.path.join(tmp, "memo.sqlite"), namespace="stack:test")
+        memo.put(report.memo_key(raw[0]), {k: first[0][k] for k in STACK_FIELDS})
+        memo.put(report.memo_key(raw[1]), dict({k: first[1][k] for k in STACK_FIELDS}, promo_tier="top"))
+        _, stats = run(raw, {}, memo)
+        assert stats == {"recomputed": 1, "reused": 0, "memo": 1} and calls == [raw[1]["title"]]
+        memo.close()
+        print("✅ Changed run inputs recomputed (run state and memo)")
+
+        # State saved under other rules is ignored
+        real_version = report.RULES_VERSION
+        try:
+            report.RULES_VERSION = real_version + "-next"
+            assert load_run_state("stack") == {}
+            save_run_state("stack", first, STACK_FIELDS)
+            assert set(load_run_state("stack")) == set(previous)
+        finally:
+            report.RULES_VERSION = real_version
+        assert load_run_state("stack") == {}
+        print("✅ Rules version change invalidates the state")
+
+        # A state directory that can't be written doesn't fail the run or leave a temp file behind
+        blocked = os.path.join(tmp, "blocked")
+        os.makedirs(os.path.join(blocked, "stack.json"))
+        report.STATE_DIR = blocked
+        save_run_state("stack", first, STACK_FIELDS)
+        assert os.listdir(blocked) == ["stack.json"] and load_run_state("stack") == {}
+        report.STATE_DIR = os.path.join(tmp, "memo.sqlite", "state")  # under a file
+        save_run_state("stack", first, STACK_FIELDS)
+        print("✅ Unwritable state skipped and cleaned up")
+    finally:
+        report.STATE_DIR = real_state_dir
+
+print("\n" + "=" * 80)
+print("✅ Delta enrichment test complete!")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Test multiprocess enrichment against inline enrichment."""
+
+import os
+import random
+import time
+
+from daily_combined_report import (
+    DAILY_FIELDS, LAZY_FIELDS, STACK_FIELDS, Deal, StackDeal,
+    enrich_daily_item, enrich_many, enrich_stack_item,
+)
+
+titles = [
+    "Ultimate Gift Card 20x Points at Woolworths",
+    "Apple Gift Cards at Coles - 10x Everyday Rewards Points",
+    "MacBook Pro M4 at Officeworks - Click & Collect - 20x Points",
+    "JB Hi-Fi Gift Card 15x Points at Big W - ShopBack 5%",
+    "TCN Gift Card Deal at Woolworths - 10x Points",
+    "Harvey Norman M2 Max Mac Studio in-store c&c",
+    "Electronics at Amazon - TopCashback 4%",
+    "Cheap socks",
+]
+
+print("🧪 Parallel Enrichment Test\n")
+print("=" * 80)
+
+rng = random.Random(3)
+words = " ".join(titles).split()
+items = [{"source": "Test", "title": " ".join(rng.choice(words) for _ in range(rng.randint(1, 10))),
+          "link": f"https://example.com/{i}"} for i in range(3000)]
+items += items[:200]  # repeated titles are enriched once
+
+workers = 4
+for name, enrich, fields, wrap in [
+    ("daily", enrich_daily_item, DAILY_FIELDS, Deal),
+    ("stack", enrich_stack_item, STACK_FIELDS + tuple(LAZY_FIELDS), StackDeal),
+]:
+    raw = [wrap(it) for it in items]
+    start = time.perf_counter()
+    inline = enrich_many(raw, enrich, fields, workers=1)
+    inline_rows = [tuple(it[k] for k in fields) for it in inline]  # forces lazy fields too
+    inline_s = time.perf_counter() - start
+    start = time.perf_counter()
+    parallel = enrich_many(raw, enrich, fields, workers=workers)
+    parallel_s = time.perf_counter() - start
+
+    assert len(parallel) == len(raw)
+    for row, b, it in zip(inline_rows, parallel, raw):
+        assert type(b) is type(it)
+        assert b["link"] == it["link"]
+        assert tuple(b[k] for k in fields) == row, (name, it["title"])
+    print(f"   {name}: {len(raw)} items  inline {inline_s:.2f}s  {workers} workers {parallel_s:.2f}s"
+          f"  ({os.cpu_count()} cores)")
+
+# Small batches stay inline (no pool start-up)
+small = enrich_many(items[:10], enrich_daily_item, DAILY_FIELDS, workers=workers)
+assert all("features" in it for it in small)
+
+print("\n" + "=" * 80)
+print("✅ Parallel enrichment test complete!")
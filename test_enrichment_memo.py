@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""Test the persistent enrichment memo (round-trip, namespaces, eviction)."""
+
+import os
+import tempfile
+
+from enrichment_memo import EnrichmentMemo
+
+print("🧪 Enrichment Memo Test\n")
+print("=" * 80)
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "memo.sqlite")
+
+    memo = EnrichmentMemo(path, namespace="stack:v1")
+    memo.put("ultimate gift card 20x points at woolworths", {"score": 14, "merchants": ["Woolworths"]})
+    memo.close()
+
+    # Survives a restart
+    memo = EnrichmentMemo(path, namespace="stack:v1")
+    hit = memo.get("ultimate gift card 20x points at woolworths")
+    print(f"\nReloaded: {hit}")
+    assert hit == {"score": 14, "merchants": ["Woolworths"]}
+    assert memo.get("unknown title") is None
+    memo.close()
+
+    # Different rules version → different namespace → miss
+    other = EnrichmentMemo(path, namespace="stack:v2")
+    assert other.get("ultimate gift card 20x points at woolworths") is None
+    other.close()
+
+    # Size eviction keeps at most max_entries rows
+    memo = EnrichmentMemo(path, namespace="stack:v1", max_entries=10)
+    for i in range(25):
+        memo.put(f"title {i}", {"score": i})
+    memo.flush()
+    print(f"Entries after size eviction: {len(memo)}")
+    assert len(memo) == 10
+
+    # Age eviction drops entries not used within max_age_days
+    memo.db.execute("UPDATE memo SET last_used = 0")
+    memo.db.commit()
+    memo.flush()
+    print(f"Entries after age eviction: {len(memo)}")
+    assert len(memo) == 0
+    memo.close()
+
+print("\n" + "=" * 80)
+print("✅ Enrichment memo test complete!")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Test the deal history store: WAL, sightings/scores, index-only lookups and the v1 upgrade."""
+
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from deal_history import DealHistory, hash64, normalize_title, SCHEMA_VERSION
+
+print("🧪 Deal History Store Test\n")
+print("=" * 80)
+
+
+def deal(title, link, source="OzBargain", score=None):
+    return {"title": title, "link": link, "source": source, "merchants": ("JB Hi-Fi",), "chip": None,
+            "gc_type": None, "multiplier": None, "score": score}
+
+
+def plan(history, sql, params):
+    return " | ".join(r[3] for r in history.db.execute("EXPLAIN QUERY PLAN " + sql, params))
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "history.sqlite")
+    history = DealHistory(path)
+    assert history.db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert history.db.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+
+    history.record("2026-03-01", [deal("MacBook Air M3  ", "https://oz/1", score=7), deal("Costco check", "")], "r1")
+    history.record("2026-03-02", [deal("MacBook Air M3", "https://oz/1", score=8)], "r1")
+    history.record("2026-03-02", [deal("MacBook Air M3", "https://oz/1")], "r1")  # same day again, unscored
+    history.record("2026-03-04", [deal("MacBook Air M3", "https://oz/1", source="GCDB", score=6),
+                                  deal("macbook air m3", "https://oz/9")], "r2")  # repost under a new link
+
+    assert history.seen_stats(link="https://oz/1") == ("2026-03-01", 3)
+    assert history.seen_stats(link="https://oz/9") == ("2026-03-04", 1)
+    assert history.seen_stats(title="MacBook  AIR m3") == ("2026-03-01", 3)  # both links, distinct days
+    assert history.seen_stats(title="Costco check") == ("2026-03-01", 1)
+    assert history.seen_stats(link="https://oz/404") == (None, 0)
+    assert history.score_history("https://oz/1") == [("2026-03-01", 7), ("2026-03-02", 8), ("2026-03-04", 6)]
+    assert history.db.execute("SELECT score FROM deals WHERE link = 'https://oz/1'").fetchone()[0] == 6
+    assert history.db.execute("SELECT count(*) FROM sightings").fetchone()[0] == 5  # two sources on 03-04 count once a day
+    print(f"✅ First seen / times seen: {history.seen_stats(link='https://oz/1')}")
+
+    # Lookups use indexes only
+    lookup = plan(history, "SELECT id FROM deals WHERE link_hash = ? AND link = ?", (hash64("x"), "x"))
+    assert "USING INDEX deals_link_hash" in lookup, lookup
+    lookup = plan(history, "SELECT id FROM deals WHERE title_hash = ?", (hash64("x"),))
+    assert "COVERING INDEX deals_title_hash" in lookup, lookup
+    seen = plan(history, "SELECT min(seen_on), count(DISTINCT seen_on) FROM sightings WHERE deal_id IN (?, ?)", (1, 2))
+    assert "PRIMARY KEY" in seen and "SCAN" not in seen, seen
+    daily = plan(history, "SELECT deal_id FROM sightings WHERE seen_on = ? AND source = ?", ("2026-03-01", "GCDB"))
+    assert "COVERING INDEX sightings_day" in daily, daily
+    recent = plan(history, "SELECT id FROM deals WHERE source = ? ORDER BY last_seen DESC LIMIT 5", ("GCDB",))
+    assert "deals_source" in recent and "TEMP B-TREE" not in recent, recent
+    print(f"✅ Index-only plans: {seen}")
+
+    # A run's snapshot on top of a year of history
+    rng = random.Random(47)
+    catalog = [(f"Deal {i} {rng.choice(['MacBook', 'iPad', 'Gift Card'])}", f"https://oz/node/{i}") for i in range(5000)]
+    for day in range(365):
+        history.record(f"2025-{day // 31 + 1:02d}-{day % 28 + 1:02d}",
+                       [deal(t, link, score=rng.randint(0, 15)) for t, link in rng.sample(catalog, 60)], "r2")
+    run = [deal(t, link, score=rng.randint(0, 15)) for t, link in rng.sample(catalog, 60)]
+    start = time.perf_counter()
+    history.record("2026-04-01", run, "r2")
+    write_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for d in run:
+        history.seen_stats(link=d["link"])
+    lookup_ms = (time.perf_counter() - start) * 1000 / len(run)
+    print(f"✅ Run of 60 deals written in {write_ms:.1f} ms; first/times seen in {lookup_ms:.3f} ms per deal")
+    assert write_ms < 200, write_ms
+    assert lookup_ms < 5, lookup_ms
+    history.close()
+
+    # A history written by the first version (no hashes, no sightings) is upgraded in place
+    old = os.path.join(tmp, "v1.sqlite")
+    db = sqlite3.connect(old)
+    db.executescript("""
+        CREATE TABLE deals (id INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, link TEXT NOT NULL,
+            source TEXT NOT NULL, title TEXT NOT NULL, merchants TEXT NOT NULL, chip TEXT, gc_type TEXT,
+            multiplier INTEGER, score REAL, first_seen TEXT NOT NULL, last_seen TEXT NOT NULL);
+        INSERT INTO deals VALUES (1, 'https://oz/5', 'https://oz/5', 'GCDB', 'TCN 10x Points', '', NULL, 'tcn',
+            10, 9, '2025-12-01', '2026-01-15');
+    """)
+    db.close()
+    upgraded = DealHistory(old)
+    assert upgraded.seen_stats(link="https://oz/5") == ("2025-12-01", 2)
+    assert upgraded.seen_stats(title="tcn 10x points") == ("2025-12-01", 2)
+    assert upgraded.db.execute("SELECT title_hash FROM deals").fetchone()[0] == hash64(normalize_title("TCN 10x Points"))
+    upgraded.record("2026-02-01", [deal("TCN 10x Points", "https://oz/5", source="GCDB", score=9)])
+    assert upgraded.seen_stats(link="https://oz/5") == ("2025-12-01", 3)
+    assert [r["times_seen"] for r in upgraded.search("tcn")] == [3]
+    upgraded.close()
+    print("✅ Version 1 history upgraded")
+
+print("\n" + "=" * 80)
+print("✅ Deal history store test complete!")
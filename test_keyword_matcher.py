@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Test the Aho–Corasick keyword matcher against plain substring scans."""
+
+import os
+import json
+import random
+import tempfile
+
+from keyword_matcher import CACHE_FORMAT, KeywordMatcher, load_matcher, tables_digest
+
+TABLES = {
+    "keyword": ["gift card", "giftcard", "ultimate", "tcn", "20x", "apple"],
+    "merchant": ["Officeworks", "JB Hi-Fi", "The Good Guys", "Apple", "Harvey Norman"],
+    "stock": ["in stock", "click & collect", "c&c", "pick up", "pickup", "in store"],
+    "cashback": ["shopback", "topcashback", "cashback"],
+}
+
+
+def naive_scan(text):
+    t = text.lower()
+    found = {}
+    for cat, patterns in TABLES.items():
+        idxs = tuple(i for i, p in enumerate(patterns) if p.lower() in t)
+        if idxs:
+            found[cat] = idxs
+    return found
+
+
+test_titles = [
+    "Ultimate Gift Card 20x Points at Woolworths",
+    "Apple MacBook at JB Hi-Fi - Click & Collect",
+    "TopCashback 10% at The Good Guys (pickup in store)",
+    "Harvey Norman c&c in stock",
+    "Nothing relevant here",
+    "",
+]
+
+print("🧪 Keyword Matcher Test\n")
+print("=" * 80)
+
+matcher = KeywordMatcher(TABLES)
+for title in test_titles:
+    hits = matcher.scan(title)
+    assert hits == naive_scan(title), title
+    print(f"\n{title!r}")
+    for cat, idxs in hits.items():
+        print(f"   {cat}: {', '.join(TABLES[cat][i] for i in idxs)}")
+
+# Overlapping / nested patterns must all be reported
+hits = matcher.scan("topcashback")
+assert hits["cashback"] == (1, 2), hits
+
+# Randomised comparison with the naive scan
+rng = random.Random(1)
+alphabet = [p for ps in TABLES.values() for p in ps] + ["x", " ", "a", "10", "pick"]
+for _ in range(2000):
+    title = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 8)))
+    assert matcher.scan(title) == naive_scan(title), title
+
+# Disk cache round-trip (plain JSON, checked against the tables' digest)
+with tempfile.TemporaryDirectory() as cache_dir:
+    first = load_matcher(TABLES, cache_dir)
+    (name,) = os.listdir(cache_dir)
+    path = os.path.join(cache_dir, name)
+    assert name == f"matcher-{tables_digest(TABLES)}.json"
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    assert saved["format"] == CACHE_FORMAT and saved["digest"] == tables_digest(TABLES)
+    cached = load_matcher(TABLES, cache_dir)
+    for title in test_titles:
+        assert cached.scan(title) == first.scan(title)
+
+    # Anything that fails a check is rebuilt and rewritten
+    broken = [
+        "not json",
+        json.dumps(dict(saved, format=CACHE_FORMAT - 1)),
+        json.dumps(dict(saved, digest="0" * 16)),
+        json.dumps(dict(saved, delta=[{"a": len(saved["delta"])}] + saved["delta"][1:])),
+        json.dumps(dict(saved, out=saved["out"][:-1])),
+        json.dumps(dict(saved, out=[[["keyword"]]] * len(saved["out"]))),
+        json.dumps([saved]),
+    ]
+    for content in broken:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        rebuilt = load_matcher(TABLES, cache_dir)
+        for title in test_titles:
+            assert rebuilt.scan(title) == first.scan(title), content[:40]
+        with open(path, encoding="utf-8") as f:
+            assert json.load(f) == saved
+    print(f"✅ JSON cache: round trip and {len(broken)} broken files rebuilt")
+
+print("\n" + "=" * 80)
+print("✅ Keyword matcher test complete!")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Test StackDeal lazy fields: computed on first access only, cached on the item, saved once computed."""
+
+import tempfile
+
+import daily_combined_report as report
+from daily_combined_report import (LAZY_FIELDS, STACK_FIELDS, StackDeal, delta_enrich, enrich_stack_item,
+                                   load_run_state, save_run_state)
+
+print("🧪 Lazy Fields Test\n")
+print("=" * 80)
+
+calls = {name: 0 for name in LAZY_FIELDS}
+
+
+def counted(name, compute):
+    def wrapper(it):
+        calls[name] += 1
+        return compute(it)
+    return wrapper
+
+
+real = dict(LAZY_FIELDS)
+LAZY_FIELDS.update({name: counted(name, compute) for name, compute in real.items()})
+try:
+    raw = [
+        {"source": "Test", "title": "MacBook Pro M4 at JB Hi-Fi in stock - 20x Points on Gift Cards",
+         "link": "https://t/1"},
+        {"source": "Test", "title": "TCN Gift Card 10x Points at Coles", "link": "https://t/2"},
+    ]
+    shown, hidden = [enrich_stack_item(it) for it in raw]
+    assert isinstance(shown, StackDeal)
+    assert not any(name in it for it in (shown, hidden) for name in LAZY_FIELDS)
+    assert sum(calls.values()) == 0
+    print("✅ Enrichment leaves every lazy field unset")
+
+    # First access computes (the text fields pull in arbitrage); later reads come from the item
+    why = shown["why"]
+    assert why and "why" in shown and calls["why"] == 1
+    assert shown["why"] is why and shown.get("why") is why and calls["why"] == 1
+    recipe = shown.get("recipe")
+    assert recipe and calls["recipe"] == 1
+    assert shown["score"] == real["score"](shown) and calls["score"] == 1
+    shown["score"]
+    assert calls["score"] == 1
+    assert "arbitrage" in shown and calls["arbitrage"] == 1
+    assert not any(name in hidden for name in LAZY_FIELDS)
+    try:
+        shown["siblings"]
+        assert False
+    except KeyError:
+        pass
+    assert shown.get("siblings", "none") == "none"
+    print(f"✅ Computed once on first access: {calls}")
+
+    # Run state saves what was computed, and a reused item gets it back without recomputing
+    with tempfile.TemporaryDirectory() as tmp:
+        real_state_dir, report.STATE_DIR = report.STATE_DIR, tmp
+        try:
+            fields = STACK_FIELDS + tuple(LAZY_FIELDS)
+            save_run_state("stack", [shown, hidden], fields)
+            previous = load_run_state("stack")
+            saved = {key: set(cached) & set(LAZY_FIELDS) for key, cached in previous.items()}
+            assert saved == {"Test\thttps://t/1": {"arbitrage", "score", "why", "recipe"},
+                             "Test\thttps://t/2": set()}, saved
+
+            before = dict(calls)
+            reused, stats = delta_enrich([StackDeal(it) for it in raw], previous, enrich_stack_item, STACK_FIELDS)
+            assert stats["reused"] == 2
+            assert reused[0]["why"] == why and reused[0]["recipe"] == recipe and reused[0]["score"] == shown["score"]
+            assert calls == before
+            assert not any(name in reused[1] for name in LAZY_FIELDS)
+            reused[1]["hint"]
+            assert calls["hint"] == before["hint"] + 1
+        finally:
+            report.STATE_DIR = real_state_dir
+    print("✅ Saved only once computed, and reused without recomputing")
+finally:
+    LAZY_FIELDS.update(real)
+
+print("\n" + "=" * 80)
+print("✅ Lazy fields test complete!")
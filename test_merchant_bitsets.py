@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""Test bitmask merchant sets and deterministic arbitrage targets."""
+
+import itertools
+
+from daily_combined_report import (
+    MERCHANTS, PHYSICAL_RETAILERS, PRIORITY_MERCHANTS, PRIORITY_MASK,
+    calculate_arbitrage, mask_names, merchant_mask,
+)
+
+print("🧪 Merchant Bitset Test\n")
+print("=" * 80)
+
+assert mask_names(merchant_mask(("IKEA", "Apple", "Officeworks"))) == ("Officeworks", "Apple", "IKEA")
+assert merchant_mask(("Unknown Store",)) == 0 and mask_names(0) == ()
+assert set(mask_names(PRIORITY_MASK)) == set(PRIORITY_MERCHANTS)
+
+# Targets: the same set the old list(set(...)) produced, always in MERCHANTS order
+for n in (1, 2, 3):
+    for combo in itertools.permutations(PHYSICAL_RETAILERS, n):
+        title = " and ".join(combo) + " click & collect"
+        arb = calculate_arbitrage({"title": title})
+        expected = {t for r in combo for t in PHYSICAL_RETAILERS[r]}
+        assert set(arb.targets) == expected, (title, arb)
+        assert list(arb.targets) == sorted(arb.targets, key=MERCHANTS.index), arb
+        assert arb.eligible and arb.confidence in ("high", "medium")
+
+for title in ["Costco MacBook Air M3 in stock", "JB Hi-Fi TV click & collect", "Harvey Norman blender"]:
+    arb = calculate_arbitrage({"title": title})
+    print(f"   {title:<36} → {arb.confidence:<6} {', '.join(arb.targets)}")
+assert calculate_arbitrage({"title": "Costco MacBook Air M3 in stock"}).targets == \
+    ("Officeworks", "JB Hi-Fi", "The Good Guys", "Harvey Norman")
+assert calculate_arbitrage({"title": "Costco MacBook Air M3 in stock"}).confidence == "high"   # chip
+assert calculate_arbitrage({"title": "JB Hi-Fi TV click & collect"}).confidence == "high"       # priority merchant
+assert calculate_arbitrage({"title": "Harvey Norman blender"}).confidence == "low"               # no stock signal
+assert not calculate_arbitrage({"title": "Amazon socks"}).eligible
+
+print("\n" + "=" * 80)
+print("✅ Merchant bitset test complete!")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Test MinHash/LSH near-duplicate clustering and merging of reworded promos."""
+
+import random
+import time
+
+from near_duplicates import MinHashLSH, cluster_titles, jaccard, shingles
+from daily_combined_report import enrich_stack_item, merge_near_duplicates
+
+print("🧪 Near-Duplicate Test\n")
+print("=" * 80)
+
+same_promo = [
+    ("FreePoints", "Ultimate Gift Card 20x Points at Woolworths"),
+    ("GCDB", "20x Everyday Rewards points on Ultimate gift cards at Woolworths"),
+    ("OzBargain", "Woolworths: Ultimate Gift Cards - 20x Everyday Rewards Points"),
+]
+others = [
+    ("FreePoints", "Ultimate Gift Card 10x Points at Woolworths"),  # different multiplier
+    ("GCDB", "Apple Gift Cards at Coles - 20x Flybuys Points"),
+    ("OzBargain", "Samsung TV at The Good Guys - pickup available"),
+]
+items = [enrich_stack_item({"source": src, "title": t, "link": f"https://{src.lower()}/{i}"})
+         for i, (src, t) in enumerate(same_promo + others)]
+
+merged = merge_near_duplicates(items)
+for it in merged:
+    print(f"   [{it['score']}] {it['title']}")
+    if it.get("siblings"):
+        print(f"      also: {', '.join(it['siblings'])}")
+assert len(merged) == 4, [it["title"] for it in merged]
+assert merged[0]["title"] in [t for _, t in same_promo]
+assert sorted(merged[0]["siblings"] + (merged[0]["link"],)) == sorted(it["link"] for it in items[:3])
+assert all(not it.get("siblings") for it in merged[1:])
+
+# The same promo at another retailer or in another program is a different deal
+other_retailer = [
+    ("FreePoints", "20x points on TCN gift cards at Coles"),
+    ("GCDB", "20x points on TCN gift cards at Woolworths"),
+    ("OzBargain", "10x Flybuys points on Apple gift cards at Coles"),
+    ("GCDB", "Apple gift card 10x points at Woolworths"),
+]
+assert jaccard(shingles(other_retailer[0][1]), shingles(other_retailer[1][1])) >= 0.6
+assert jaccard(shingles(other_retailer[2][1]), shingles(other_retailer[3][1])) >= 0.6
+distinct = [enrich_stack_item({"source": src, "title": t, "link": f"https://{src.lower()}/r{i}"})
+            for i, (src, t) in enumerate(other_retailer)]
+assert [it["title"] for it in merge_near_duplicates(distinct)] == [t for _, t in other_retailer]
+assert all(not it.get("siblings") for it in distinct)
+
+# Word order and plurals don't matter; empty titles never match
+assert shingles("Gift Cards at Coles") == shingles("coles gift card")
+assert cluster_titles(["", "", "  "]) == [[0], [1], [2]]
+
+# LSH finds (nearly) every pair above the threshold that a full scan finds
+rng = random.Random(9)
+vocab = [f"w{i}" for i in range(300)]
+base = [rng.sample(vocab, 8) for _ in range(400)]
+titles = []
+for words in base:
+    titles.append(" ".join(words))
+    variant = words[:7] + [rng.choice(vocab)]  # usually shares 7 of 8 words
+    rng.shuffle(variant)
+    titles.append(" ".join(variant))
+sets = [shingles(t) for t in titles]
+index = MinHashLSH(0.6)
+found = {(j, i) for i, s in enumerate(sets) for j in index.add(s)}
+expected = {(j, i) for i in range(len(sets)) for j in range(i) if jaccard(sets[i], sets[j]) >= 0.6}
+assert found <= expected
+recall = len(found) / len(expected)
+print(f"\nLSH recall vs full pairwise scan: {recall:.1%} of {len(expected)} pairs")
+assert recall > 0.95
+
+# Per-title cost stays flat as the index grows
+for n in (5_000, 20_000):
+    corpus = [" ".join(rng.sample(vocab, 8)) for _ in range(n)]
+    start = time.perf_counter()
+    cluster_titles(corpus)
+    elapsed = time.perf_counter() - start
+    print(f"   {n:>6,} titles: {elapsed / n * 1e6:.0f} µs/title")
+
+# A crowd of near-identical titles stays bounded: no bucket grows past max_bucket, so each
+# title is compared with at most bands × max_bucket earlier ones
+similar = [f"20x points on ultimate gift cards at woolworths {rng.choice(vocab[:20])} {rng.choice(vocab[:20])}"
+           for _ in range(20_000)]
+start = time.perf_counter()
+crowded = cluster_titles(similar)
+crowded_elapsed = time.perf_counter() - start
+print(f"   {len(similar):>6,} similar titles: {crowded_elapsed / len(similar) * 1e6:.0f} µs/title "
+      f"({len(crowded)} clusters)")
+assert len(crowded) == 1
+index = MinHashLSH(0.6)
+for title in similar:
+    assert len(index.add(shingles(title))) <= index.bands * index.max_bucket
+assert max(map(len, index._buckets.values())) == index.max_bucket
+
+print("\n" + "=" * 80)
+print("✅ Near-duplicate test complete!")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Test the raw page archive: content addressing, the URL index and offline re-extraction."""
+
+import os
+import tempfile
+
+import requests
+
+from page_archive import PageArchive
+import daily_combined_report as report
+
+print("🧪 Page Archive Test\n")
+print("=" * 80)
+
+
+def page(*titles, site="https://gcdb.com.au/"):
+    links = "".join(f'<li><a href="{site}deal-{i}">{t}</a></li>' for i, t in enumerate(titles))
+    return f"<html><body><ul>{links}</ul>{'<p>padding</p>' * 200}</body></html>"
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    archive = PageArchive(os.path.join(tmp, "pages"))
+    assert archive.entries() == [] and archive.stats() == (0, 0, 0)
+    body = page("Ultimate Gift Card 20x Points at Woolworths")
+    first = archive.put("https://gcdb.com.au/", body, "2026-01-01T07:00:00", "2026-01-01T07:00:01")
+    again = archive.put("https://gcdb.com.au/", body, "2026-01-02T07:00:00", "2026-01-02T07:00:03")
+    changed = archive.put("https://gcdb.com.au/", body + "<!-- -->", "2026-01-03T07:00:00", "2026-01-03T07:00:02")
+    assert first == again != changed
+    assert archive.get(first) == body
+    objects = [f for _, _, files in os.walk(os.path.join(archive.root, "objects")) for f in files]
+    assert len(objects) == 2  # the unchanged page cost only an index row
+    assert os.path.getsize(archive.object_path(first)) < len(body) / 5
+    assert archive.versions("https://gcdb.com.au/") == [("2026-01-01T07:00:01", first), ("2026-01-02T07:00:03", first),
+                                                       ("2026-01-03T07:00:02", changed)]
+    assert [run for run, _, _ in archive.entries(since="2026-01-02")] == ["2026-01-02T07:00:00", "2026-01-03T07:00:00"]
+    fetches, bodies, size = archive.stats()
+    assert (fetches, bodies) == (3, 2) and size == 3 * len(body) + len("<!-- -->")
+    try:
+        archive.get("0" * 64)
+        assert False
+    except KeyError:
+        pass
+    print(f"✅ {fetches} fetches stored as {bodies} objects "
+          f"({os.path.getsize(archive.object_path(first))} bytes compressed from {len(body)})")
+
+    # Fetching through the report archives each body under this run
+    real_state_dir, report.STATE_DIR = report.STATE_DIR, tmp
+    try:
+        pages = {
+            report.GCDB_URL: page("Ultimate Gift Card 20x Points at Woolworths", "TCN Gift Card 10x Points at Coles"),
+            report.FREEPOINTS_URL: page("Apple Gift Card 10x Everyday Rewards Points",
+                                        site="https://freepoints.com.au/"),
+        }
+        real_get = requests.get
+        requests.get = lambda url, **kwargs: FakeResponse(pages[url])
+        try:
+            live = report.fetch_gcdb_latest(1) + report.fetch_freepoints_latest()
+        finally:
+            requests.get = real_get
+        run = report.run_started()
+        live_runs = [e for e in report.page_archive().entries() if e[0] == run]
+        assert sorted(url for _, url, _ in live_runs) == sorted(pages)
+
+        # The same page archived by two earlier runs, and a page whose body went missing
+        old = report.page_archive()
+        old.put(report.GCDB_URL, pages[report.GCDB_URL], "2026-02-01T07:00:00", "2026-02-01T07:00:01")
+        old.put(report.GCDB_URL, pages[report.GCDB_URL], "2026-02-02T07:00:00", "2026-02-02T07:00:01")
+        lost = old.put(report.FREEPOINTS_URL, "<html>gone</html>", "2026-02-02T07:00:00", "2026-02-02T07:00:02")
+        os.remove(old.object_path(lost))
+        old.put("https://example.com/unknown", "<html></html>", "2026-02-02T07:00:00", "2026-02-02T07:00:03")
+
+        def offline(*args, **kwargs):
+            raise AssertionError("re-extraction must not fetch")
+        requests.get = offline
+        try:
+            results, bodies = report.reextract_archive(since="2026-02", workers=2)
+            inline, _ = report.reextract_archive(since="2026-02", workers=1)
+        finally:
+            requests.get = real_get
+        assert results == inline
+        assert bodies == 3  # one GCDB body shared by three runs, the lost one, this run's FreePoints page
+        by_run = {(r, name): items for r, name, items in results}
+        assert len(by_run[run, "GCDB"]) == 2 and len(live) == 2  # replay has no per-source limit
+        assert by_run[run, "GCDB"] == by_run["2026-02-01T07:00:00", "GCDB"]
+        assert by_run[run, "GCDB"] == report.parse_gcdb(pages[report.GCDB_URL], None)
+        assert by_run[run, "FreePoints"] == report.parse_freepoints(pages[report.FREEPOINTS_URL])
+        assert by_run["2026-02-02T07:00:00", "FreePoints"] is None
+        assert not any(name == "Costco (via OzBargain)" for _, name, _ in results)
+        only_gcdb, _ = report.reextract_archive(since="2026-02", sources=["GCDB"], workers=1)
+        assert {name for _, name, _ in only_gcdb} == {"GCDB"} and len(only_gcdb) == 3
+        text = report.format_reextract(results, bodies, verbose=True)
+        print(text)
+        assert "archived body missing" in text and "Ultimate Gift Card 20x Points at Woolworths" in text
+        print("✅ Offline re-extraction")
+    finally:
+        report.STATE_DIR = real_state_dir
+
+# Old runs are pruned, with the bodies only they referred to
+with tempfile.TemporaryDirectory() as tmp:
+    archive = PageArchive(os.path.join(tmp, "pages"))
+    assert archive.prune("2026-01-01") == (0, 0)
+    kept = archive.put("https://gcdb.com.au/", page("Old promo"), "2026-01-01T07:00:00", "2026-01-01T07:00:01")
+    archive.put("https://gcdb.com.au/", page("Old promo"), "2026-01-02T07:00:00", "2026-01-02T07:00:01")
+    archive.put("https://freepoints.com.au/", page("Gone"), "2026-01-01T07:00:00", "2026-01-01T07:00:02")
+    gone = archive.put("https://freepoints.com.au/", page("Gone too"), "2026-01-01T07:00:00", "2026-01-01T07:00:03")
+    assert archive.prune("2026-01-02") == (2, 2)  # "Gone" was replaced by a later fetch in its run
+    assert archive.entries() == [("2026-01-02T07:00:00", "https://gcdb.com.au/", kept)]
+    assert archive.get(kept) == page("Old promo")
+    assert [f for _, _, files in os.walk(os.path.join(archive.root, "objects")) for f in files] == [kept[2:] + ".z"]
+    try:
+        archive.get(gone)
+        assert False
+    except KeyError:
+        pass
+
+    # Reports forget pages from runs more than PAGE_ARCHIVE_MAX_AGE_DAYS before this one
+    real_state_dir, real_run_started = report.STATE_DIR, report.run_started
+    report.STATE_DIR, report.run_started = tmp, lambda: "2026-06-01T07:00:00"
+    try:
+        recent = archive.put("https://gcdb.com.au/", page("Recent promo"), "2026-03-04T07:00:00", "2026-03-04T07:00:01")
+        report.prune_page_archive()
+    finally:
+        report.STATE_DIR, report.run_started = real_state_dir, real_run_started
+    assert archive.entries() == [("2026-03-04T07:00:00", "https://gcdb.com.au/", recent)]
+    assert archive.stats()[1] == 1
+    print("✅ Old runs and their unshared bodies pruned")
+
+print("\n" + "=" * 80)
+print("✅ Page archive test complete!")
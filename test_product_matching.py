@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Test product keys and the hash-join cross-retailer matcher."""
+
+import random
+import time
+
+from daily_combined_report import ProductKey, enrich_stack_item, match_across_retailers, product_key
+
+print("🧪 Product Matching Test\n")
+print("=" * 80)
+
+# Same product, different wording → same key; storage in TB normalised to GB
+assert product_key("Apple MacBook Pro 14\" M3 Pro 18GB 512GB at JB Hi-Fi") == ProductKey("macbookpro", 3, "pro", 512)
+assert product_key("MacBookPro M3 PRO 512GB - Officeworks") == product_key("MacBook  Pro 14 M3 Pro 18GB/512GB")
+assert product_key("Mac Studio M2 Max 1TB").storage_gb == 1024
+assert product_key("iPhone 16 Pro Max 256GB").family == "iphone16promax"
+assert product_key("MacBook Air M2 256GB") != product_key("MacBook Air M3 256GB")
+assert product_key("Ultimate Gift Card 20x Points at Woolworths") is None
+
+titles = [
+    ("OzBargain", "MacBook Pro M3 Pro 512GB at JB Hi-Fi - $2,999"),
+    ("OzBargain", "Officeworks: Apple MacBook Pro 14 M3 Pro 18GB 512GB"),
+    ("Costco", "Costco MacBook Pro M3 Pro 512GB"),
+    ("OzBargain", "MacBook Pro M3 Pro 1TB at Harvey Norman"),       # different storage
+    ("OzBargain", "iPad Air M2 128GB at JB Hi-Fi"),
+    ("OzBargain", "iPad Air M2 128GB at JB Hi-Fi (again)"),           # same retailer only
+    ("OzBargain", "MacBook Pro M3 Pro 512GB"),                       # no retailer named
+]
+items = [enrich_stack_item({"source": src, "title": t, "link": f"https://example.com/{i}"})
+         for i, (src, t) in enumerate(titles)]
+matches = match_across_retailers(items)
+for i, found in sorted(matches.items()):
+    print(f"   {items[i]['title']}")
+    for retailer, link in found:
+        print(f"      → {retailer}: {link}")
+assert sorted(matches) == [0, 1, 2]
+assert matches[0] == (("Officeworks", "https://example.com/1"), ("Costco", "https://example.com/2"))
+assert ("JB Hi-Fi", "https://example.com/0") in matches[2]
+
+# Linear growth: 20k and 80k listings over a fixed catalogue
+rng = random.Random(3)
+families = ["MacBook Pro", "MacBook Air", "Mac Studio", "iPad Pro", "iPad Air", "Mac mini"]
+chips = ["M1", "M2", "M3 Pro", "M4", "M4 Max"]
+stores = ["JB Hi-Fi", "Officeworks", "Harvey Norman", "The Good Guys", "Costco"]
+print()
+for n in (4_000, 16_000):
+    crawl = [enrich_stack_item({"title": f"{rng.choice(families)} {rng.choice(chips)} {rng.choice([256, 512, 1024, 2048])}GB "
+                                         f"at {rng.choice(stores)} #{i}", "link": str(i)}) for i in range(n)]
+    start = time.perf_counter()
+    found = match_across_retailers(crawl)
+    elapsed = time.perf_counter() - start
+    print(f"   {n:>6,} listings: {len(found):,} matched in {elapsed / n * 1e6:.1f} µs/listing")
+
+print("\n" + "=" * 80)
+print("✅ Product matching test complete!")
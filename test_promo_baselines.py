@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Test streaming promo baselines (P² quantiles, Welford) and the promo tier bonus."""
+
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from promo_baselines import P2Quantile, PromoBaselines, PromoStats
+import daily_combined_report as report
+
+print("🧪 Promo Baselines Test\n")
+print("=" * 80)
+
+# P² tracks quantiles of a long stream with five markers each
+rng = random.Random(4)
+values = [rng.lognormvariate(3, 0.4) for _ in range(50_000)]
+stats = PromoStats()
+for v in values:
+    stats.add(v)
+ordered = sorted(values)
+for q in stats.quantiles:
+    exact = ordered[int(q.p * len(ordered))]
+    print(f"   p{int(q.p * 100):<3} P²={q.value():7.2f}  exact={exact:7.2f}")
+    assert abs(q.value() - exact) / exact < 0.02
+assert abs(stats.mean - statistics.fmean(values)) < 1e-9
+assert abs(stats.variance - statistics.variance(values)) / statistics.variance(values) < 1e-9
+assert abs(stats.percentile(ordered[45_000]) - 0.9) < 0.02
+
+# Exact (midrank) percentiles while a group has fewer than five values
+small = PromoStats()
+for v in (10, 20, 20):
+    small.add(v)
+assert small.percentile(20) == 2 / 3 and small.percentile(30) == 1.0 and small.percentile(5) == 0.0
+assert P2Quantile(0.5).value() is None
+
+# Updates cost the same however long the history is
+for n in (10_000, 100_000):
+    s = PromoStats()
+    start = time.perf_counter()
+    for _ in range(n):
+        s.add(rng.choice((5, 10, 15, 20, 30)))
+    print(f"   {n:>7,} updates: {(time.perf_counter() - start) / n * 1e6:.1f} µs/update")
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "baselines.json")
+    saved = PromoBaselines({"ultimate|Everyday Rewards": stats}, last_run={"a"})
+    saved.save(path)
+    loaded = PromoBaselines.load(path)
+    assert loaded.last_run == {"a"}
+    assert loaded.percentile("ultimate|Everyday Rewards", 25.0) == saved.percentile("ultimate|Everyday Rewards", 25.0)
+    assert loaded.percentile("tcn|Flybuys", 20) is None
+    with open(path, "w") as f:
+        f.write("{not json")
+    assert PromoBaselines.load(path).groups == {}
+
+    # Report integration: a 30x Ultimate promo after weeks of 10x / 20x ones
+    real_state_dir, report.STATE_DIR = report.STATE_DIR, tmp
+    try:
+        history = [report.enrich_stack_item({"source": "GCDB", "title": f"Ultimate Gift Card {x}x Points at Woolworths",
+                                             "link": f"https://gcdb/{i}"})
+                   for i, x in enumerate([10, 20, 10, 10, 20, 10, 20, 10, 10, 20, 10, 20])]
+        report.update_promo_baselines(history, [report.delta_key(it) for it in history])
+        report.update_promo_baselines(history, [])  # same deals next run: not counted again
+        assert PromoBaselines.load(os.path.join(tmp, report.PROMO_BASELINES_FILE)).groups[
+            "ultimate|Everyday Rewards"].count == 12
+
+        title = "Ultimate Gift Card 30x Points at Woolworths"
+        before = report.enrich_stack_item({"title": title})
+        before["score"]  # lazy: compute it against the baselines this run started with
+        report.refresh_promo_baselines()
+        after = report.enrich_stack_item({"title": title})
+        print(f"\n   {title}: tier {before['promo_tier']!r} → {after['promo_tier']!r}, "
+              f"score {before['score']} → {after['score']}")
+        print(f"   {after['why']}")
+        assert before["promo_tier"] == "" and after["promo_tier"] == "top"
+        assert after["score"] == before["score"] + 2
+        assert "top 10% of Ultimate Everyday Rewards promos" in after["why"]
+        assert report.score_upper_bound(after["features"]) >= after["score"]
+        assert report.enrich_stack_item({"title": "Ultimate Gift Card 10x Points at Woolworths"})["promo_tier"] == ""
+
+        # Results cached under the old tier are recomputed, not reused
+        previous = {report.delta_key(before): {**{k: before[k] for k in report.STACK_FIELDS}, "title": title,
+                                               "score": before["score"]}}
+        items, delta = report.delta_enrich([report.StackDeal({"title": title})], previous, report.enrich_stack_item,
+                                           report.STACK_FIELDS, inputs=report.stack_inputs)
+        assert delta["recomputed"] == 1 and items[0]["score"] == after["score"]
+    finally:
+        report.STATE_DIR = real_state_dir
+        report.refresh_promo_baselines()  # drop the baselines read from tmp
+
+print("\n" + "=" * 80)
+print("✅ Promo baselines test complete!")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Test the declarative rule engine (conditions, templates, scores, first-match)."""
+
+from rule_engine import ListValue, RuleSet, RuleError
+
+rules = RuleSet({
+    "limits": {"steps": 2},
+    "first_match": {"level": "LOW"},
+    "tables": {
+        "steps": [
+            {"when": ["x >= 20"], "text": "Activate {x}x points."},
+            {"when": ["gc_type in ultimate|apple"], "text": "Buy {gc_type} cards (check online gift card limits)."},
+            {"when": ["gc_type"], "unless_text": "check online gift card limits", "text": "Check online gift card limits."},
+            {"when": ["merchants any JB Hi-Fi|Officeworks"], "text": "Use at {merchant0}."},
+        ],
+        "score": [
+            {"when": ["x >= 30"], "score": 10},
+            {"when": ["x >= 20", "x < 30"], "score": 8},
+            {"when": ["merchants any @priority"], "score": 2},
+            {"when": ["signals has win "], "score": -3},
+            {"when": ["!chip", "cashback"], "score": 0.5},
+        ],
+        "level": [
+            {"when": ["chip", "has_stock"], "text": "HIGH"},
+            {"when": ["chip or merchants"], "text": "MEDIUM"},
+        ],
+    },
+})
+
+print("🧪 Rule Engine Test\n")
+print("=" * 80)
+
+ctx = {
+    "x": 20, "gc_type": "ultimate", "merchants": ("JB Hi-Fi",), "merchant0": "JB Hi-Fi",
+    "signals": frozenset(), "chip": None, "cashback": ("ShopBack",), "priority": ["JB Hi-Fi"],
+    "has_stock": False,
+}
+values = rules.predicate_values(ctx)
+steps = rules.messages("steps", ctx, values)
+print(f"\nSteps: {steps}")
+assert steps == ["Activate 20x points.", "Buy ultimate cards (check online gift card limits)."]
+
+score = rules.score("score", values)
+print(f"Score: {score}")
+assert score == 10.5
+
+assert rules.first("level", ctx, values) == "MEDIUM"
+ctx_none = {"x": 0, "merchants": (), "signals": frozenset({"win "}), "chip": None}
+values_none = rules.predicate_values(ctx_none)
+assert rules.first("level", ctx_none, values_none) == "LOW"
+assert rules.score("score", values_none) == -3
+assert rules.messages("steps", ctx_none, values_none) == []
+
+# Shared predicates are compiled once ("x >= 20" and "gc_type" appear in several rules)
+assert len(rules.predicates) == 13, len(rules.predicates)
+
+# Upper bound with unknown inputs: optimistic for positive rules, ignores unknown penalties
+partial = rules.predicate_values(ctx, unknown=("x", "signals"))
+bound = rules.score_bound("score", partial)
+print(f"Bound with x/signals unknown: {bound}")
+assert bound == 10 + 8 + 2 + 0.5
+assert rules.score_bound("score", values) == score
+
+# List values render joined by the template's format spec
+listed = {"redeem": {"ultimate": ListValue(("JB Hi-Fi", "Officeworks"))}, "none": ListValue()}
+assert "{redeem[ultimate]:/} | {redeem[ultimate]: / } | {redeem[ultimate]}".format_map(listed) == \
+    "JB Hi-Fi/Officeworks | JB Hi-Fi / Officeworks | JB Hi-Fi, Officeworks"
+assert "[{none:/}]".format_map(listed) == "[]"
+
+for bad in [{"tables": {"t": [{"when": ["x ~ 3"], "score": 1}]}},
+            {"tables": {"t": [{"when": ["x"]}]}}]:
+    try:
+        RuleSet(bad)
+    except RuleError as e:
+        print(f"Rejected bad rule: {e}")
+    else:
+        raise AssertionError(f"accepted {bad}")
+
+print("\n" + "=" * 80)
+print("✅ Rule engine test complete!")
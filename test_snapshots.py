@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Test columnar deal snapshots: round trips, lazy columns, size and scan speed against JSON."""
+
+import os
+import json
+import math
+import random
+import tempfile
+import time
+
+from snapshots import write_snapshot, Snapshot, SnapshotError, COLUMNS, FLAGS
+import daily_combined_report as report
+
+print("🧪 Columnar Snapshot Test\n")
+print("=" * 80)
+
+rows = [
+    {"source": "GCDB", "title": "Ultimate Gift Card 20x Points — Woolworths ✓", "link": "https://gcdb/1",
+     "merchants": ("Woolworths", "Big W"), "chip": None, "gc_type": "ultimate", "confidence": "high",
+     "score": 14.5, "multiplier": 20, "flags": {"arbitrage": True, "in_stock": True}},
+    {"source": "OzBargain", "title": "", "link": "", "merchants": (), "chip": "M4 Pro", "gc_type": None,
+     "confidence": None, "score": None, "multiplier": None, "flags": None},
+    {"source": "GCDB", "title": "TCN 10x", "link": "https://gcdb/3", "merchants": ("Big W",), "chip": None,
+     "gc_type": "tcn", "confidence": "none", "score": -3.0, "multiplier": 10, "flags": {"excluded": True}},
+]
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "stack.dcol")
+    write_snapshot(path, rows)
+    with Snapshot(path) as snap:
+        assert len(snap) == 3
+        for i, row in enumerate(rows):
+            got = snap.row(i)
+            expected = dict(row, merchants=tuple(row["merchants"]),
+                            flags={f: bool((row["flags"] or {}).get(f)) for f in FLAGS})
+            assert got == expected, (got, expected)
+        assert snap.row(0, ("title", "score")) == {"title": rows[0]["title"], "score": 14.5}
+        assert snap.column("source").dictionary == (None, "GCDB", "OzBargain")
+        assert snap.column("source").rows_with("GCDB") == [0, 2]
+        assert snap.column("source").rows_with("Costco") == []
+        assert snap.column("merchants").rows_with("Big W") == [0, 2]
+        assert snap.column("merchants").rows_with(None) == []
+        assert snap.flag("excluded") == [False, False, True]
+        assert math.isnan(snap.column("score")[1]) and snap.column("multiplier")[1] == -1
+        assert set(snap._cache) == {"source", "merchants", "flags", "score", "multiplier", "title", "link", "chip",
+                                    "gc_type", "confidence"}
+    with Snapshot(path) as snap:
+        assert sum(s for s in snap.column("score") if not math.isnan(s)) == 11.5
+        assert set(snap._cache) == {"score"}  # only the columns that were read are mapped into views
+    print(f"✅ Round trip: {len(rows)} rows, {len(COLUMNS)} columns")
+
+    empty = os.path.join(tmp, "empty.dcol")
+    write_snapshot(empty, [])
+    with Snapshot(empty) as snap:
+        assert len(snap) == 0 and list(snap.column("score")) == [] and len(snap.column("title")) == 0
+    for name, content in (("junk.dcol", b"not a snapshot"), ("zero.dcol", b""), ("cut.dcol", b"DEALCOL1\xff\x00")):
+        bad = os.path.join(tmp, name)
+        with open(bad, "wb") as f:
+            f.write(content)
+        try:
+            Snapshot(bad)
+            assert False, name
+        except SnapshotError:
+            pass
+    print("✅ Empty and corrupt files")
+
+    # A year of daily snapshots: total score of GCDB deals, columnar vs JSON
+    rng = random.Random(49)
+    stores = ["Woolworths", "Coles", "Officeworks", "JB Hi-Fi", "Big W"]
+    columnar, jsons = 0, 0
+    for day in range(365):
+        run = [{"source": rng.choice(["GCDB", "FreePoints", "OzBargain"]),
+                "title": f"Deal {rng.randint(0, 10**6)} MacBook Pro M4 at Officeworks - 20x Points on Gift Cards",
+                "link": f"https://www.ozbargain.com.au/node/{rng.randint(0, 10**6)}",
+                "merchants": tuple(rng.sample(stores, rng.randint(0, 2))), "chip": rng.choice([None, "M4", "M3"]),
+                "gc_type": rng.choice([None, "ultimate", "tcn"]), "confidence": rng.choice(["none", "high"]),
+                "score": float(rng.randint(-5, 20)), "multiplier": rng.choice([None, 10, 20]),
+                "flags": {"arbitrage": rng.random() < 0.3}} for _ in range(60)]
+        write_snapshot(os.path.join(tmp, "year", f"{day:03d}.dcol"), run)
+        with open(os.path.join(tmp, "year", f"{day:03d}.json"), "w") as f:
+            json.dump(run, f)
+        columnar += os.path.getsize(os.path.join(tmp, "year", f"{day:03d}.dcol"))
+        jsons += os.path.getsize(os.path.join(tmp, "year", f"{day:03d}.json"))
+    names = sorted(os.listdir(os.path.join(tmp, "year")))
+
+    start = time.perf_counter()
+    total = 0.0
+    for name in names:
+        if name.endswith(".dcol"):
+            with Snapshot(os.path.join(tmp, "year", name)) as snap:
+                scores = snap.column("score")
+                total += sum(scores[i] for i in snap.column("source").rows_with("GCDB"))
+    columnar_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    expected = 0.0
+    for name in names:
+        if name.endswith(".json"):
+            with open(os.path.join(tmp, "year", name)) as f:
+                expected += sum(d["score"] for d in json.load(f) if d["source"] == "GCDB")
+    json_ms = (time.perf_counter() - start) * 1000
+    assert total == expected
+    print(f"✅ Year of snapshots: {columnar / 1024:.0f} KB columnar vs {jsons / 1024:.0f} KB JSON; "
+          f"GCDB score scan {columnar_ms:.0f} ms vs {json_ms:.0f} ms")
+    assert columnar < jsons * 0.8, (columnar, jsons)
+
+    # Reports write one snapshot per report per run, so two runs on one day keep both
+    real_state_dir, report.STATE_DIR = report.STATE_DIR, tmp
+    try:
+        deals = [report.Deal({"source": "GCDB", "title": "Ultimate Gift Card 20x Points at Woolworths",
+                              "link": "https://gcdb/9"})]
+        real_run_started = report.run_started
+        try:
+            for run in ("2026-01-31T19:00:00", "2026-01-31T07:00:00", "2026-01-31T07:00:00"):
+                report.run_started = lambda: run
+                report.save_snapshot("daily", deals)
+        finally:
+            report.run_started = real_run_started
+        paths = report.snapshot_paths("daily")
+        assert [os.path.basename(p) for p in paths] == ["daily-2026-01-31T07-00-00.dcol",
+                                                        "daily-2026-01-31T19-00-00.dcol"]
+        assert report.snapshot_paths("stack") == []
+        with Snapshot(paths[0]) as snap:
+            row = snap.row(0)
+            assert (row["source"], row["gc_type"], row["multiplier"], row["score"]) == ("GCDB", "ultimate", 20, None)
+            assert row["merchants"] == ("Woolworths",)
+        print(f"✅ Report snapshot: {os.path.basename(paths[0])}")
+
+        # Only the latest SNAPSHOT_MAX_RUNS snapshots of each report are kept
+        report.save_snapshot("stack", deals)
+        real_max_runs = report.SNAPSHOT_MAX_RUNS
+        try:
+            report.SNAPSHOT_MAX_RUNS = 2
+            for run in ("2026-02-01T07:00:00", "2026-02-02T07:00:00"):
+                report.run_started = lambda: run
+                report.save_snapshot("daily", deals)
+        finally:
+            report.run_started, report.SNAPSHOT_MAX_RUNS = real_run_started, real_max_runs
+        assert [os.path.basename(p) for p in report.snapshot_paths("daily")] == ["daily-2026-02-01T07-00-00.dcol",
+                                                                                 "daily-2026-02-02T07-00-00.dcol"]
+        assert len(report.snapshot_paths("stack")) == 1
+        print("✅ Older snapshots pruned per report")
+    finally:
+        report.STATE_DIR = real_state_dir
+
+print("\n" + "=" * 80)
+print("✅ Columnar snapshot test complete!")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Test the stack report's concurrent fetch: streaming Top-K heap, provisional Top 5 and enrichment order."""
+
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import redirect_stderr
+
+import daily_combined_report as report
+from daily_combined_report import (TopKRanker, deduplicate_items, enrich_stack_item, merge_near_duplicates,
+                                   select_top)
+
+titles = [
+    "Ultimate Gift Card 20x Points at Woolworths",
+    "Apple Gift Cards at Coles - 10x Everyday Rewards Points",
+    "MacBook Pro M4 at Officeworks - Click & Collect - 20x Points",
+    "JB Hi-Fi Gift Card 15x Points at Big W - ShopBack 5%",
+    "TCN Gift Card Deal at Woolworths - 10x Points",
+    "Samsung TV at The Good Guys - pickup available",
+    "Win a $500 gift card - competition",
+    "30x Flybuys points on Apple giftcard at Coles",
+    "Harvey Norman M2 Max Mac Studio in-store c&c",
+    "Costco M3 Pro MacBook Pro 18GB 512GB",
+    "Electronics at Amazon - TopCashback 4%",
+    "Cheap socks",
+]
+
+
+def make_pool(sample, source="Test"):
+    return [enrich_stack_item({"source": source, "title": t, "link": f"https://example.com/{source}/{i}"})
+            for i, t in enumerate(sample)]
+
+
+print("🧪 Stack Sources Test\n")
+print("=" * 80)
+
+# Fed source by source, the heap holds at most k deals; settled on the run's
+# deduplicated, merged pool it gives the same Top 5 as select_top()
+rng = random.Random(4)
+variants = ["", " #2", " - via GCDB", " (today only)"]
+for trial in range(300):
+    fetched = make_pool([rng.choice(titles) + rng.choice(variants) for _ in range(rng.randint(0, 60))],
+                        source=f"S{trial}")
+    for i, x in enumerate(fetched):
+        if rng.random() < 0.2:
+            x["link"] = f"https://example.com/shared/{i % 3}"  # same link listed twice
+    ranker = TopKRanker(5)
+    start = 0
+    while start < len(fetched):
+        size = rng.randint(1, 15)
+        ranker.add(fetched[start:start + size])
+        assert len(ranker._heap) <= 5
+        start += size
+    pool = merge_near_duplicates(deduplicate_items(fetched))
+    expected = select_top([x for x in pool if not x.get("exclude_from_top", False)], 5)
+    assert ranker.settle(pool) == expected, ([x["title"] for x in ranker.top()], [x["title"] for x in expected])
+    assert len(ranker._heap) <= 5
+
+# A duplicate (same title or link) only replaces the held deal when it scores higher
+ranker = TopKRanker(5)
+low = enrich_stack_item({"title": "Gift card deal at Coles 10x points", "link": "https://a"})
+high = enrich_stack_item({"title": "Ultimate gift card 30x points", "link": "https://a"})
+again = enrich_stack_item({"title": "gift card deal at coles  10x points", "link": "https://b"})
+ranker.add([low, high, again])
+assert ranker.top() == [high, again], [x["title"] for x in ranker.top()]
+
+# Excluded deals are never held
+only_excluded = make_pool(["Harvey Norman M2 Max Mac Studio", "Costco M3 Pro MacBook Pro 18GB 512GB"])
+assert all(x["exclude_from_top"] for x in only_excluded)
+ranker = TopKRanker(5)
+ranker.add(only_excluded)
+assert ranker.settle(only_excluded) == []
+print("✅ Streaming heap matches select_top() after merging")
+
+# Provisional sources land first; the worker pool only starts once every fetch has finished
+fetched = set()
+
+
+def source(name, sample, delay):
+    def fetch():
+        time.sleep(delay)
+        fetched.add(name)
+        return [{"source": name, "title": t, "link": f"https://{name.lower()}/{i}"} for i, t in enumerate(sample)]
+    return fetch
+
+
+pool_starts = []
+real_enrich_many = report.enrich_many
+
+
+def enrich_many(items, enrich, fields, workers=None):
+    if workers != 1 and items:
+        pool_starts.append((set(fetched), threading.active_count()))
+    return real_enrich_many(items, enrich, fields, 1)
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    real_state_dir, real_sources, real_workers = report.STATE_DIR, report.STACK_SOURCES, report.ENRICH_WORKERS
+    report.STATE_DIR = tmp
+    report.STACK_SOURCES = {
+        "FreePoints": source("FreePoints", titles[:3], 0),
+        "GCDB": source("GCDB", titles[3:6], 0),
+        "OzBargain": source("OzBargain", titles[6:10], 0.3),
+        "Costco": source("Costco", titles[10:], 0.3),
+    }
+    report.ENRICH_WORKERS = 4
+    report.enrich_many = enrich_many
+    log = io.StringIO()
+    deals = []
+    try:
+        with redirect_stderr(log):
+            plain, _ = report.build_stack_report(deals)
+    finally:
+        report.STATE_DIR, report.STACK_SOURCES, report.ENRICH_WORKERS = real_state_dir, real_sources, real_workers
+        report.enrich_many = real_enrich_many
+    print(log.getvalue().strip())
+
+    early = select_top([x for x in make_pool(titles[:3], "FreePoints") + make_pool(titles[3:6], "GCDB")
+                        if not x["exclude_from_top"]], 5)
+    assert f"Provisional Top 5 (FreePoints, GCDB): [{early[0]['score']}] {early[0]['title']}" in log.getvalue()
+    assert len(pool_starts) == 1, pool_starts  # one pool for OzBargain and Costco together
+    assert pool_starts[0][0] == {"FreePoints", "GCDB", "OzBargain", "Costco"}
+    assert pool_starts[0][1] == threading.active_count()  # no fetch threads left
+    assert {x["source"] for x in deals} == {"FreePoints", "GCDB", "OzBargain", "Costco"}
+    for i, x in enumerate(select_top([x for x in deals if not x["exclude_from_top"]], 5), 1):
+        assert f"{i}. [{x['score']}] {x['title']}" in plain
+    print("✅ Provisional Top 5 logged early; worker pool started after the fetches")
+
+# Routing-only fetch (daily mode with watchlists): same deals, nothing saved or archived
+def archived_source(name, sample):
+    def fetch():
+        report.archive_page(f"https://{name.lower()}/", "<html></html>")
+        return source(name, sample, 0)()
+    return fetch
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    real_state_dir, real_sources = report.STATE_DIR, report.STACK_SOURCES
+    report.STATE_DIR = tmp
+    report.STACK_SOURCES = {"FreePoints": archived_source("FreePoints", titles[:3]),
+                            "GCDB": archived_source("GCDB", titles[3:6])}
+    try:
+        with redirect_stderr(io.StringIO()):
+            routed = report.stack_deals()
+    finally:
+        report.STATE_DIR, report.STACK_SOURCES = real_state_dir, real_sources
+    assert {x["title"] for x in routed} == set(titles[:6]), [x["title"] for x in routed]
+    assert os.listdir(tmp) == [], os.listdir(tmp)
+    assert report.ARCHIVE_PAGES
+print("✅ stack_deals() writes no state, memo, history, snapshot or archived pages")
+
+print("\n" + "=" * 80)
+print("✅ Stack sources test complete!")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Test inverted-index watchlist routing against a brute-force scan."""
+
+import json
+import os
+import random
+import tempfile
+import time
+
+from subscriptions import SubscriptionError, SubscriptionIndex, load_subscriptions, words
+from daily_combined_report import build_subscriber_report, enrich_stack_item, item_features, route_subscriptions
+
+print("🧪 Subscriptions Test\n")
+print("=" * 80)
+
+subscribers = [
+    {"name": "Sam", "email": "sam@example.com", "watches": [
+        {"keywords": ["M4 Pro"], "merchants": ["JB Hi-Fi"]},
+        {"keywords": ["20x"], "gift_cards": ["tcn"], "min_score": 8},
+    ]},
+    {"name": "Alex", "min_score": 12, "watches": [{}]},  # anything scoring 12+
+    {"name": "Kim", "watches": [{"merchants": ["Costco", "Officeworks"]}]},
+]
+titles = [
+    "MacBook Pro M4 Pro at JB Hi-Fi - in stock",
+    "MacBook Pro M4 at JB Hi-Fi",                     # "m4" but not the phrase "m4 pro"
+    "TCN Gift Card Deal at Woolworths - 20x Points",
+    "TCN Gift Card Deal at Woolworths - 10x Points",
+    "Ultimate Gift Card 30x Points at Woolworths",
+    "Officeworks: iPad Air M2 click & collect",
+]
+deals = [enrich_stack_item({"source": "Test", "title": t, "link": f"https://example.com/{i}"})
+         for i, t in enumerate(titles)]
+index = SubscriptionIndex(subscribers)
+routed = route_subscriptions(index, deals)
+for name, matches in routed.items():
+    print(f"   {name}: " + "; ".join(f"[{x['score']}] {x['title']}" for x, _ in matches))
+assert [x["title"] for x, _ in routed["Sam"]] == [titles[2], titles[0]]  # best score first
+assert [x["title"] for x, _ in routed["Kim"]] == [titles[5]]
+assert {x["title"] for x, _ in routed["Alex"]} == {x["title"] for x in deals if x["score"] >= 12}
+
+plain, html = build_subscriber_report("Sam", routed["Sam"])
+print("\n" + plain)
+assert 'Matched: "m4 pro" at JB Hi-Fi' in plain and "Matched: &quot;20x&quot; on tcn" in html
+
+# Deals only matched by watches without a min_score stay unscored, listed after the scored ones
+fresh = [enrich_stack_item({"source": "Test", "title": t, "link": f"https://example.com/k{i}"})
+         for i, t in enumerate([titles[5], "MacBook Pro M4 at Officeworks - 20x Points"])]
+fresh[1]["score"]  # scored earlier, e.g. by another subscriber's min_score
+kim = route_subscriptions(SubscriptionIndex([subscribers[2]]), fresh)["Kim"]
+assert [x for x, _ in kim] == [fresh[1], fresh[0]] and "score" not in fresh[0]
+plain, html = build_subscriber_report("Kim", kim)
+assert f"2. {titles[5]}" in plain and html.count("<b>[") == 1 and "score" not in fresh[0]
+print("✅ Routing and the subscriber report leave deals unscored unless a min_score needed it")
+
+# Merchants and card types match whatever their case in the file or the deal
+cased = SubscriptionIndex([{"name": "Lee", "watches": [{"merchants": ["jb hi-fi", "OFFICEWORKS"]},
+                                                       {"gift_cards": ["TCN"]}]}])
+assert [w.merchants for w in cased.match("MacBook Pro M4 at JB Hi-Fi", ["JB Hi-Fi"])] == [("jb hi-fi", "OFFICEWORKS")]
+assert len(cased.match("iPad at officeworks", ["Officeworks"])) == 1
+assert cased.match("TCN gift card", (), "tcn")[0].gift_cards == ("tcn",)
+assert cased.match("TCN gift card", ["Coles"], "Tcn") and not cased.match("Ultimate card", ["Coles"], "ultimate")
+print("✅ Merchant and card matching is case-insensitive")
+
+
+def brute_force(index, deal):
+    """Check every watch against the deal directly."""
+    f = item_features(deal)
+    text = " " + " ".join(words(f.title)) + " "
+    return [w for w in index.watches
+            if all(f" {p} " in text for p in w.phrases)
+            and (not w.merchants or {m.lower() for m in w.merchants} & {m.lower() for m in f.merchants})
+            and (not w.gift_cards or f.gc_type in w.gift_cards)
+            and deal["score"] >= w.min_score]
+
+
+# Randomised watchlists give the same matches as checking every watch
+rng = random.Random(8)
+vocab = sorted({w for t in titles for w in words(t)} | {"ipad", "m3", "max", "ultimate", "flybuys"})
+merchants = ["JB Hi-Fi", "Officeworks", "Woolworths", "Coles", "Costco", "Apple", "jb hi-fi", "COLES"]
+
+
+def random_watch(keywords=0.8):
+    watch = {}
+    if rng.random() < keywords:
+        watch["keywords"] = [" ".join(rng.sample(vocab, rng.randint(1, 2))) for _ in range(rng.randint(1, 2))]
+    if rng.random() < 0.4:
+        watch["merchants"] = rng.sample(merchants, rng.randint(1, 2))
+    if rng.random() < 0.2:
+        watch["gift_cards"] = [rng.choice(["tcn", "ultimate", "apple"])]
+    if rng.random() < 0.3:
+        watch["min_score"] = rng.choice([4, 8, 12])
+    return watch
+
+
+many = SubscriptionIndex([{"name": f"user{i}", "watches": [random_watch() for _ in range(3)]} for i in range(500)])
+corpus = [enrich_stack_item({"title": " ".join(rng.choice(vocab) for _ in range(rng.randint(3, 9))) +
+                             rng.choice(["", " at JB Hi-Fi", " at Coles", " TCN gift card"])}) for _ in range(300)]
+for deal in corpus:
+    f = item_features(deal)
+    assert many.match(f.title, f.merchants, f.gc_type, lambda: deal["score"]) == brute_force(many, deal)
+
+# Thousands of watchlists over a realistic vocabulary: only watches sharing a term with a deal are touched
+vocab += [f"word{i}" for i in range(5000)]
+for n in (2_000, 8_000):
+    big = SubscriptionIndex([{"name": f"user{i}", "watches": [random_watch(1) for _ in range(3)]} for i in range(n)])
+    start = time.perf_counter()
+    routed = route_subscriptions(big, corpus)
+    elapsed = time.perf_counter() - start
+    for deal in corpus[:50]:
+        expected = {}
+        for w in brute_force(big, deal):
+            expected.setdefault(w.subscriber, []).append(w)
+        assert {name: ws for name, matches in routed.items() for x, ws in matches if x is deal} == expected
+    probed = 0
+    for deal in corpus:
+        f = item_features(deal)
+        terms = [("word", t) for t in set(words(f.title))] + [("merchant", m.lower()) for m in f.merchants]
+        terms += [("card", f.gc_type)] if f.gc_type else []
+        probed += sum(len(big.postings.get(term, ())) for term in terms + [("any", "*")])
+    print(f"\n{n * 3:>6,} watches × {len(corpus)} deals: {elapsed * 1000:.0f} ms, "
+          f"{probed / len(corpus):.0f} postings probed per deal ({sum(map(len, routed.values())):,} matches)")
+    assert probed / len(corpus) < len(big.watches) / 4  # a full scan checks every watch
+
+# File loading and validation
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "subscriptions.json")
+    with open(path, "w") as f:
+        json.dump({"subscribers": subscribers}, f)
+    assert len(load_subscriptions(path).watches) == 4
+for bad in ([{"watches": [{}]}], [{"name": "A"}, {"name": "A"}], [{"name": "A", "watches": [{"keyword": ["x"]}]}]):
+    try:
+        SubscriptionIndex(bad)
+    except SubscriptionError as e:
+        print(f"Rejected: {e}")
+    else:
+        raise AssertionError(bad)
+
+print("\n" + "=" * 80)
+print("✅ Subscriptions test complete!")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Test title feature extraction: the TitleFeatures record, its cache and its consumers."""
+
+from daily_combined_report import (TitleFeatures, detect_apple_chip, detect_cashback, detect_gift_card_type,
+                                   detect_merchants, detect_physical_retailers, detect_stock_signal, enrich_stack_item,
+                                   item_features, score_item, title_features)
+
+print("🧪 Title Features Test\n")
+print("=" * 80)
+
+assert TitleFeatures._fields == ("title", "x", "multipliers", "chip", "generation", "tier", "merchants", "cashback",
+                                 "physical", "has_stock", "gc_type", "signals")
+
+title = "MacBook Pro M4 Pro at JB Hi-Fi in stock - 20x Points on Ultimate Gift Cards, then 10x - ShopBack 5%"
+f = title_features(title)
+print(f"\n{f}\n")
+assert isinstance(f, tuple) and f.title == title
+assert (f.x, f.multipliers) == (20, (20, 10))
+assert (f.chip, f.generation, f.tier) == ("M4 Pro", 4, "pro")
+assert f.merchants == ("JB Hi-Fi",) and f.cashback == ("ShopBack",) and f.physical == ("JB Hi-Fi",)
+assert f.has_stock and f.gc_type == "ultimate"
+assert {"ultimate", "in stock", "shopback", "20x"} <= f.signals and isinstance(f.signals, frozenset)
+assert f.chip_info == (f.chip, f.generation, f.tier) and f.chip_info is title_features(title).chip_info
+
+# Same answers as the standalone detectors
+for t in (title, "Apple Gift Cards at Coles - 10x Everyday Rewards Points", "Harvey Norman M2 Max c&c", "", None):
+    f = title_features(t)
+    text = t or ""
+    assert f.title == text
+    assert list(f.merchants) == detect_merchants(text) and list(f.cashback) == detect_cashback(text)
+    assert list(f.physical) == detect_physical_retailers(text) and f.has_stock == detect_stock_signal(text)
+    assert f.gc_type == detect_gift_card_type(text)
+    assert {"chip": f.chip, "generation": f.generation, "tier": f.tier} == detect_apple_chip(text)
+print("✅ Fields match the individual detectors")
+
+# Extracted once per title: repeat calls are cache hits returning the same record
+title_features.cache_clear()
+first = title_features(title)
+for _ in range(100):
+    assert title_features(title) is first
+info = title_features.cache_info()
+assert (info.misses, info.hits) == (1, 100), info
+
+# Enrichment attaches the record, and scoring reads it instead of re-extracting
+item = enrich_stack_item({"source": "Test", "title": title, "link": "https://example.com/1"})
+assert item["features"] is first and item_features(item) is first
+before = title_features.cache_info()
+score_item(item)
+assert title_features.cache_info() == before
+assert item_features({"title": title}) is first
+print(f"✅ Cached: {info.misses} extraction, {info.hits} hits")
+
+print("\n" + "=" * 80)
+print("✅ Title features test complete!")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Test the single-pass title scanner: multipliers, chips and the long-title guard."""
+
+import re
+import time
+
+from daily_combined_report import TITLE_SCAN_LIMIT, norm, scan_title
+
+print("🧪 Title Scanner Test\n")
+print("=" * 80)
+
+# Every NNx multiplier, in order; "x" must end the token
+cases = {
+    "Ultimate Gift Card 20x Points at Woolworths": (20,),
+    "20x points + 10 x bonus on Apple cards, then 5X at Coles": (20, 10, 5),
+    "Gift card 15x/20x points": (15, 20),
+    "Xbox box 20xyz deal 3 x": (3,),
+    "Cheap socks": (),
+    "": (),
+}
+for title, expected in cases.items():
+    scan = scan_title(title)
+    assert scan.multipliers == expected, (title, scan.multipliers)
+    assert scan.multipliers == tuple(int(x) for x in re.findall(r"(\d{1,3})\s*x\b", title, re.IGNORECASE))
+print(f"✅ Multipliers: {len(cases)} titles")
+
+# The first Apple chip, with its generation and tier
+chips = {
+    "MacBook Air M2 at JB Hi-Fi": ("M2", 2, "base"),
+    "MacBook Pro M3 Pro 18GB": ("M3 Pro", 3, "pro"),
+    "Mac Studio m2 max in-store": ("M2 Max", 2, "max"),
+    "Mac Studio M1Ultra": ("M1 Ultra", 1, "ultra"),
+    "M4 vs M3 Pro comparison": ("M4", 4, "base"),
+    "Samsung TV M55 bracket": ("M55", 55, "base"),
+    "HM3 Pro adapter": (None, None, "unknown"),
+}
+for title, expected in chips.items():
+    scan = scan_title(title)
+    assert (scan.chip, scan.generation, scan.tier) == expected, (title, scan)
+print(f"✅ Chips: {len(chips)} titles")
+
+# Whitespace is normalised across the whole title, however long
+long_title = "Gift   card\t20x  " + "word " * 200 + " M3 Max  30x"
+scan = scan_title(long_title)
+assert scan.text == norm(long_title)
+assert scan.multipliers == (20,) and scan.chip is None  # past the guard
+assert scan_title("  Ultimate\n20x  ").text == "Ultimate 20x"
+
+# The guard cuts at whitespace, so a token straddling the limit isn't truncated into a match
+padding = "a" * (TITLE_SCAN_LIMIT - 3) + " "
+assert len(padding) == TITLE_SCAN_LIMIT - 2
+assert scan_title(padding + "20xyz and more").multipliers == ()
+assert scan_title(padding + "M3Pro case").chip is None
+assert scan_title("a" * (TITLE_SCAN_LIMIT - 4) + " 10x more").multipliers == (10,)  # ends at the limit
+
+# ...and at the limit itself when the first 512 characters have no whitespace at all
+solid = "20x/" + "-" * 100_000 + " M3 Pro"
+scan = scan_title(solid)
+assert scan.multipliers == (20,) and scan.chip is None and scan.text == solid
+start = time.perf_counter()
+for i in range(200):
+    scan_title(f"{i}x/" + "m" * 50_000)
+elapsed_ms = (time.perf_counter() - start) * 1000 / 200
+print(f"✅ Guard: 50k-character titles without whitespace scanned in {elapsed_ms:.2f} ms each")
+
+print("\n" + "=" * 80)
+print("✅ Title scanner test complete!")
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Test upper-bound pruning in Top 5 selection against an exhaustive sort."""
+
+import random
+
+from daily_combined_report import enrich_stack_item, item_features, score_upper_bound, select_top
+
+titles = [
+    "Ultimate Gift Card 20x Points at Woolworths",
+    "Apple Gift Cards at Coles - 10x Everyday Rewards Points",
+    "MacBook Pro M4 at Officeworks - Click & Collect - 20x Points",
+    "JB Hi-Fi Gift Card 15x Points at Big W - ShopBack 5%",
+    "TCN Gift Card Deal at Woolworths - 10x Points",
+    "Samsung TV at The Good Guys - pickup available",
+    "Win a $500 gift card - competition",
+    "30x Flybuys points on Apple giftcard at Coles",
+    "Harvey Norman M2 Max Mac Studio in-store c&c",
+    "Electronics at Amazon - TopCashback 4%",
+    "Cheap socks",
+]
+
+
+def make_pool(sample):
+    return [enrich_stack_item({"source": "Test", "title": t, "link": f"https://example.com/{i}"})
+            for i, t in enumerate(sample)]
+
+
+print("🧪 Top 5 Pruning Test\n")
+print("=" * 80)
+
+# Bounds never undershoot the real score
+for it in make_pool(titles):
+    bound = score_upper_bound(item_features(it))
+    print(f"   bound {bound:>5} ≥ score {it['score']:>5}  {it['title']}")
+    assert bound >= it["score"], it["title"]
+
+# Same result (including tie order) as sorting everything
+rng = random.Random(42)
+for _ in range(200):
+    sample = [rng.choice(titles) + f" #{n}" * rng.randint(0, 1) for n in range(rng.randint(0, 40))]
+    k = rng.randint(1, 6)
+    expected = [x["link"] for x in sorted(make_pool(sample), key=lambda x: x["score"], reverse=True)[:k]]
+    assert [x["link"] for x in select_top(make_pool(sample), k)] == expected
+
+# Low-bound items are never scored once the Top 5 is settled
+pool = make_pool(titles * 20)
+best = select_top(pool, 5)
+scored = sum(1 for it in pool if "score" in it)
+print(f"\nScored {scored} of {len(pool)} candidates; Top 5 scores: {[x['score'] for x in best]}")
+assert scored < len(pool)
+
+print("\n" + "=" * 80)
+print("✅ Top 5 pruning test complete!")
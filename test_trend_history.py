@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Test trending snapshots, vote velocity and risers-first ordering."""
+
+import os
+import tempfile
+import time
+
+from bs4 import BeautifulSoup
+
+from trend_history import TrendHistory, annotate_velocity, read_last_line, risers_first
+import daily_combined_report as report
+
+print("🧪 Trending Velocity Test\n")
+print("=" * 80)
+
+# Votes come from the deal's node block
+html = """
+<div class="node node-ozbdeal"><div class="n-vote"><span class="nvb voteup"><i></i><span>171</span></span>
+  <span class="nvb votedown"><span>2</span></span></div>
+  <h2 class="title"><a href="/node/900001">Ultimate Gift Card 20x Points at Woolworths</a></h2></div>
+<div class="node"><h2 class="title"><a href="/node/900002">No votes shown on this one at all</a></h2></div>
+"""
+anchors = BeautifulSoup(html, "lxml").select("a[href^='/node/']")
+assert [report.parse_votes(a) for a in anchors] == [171, None]
+
+
+def hot(*rows):
+    return [{"title": f"Deal {nid}", "link": f"https://www.ozbargain.com.au/node/{nid}", "votes": votes}
+            for nid, votes in rows]
+
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "trending.jsonl")
+    history = TrendHistory(path)
+    assert history.last() is None
+
+    first = hot((1, 300), (2, 120), (3, 80), (4, None))
+    for position, d in enumerate(first, 1):
+        d["position"] = position
+    annotate_velocity(first, history.last(), 0)
+    assert "trend" not in first[0]  # nothing to compare with yet
+    history.append(0, first)
+
+    # Two hours later: 3 gained 100 votes, 2 gained 20, 1 gained 10, 4 climbed without votes, 5 is new
+    second = hot((1, 310), (4, None), (2, 140), (3, 180), (5, 50))
+    for position, d in enumerate(second, 1):
+        d["position"] = position
+    annotate_velocity(second, history.last(), 7200)
+    ranked = risers_first(second)
+    for d in ranked:
+        print(f"   {d['title']:<8} {d['trend']:<7} {report.trend_label(d)}")
+    assert [d["title"] for d in ranked] == ["Deal 3", "Deal 2", "Deal 1", "Deal 4", "Deal 5"]
+    assert second[3]["velocity"] == 50 and second[1]["climb"] == 2 and second[4]["trend"] == "new"
+    assert report.trend_label(second[3]) == "▲ +50 votes/h" and report.trend_label(second[1]) == "▲ 2 places"
+
+    # Only the end of the file is read, however long the history
+    with open(path, "a", encoding="utf-8") as f:
+        for ts in range(200_000):
+            f.write('{"ts":%d,"deals":[[1,1,5]]}\n' % ts)
+    history.append(10**9, second)
+    start = time.perf_counter()
+    last = history.last()
+    elapsed = time.perf_counter() - start
+    print(f"\n   {os.path.getsize(path) / 2**20:.1f} MiB history: last snapshot in {elapsed * 1e3:.2f} ms")
+    assert last["ts"] == 10**9 and last["deals"][3] == (4, 180)
+    assert read_last_line(os.path.join(tmp, "missing")) is None
+
+    # The daily report records a snapshot per run and ranks against the previous one
+    real_state_dir, report.STATE_DIR = report.STATE_DIR, tmp
+    try:
+        report.rank_trending(hot((7, 10), (8, 10)))
+        ranked = report.rank_trending(hot((7, 11), (8, 90)))
+        assert [d["title"] for d in ranked] == ["Deal 8", "Deal 7"]
+    finally:
+        report.STATE_DIR = real_state_dir
+
+print("\n" + "=" * 80)
+print("✅ Trending velocity test complete!")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Append-only time series of OzBargain trending snapshots.
+
+Each run appends one compact JSON line: a timestamp plus [node id, position,
+votes] for every trending deal (votes is null when the page didn't show them).
+Velocity only needs the previous snapshot, which is read from the end of the
+file, so the cost of a run doesn't depend on how much history has built up.
+"""
+import os
+import re
+import json
+
+_NODE_ID = re.compile(r"/node/(\d+)")
+
+
+def deal_key(link: str) -> int | str | None:
+    """OzBargain node id of a deal link (the link itself for other URLs)."""
+    m = _NODE_ID.search(link or "")
+    return int(m.group(1)) if m else (link or None)
+
+
+def read_last_line(path: str, block: int = 4096) -> str | None:
+    """Last non-empty line of a text file, reading backwards from the end."""
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        tail = b""
+        while end > 0:
+            start = max(0, end - block)
+            f.seek(start)
+            tail = f.read(end - start) + tail
+            end = start
+            lines = tail.rstrip(b"\n").rsplit(b"\n", 1)
+            if len(lines) == 2 or end == 0:
+                line = lines[-1].strip()
+                return line.decode("utf-8") if line else None
+    return None
+
+
+class TrendHistory:
+    """Trending snapshots stored one per line in `path`."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def last(self) -> dict | None:
+        """Most recent snapshot as {"ts": epoch seconds, "deals": {deal key: (position, votes)}}."""
+        line = read_last_line(self.path)
+        if line is None:
+            return None
+        try:
+            data = json.loads(line)
+            return {"ts": data["ts"], "deals": {nid: (pos, votes) for nid, pos, votes in data["deals"]}}
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def append(self, ts: float, deals: list[dict]):
+        """Record this run's trending list (dicts with link, position and optional votes)."""
+        rows = [[key, d["position"], d.get("votes")] for d in deals if (key := deal_key(d.get("link"))) is not None]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"ts": round(ts), "deals": rows}, separators=(",", ":")) + "\n")
+
+
+def annotate_velocity(deals: list[dict], previous: dict | None, ts: float):
+    """
+    Compare each deal with the previous snapshot and set, in place:
+        trend     "new" | "up" | "down" | "steady"
+        velocity  votes gained per hour (None without votes in both snapshots)
+        climb     positions gained (None for new deals)
+    Nothing is set without a previous snapshot.
+    """
+    if previous is None:
+        return
+    hours = max((ts - previous["ts"]) / 3600, 1 / 60)
+    for d in deals:
+        before = previous["deals"].get(deal_key(d.get("link")))
+        if before is None:
+            d.update(trend="new", velocity=None, climb=None)
+            continue
+        position, votes = before
+        climb = position - d["position"]
+        velocity = None
+        if votes is not None and d.get("votes") is not None:
+            velocity = (d["votes"] - votes) / hours
+        rising = velocity > 0 if velocity is not None else climb > 0
+        falling = velocity < 0 if velocity is not None else climb < 0
+        d.update(trend="up" if rising else "down" if falling else "steady", velocity=velocity, climb=climb)
+
+
+def risers_first(deals: list[dict]) -> list[dict]:
+    """Rising deals (fastest vote gain, then most places climbed) ahead of the rest, which keep their order."""
+    risers = [d for d in deals if d.get("trend") == "up"]
+    risers.sort(key=lambda d: (-(d["velocity"] if d["velocity"] is not None else float("-inf")), -d["climb"]))
+    return risers + [d for d in deals if d.get("trend") != "up"]